@@ -1,7 +1,10 @@
 # routes/booking_routes.py
 
-from flask import Blueprint, request, jsonify
-from database import get_connection
+import base64
+import os
+from datetime import datetime
+from flask import Blueprint, request, jsonify, url_for
+from database import db_connection
 
 bp = Blueprint('bookings', __name__)
 
@@ -14,61 +17,149 @@ def create_booking():
     status = data.get('status', 'Booked')  # Default status
     payment_status = data.get('payment_status', 'Pending')  # Default payment status
 
-    connection = get_connection()
-    try:
-        with connection.cursor() as cursor:
-            sql = """
-                INSERT INTO bookings (user_id, flight_id, status, payment_status)
-                VALUES (%s, %s, %s, %s)
-            """
-            cursor.execute(sql, (user_id, flight_id, status, payment_status))
-            connection.commit()
-            booking_id = cursor.lastrowid
-        return jsonify({'message': 'Booking created successfully', 'booking_id': booking_id}), 201
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-    finally:
-        connection.close()
-
-# GET /bookings - Retrieve all bookings or filter by user_id
+    with db_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                sql = """
+                    INSERT INTO bookings (user_id, flight_id, status, payment_status)
+                    VALUES (%s, %s, %s, %s)
+                """
+                cursor.execute(sql, (user_id, flight_id, status, payment_status))
+                connection.commit()
+                booking_id = cursor.lastrowid
+            return jsonify({'message': 'Booking created successfully', 'booking_id': booking_id}), 201
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+
+# Columns a client may ask for with ?fields=
+BOOKING_FIELDS = [
+    'booking_id', 'user_id', 'service_type', 'service_id', 'booking_date',
+    'total_amount', 'currency', 'status', 'payment_status'
+]
+# Allowed values for the enum filters
+BOOKING_FILTERS = {
+    'status': ('pending', 'confirmed', 'canceled'),
+    'payment_status': ('unpaid', 'paid', 'refunded'),
+    'service_type': ('flight', 'hotel', 'cab', 'package')
+}
+BOOKINGS_PAGE_SIZE = int(os.environ.get('BOOKINGS_PAGE_SIZE', 50))
+BOOKINGS_MAX_PAGE_SIZE = 500
+
+def encode_cursor(booking):
+    position = f"{booking['booking_date'].isoformat()}|{booking['booking_id']}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_cursor(cursor):
+    """Return (booking_date, booking_id) from a cursor, or raise ValueError."""
+    booking_date, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(booking_date), int(booking_id)
+
+# GET /bookings - List bookings, newest first, one page at a time
 @bp.route('/', methods=['GET'])
 def get_bookings():
-    user_id = request.args.get('user_id')
-    query = "SELECT * FROM bookings"
+    """Keyset-paginated on (booking_date, booking_id) DESC.
+
+    Filters: user_id, status, payment_status, service_type, from / to
+    (booking_date range, inclusive). ``fields`` picks columns, ``limit``
+    sets the page size. The body stays a JSON array; when more rows exist
+    the X-Next-Cursor header (and a Link rel="next") gives the cursor to
+    pass back as ``cursor``.
+    """
+    conditions = []
     params = []
 
+    user_id = request.args.get('user_id')
     if user_id:
-        query += " WHERE user_id = %s"
+        conditions.append("user_id = %s")
         params.append(user_id)
 
-    connection = get_connection()
+    for column, allowed in BOOKING_FILTERS.items():
+        value = request.args.get(column)
+        if value:
+            if value not in allowed:
+                return jsonify({'error': f"{column} must be one of: {', '.join(allowed)}"}), 400
+            conditions.append(f"{column} = %s")
+            params.append(value)
+
+    try:
+        for arg, operator in (('from', '>='), ('to', '<=')):
+            value = request.args.get(arg)
+            if value:
+                bound = datetime.fromisoformat(value)
+                if operator == '<=' and len(value) == 10:
+                    # A bare date means the whole day
+                    bound = bound.replace(hour=23, minute=59, second=59)
+                conditions.append(f"booking_date {operator} %s")
+                params.append(bound)
+    except ValueError:
+        return jsonify({'error': "from/to must be ISO dates, e.g. 2025-01-31"}), 400
+
+    cursor_arg = request.args.get('cursor')
+    if cursor_arg:
+        try:
+            after_date, after_id = decode_cursor(cursor_arg)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        conditions.append("(booking_date < %s OR (booking_date = %s AND booking_id < %s))")
+        params.extend([after_date, after_date, after_id])
+
+    requested = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    unknown = [f for f in requested if f not in BOOKING_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    fields = requested or BOOKING_FIELDS
+    # The cursor needs both key columns even when the client did not ask for them
+    columns = fields + [key for key in ('booking_date', 'booking_id') if key not in fields]
+
     try:
-        with connection.cursor() as cursor:
-            cursor.execute(query, tuple(params))
-            bookings = cursor.fetchall()
-        return jsonify(bookings), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-    finally:
-        connection.close()
+        limit = min(max(int(request.args.get('limit', BOOKINGS_PAGE_SIZE)), 1), BOOKINGS_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    query = f"SELECT {', '.join(columns)} FROM bookings"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # Fetch one extra row to know whether another page exists
+    query += " ORDER BY booking_date DESC, booking_id DESC LIMIT %s"
+    params.append(limit + 1)
+
+    with db_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(query, tuple(params))
+                bookings = cursor.fetchall()
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+
+    has_more = len(bookings) > limit
+    bookings = bookings[:limit]
+    next_cursor = encode_cursor(bookings[-1]) if has_more else None
+    if fields != columns:
+        bookings = [{field: booking[field] for field in fields} for booking in bookings]
+
+    response = jsonify(bookings)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+        next_args = request.args.to_dict()
+        next_args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for("bookings.get_bookings", **next_args)}>; rel="next"'
+    return response, 200
 
 # GET /bookings/<int:booking_id> - Retrieve details for a specific booking
 @bp.route('/<int:booking_id>', methods=['GET'])
 def get_booking(booking_id):
-    connection = get_connection()
-    try:
-        with connection.cursor() as cursor:
-            sql = "SELECT * FROM bookings WHERE id = %s"
-            cursor.execute(sql, (booking_id,))
-            booking = cursor.fetchone()
-        if booking:
-            return jsonify(booking), 200
-        else:
-            return jsonify({'error': 'Booking not found'}), 404
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-    finally:
-        connection.close()
+    with db_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                sql = "SELECT * FROM bookings WHERE id = %s"
+                cursor.execute(sql, (booking_id,))
+                booking = cursor.fetchone()
+            if booking:
+                return jsonify(booking), 200
+            else:
+                return jsonify({'error': 'Booking not found'}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
 
 # PUT /bookings/<int:booking_id> - Update a booking (status or payment_status)
 @bp.route('/<int:booking_id>', methods=['PUT'])
@@ -77,29 +168,25 @@ def update_booking(booking_id):
     status = data.get('status')
     payment_status = data.get('payment_status')
 
-    connection = get_connection()
-    try:
-        with connection.cursor() as cursor:
-            sql = "UPDATE bookings SET status = %s, payment_status = %s WHERE id = %s"
-            cursor.execute(sql, (status, payment_status, booking_id))
-            connection.commit()
-        return jsonify({'message': 'Booking updated successfully'}), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-    finally:
-        connection.close()
+    with db_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                sql = "UPDATE bookings SET status = %s, payment_status = %s WHERE id = %s"
+                cursor.execute(sql, (status, payment_status, booking_id))
+                connection.commit()
+            return jsonify({'message': 'Booking updated successfully'}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
 
 # DELETE /bookings/<int:booking_id> - Delete (or cancel) a booking
 @bp.route('/<int:booking_id>', methods=['DELETE'])
 def delete_booking(booking_id):
-    connection = get_connection()
-    try:
-        with connection.cursor() as cursor:
-            sql = "DELETE FROM bookings WHERE id = %s"
-            cursor.execute(sql, (booking_id,))
-            connection.commit()
-        return jsonify({'message': 'Booking deleted successfully'}), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 400
-    finally:
-        connection.close()
+    with db_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                sql = "DELETE FROM bookings WHERE id = %s"
+                cursor.execute(sql, (booking_id,))
+                connection.commit()
+            return jsonify({'message': 'Booking deleted successfully'}), 200
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
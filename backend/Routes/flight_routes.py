@@ -1,15 +1,36 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file, url_for, current_app
+import click
 import requests
 import re
-import urllib.parse
 import os
 import json
-from database import get_connection
-from datetime import datetime, timedelta
+import math
+import time
+from database import db_connection
+from datetime import datetime
 from flask_cors import cross_origin
-from my_utils.db_helpers import save_flight_order_to_db
-from my_utils.pdf_generator import generate_ticket_pdf
-from my_utils.seat_utils import extract_available_seats
+from my_utils.db_helpers import save_flight_order_rows
+from my_utils.pdf_generator import ticket_path
+from my_utils.ticket_jobs import (
+    submit_ticket_job, get_ticket_job, ensure_ticket, DONE as TICKET_DONE, FAILED as TICKET_FAILED
+)
+from my_utils.seat_utils import extract_available_seats, offer_segment_keys, seatmap_cache
+from my_utils.amadeus_client import get_amadeus_token, amadeus_get, amadeus_post
+from my_utils.reference_data import (
+    resolve_city_names, airline_cache, fetch_airport_country, load_locations, location_cache, load_location
+)
+from my_utils.airport_backfill import (
+    backfill_airports, save_airport_countries,
+    AIRPORT_BACKFILL_CONCURRENCY, AIRPORT_BACKFILL_RATE, AIRPORT_BACKFILL_BATCH
+)
+from my_utils.airport_index import AirportCountryIndex
+from my_utils.location_index import LocationIndex
+from my_utils.ref_cache import all_cache_stats
+from my_utils.concurrency import run_concurrently
+from my_utils.cache import cache
+from my_utils.singleflight import SingleFlight
+from my_utils.offer_store import store_offer, load_offer
+from my_utils.tracing import span, record_cache
 import logging
 
 
@@ -19,49 +40,37 @@ logging.basicConfig(level=logging.INFO)
 
 bp = Blueprint("flights", __name__)
 
-AMADEUS_CLIENT_ID = os.environ.get('AMADEUS_CLIENT_ID', "LU7IEumxc5eFAYlRJKRZ88RfSuCvP6ql")
-AMADEUS_CLIENT_SECRET = os.environ.get('AMADEUS_CLIENT_SECRET', "G3JqkJS4Q5gboLUQ")
-AMADEUS_BASE_URL = "https://test.api.amadeus.com"
-
-cached_token = None
-token_expiry = datetime.utcnow()
-
-def get_amadeus_token():
-    global cached_token, token_expiry
-
-    # Return cached token if still valid
-    if cached_token and datetime.utcnow() < token_expiry:
-        print("[TOKEN] Using cached token.")
-        return cached_token
-
-    print("[TOKEN] Fetching new token...")
-    auth_url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": AMADEUS_CLIENT_ID,
-        "client_secret": AMADEUS_CLIENT_SECRET
-    }
-
-    try:
-        response = requests.post(auth_url, headers=headers, data=urllib.parse.urlencode(data))
-        response.raise_for_status()
-
-        token_data = response.json()
-        print("[TOKEN] Token response:", token_data)
-
-        cached_token = token_data.get("access_token")
-        expires_in = token_data.get("expires_in", 1800)
-        token_expiry = datetime.utcnow() + timedelta(seconds=expires_in)
-
-        return cached_token
-
-    except requests.exceptions.RequestException as e:
-        print(f"[TOKEN] Error fetching token: {e}")
-        if e.response is not None:
-            print("[TOKEN] Response content:", e.response.text)
-        return None
-
+# Upper bound on parallel Amadeus searches for one multicity request
+MULTICITY_MAX_WORKERS = int(os.environ.get('MULTICITY_MAX_WORKERS', 4))
+# Seconds a /real-time search result is reused for identical searches
+FLIGHT_SEARCH_CACHE_TTL = int(os.environ.get('FLIGHT_SEARCH_CACHE_TTL', 60))
+# Browser cache lifetime (seconds) for downloaded ticket PDFs; revalidated by ETag afterwards
+TICKET_MAX_AGE = int(os.environ.get('TICKET_MAX_AGE', 3600))
+# Browser/CDN cache lifetime (seconds) for get-location responses; revalidated by ETag afterwards
+LOCATION_MAX_AGE = int(os.environ.get('LOCATION_MAX_AGE', 24 * 3600))
+
+flight_search_flight = SingleFlight()
+location_flight = SingleFlight()
+
+# Preloaded from airport_countries, so is_international_flight never waits
+# on the DB for a known airport
+airport_country_index = AirportCountryIndex(
+    load_all=lambda: load_all_airport_countries(),
+    load_one=lambda iata_code: load_airport_country(iata_code)
+)
+
+# Autocomplete for /search-location: the locations table plus every location
+# Amadeus has returned, so most keystrokes never leave the process
+location_index = LocationIndex(load_all=lambda: load_locations())
+
+
+@bp.before_request
+def start_indexes():
+    # Started by the first request in each worker, not at import or blueprint
+    # registration: CLI commands and test apps don't need the threads, and
+    # threads started before a gunicorn --preload fork don't run in the workers
+    airport_country_index.start()
+    location_index.start()
 
 def is_valid_date(date_str):
     try:
@@ -84,27 +93,11 @@ def handle_options():
 # }
 
 def get_country_by_airport(iata_code):
-    # First, check DB
-    result = db_query_airport_country(iata_code)
-    if result:
-        return result
-    
-    # Fallback: Amadeus API
-    try:
-        response = requests.get(
-            f"{AMADEUS_BASE_URL}/v1/reference-data/locations",
-            params={"keyword": iata_code, "subType": "AIRPORT"},
-            headers={"Authorization": f"Bearer {get_amadeus_token()}"}
-        )
-        data = response.json()
-        if data and data.get("data"):
-            country = data["data"][0]["address"]["countryCode"]
-            # optionally cache to DB
-            return country
-    except:
+    # Same lookup path as get_country_for_airport, but None instead of "UNKNOWN"
+    country = get_country_for_airport(iata_code)
+    if country == "UNKNOWN":
         return None
-
-    return None
+    return country
 
 
 def is_international_flight(flight_offer):
@@ -171,30 +164,24 @@ def build_travelers_list(passengers, flight_offer):
 
     return travelers
 
-airline_cache = {}
-
-def get_airline_name(code, token):
-    if code in airline_cache:
-        return airline_cache[code]
-
-    url = f"{AMADEUS_BASE_URL}/v1/reference-data/airlines"
-    headers = {"Authorization": f"Bearer {token}"}
+def fetch_airline_name(code, token):
+    """Look up an airline through Amadeus. Returns None if the code is unknown."""
     params = {"airlineCodes": code}
+    response = amadeus_get("/v1/reference-data/airlines", token, params=params)
+    response.raise_for_status()
+    data = response.json()
 
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        data = response.json()
+    if data.get("data"):
+        return data["data"][0].get("businessName") or data["data"][0].get("commonName")
+    return None
 
-        if data.get("data"):
-            name = data["data"][0].get("businessName") or data["data"][0].get("commonName") or code
-            airline_cache[code] = name
-            return name
-        else:
-            return code
+def get_airline_name(code, token):
+    try:
+        name = airline_cache.get_or_load(code, lambda c: fetch_airline_name(c, token))
     except Exception as e:
         print(f"Failed to fetch airline name for {code}: {e}")
         return code
+    return name or code
 
 def parse_duration(iso_duration):
     match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?', iso_duration)
@@ -213,61 +200,197 @@ def format_datetime(iso_str):
         return iso_str
 
 def get_city_name(iata_code, token):
-    # You can use Amadeus API or your DB here
-    url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations"
-    params = {"subType": "AIRPORT", "keyword": iata_code}
-    headers = {"Authorization": f"Bearer {token}"}
-    try:
-        res = requests.get(url, headers=headers, params=params)
-        res.raise_for_status()
-        data = res.json()
-        return data["data"][0]["address"]["cityName"]
-    except:
-        return iata_code
+    return resolve_city_names([iata_code], token)[iata_code]
+
+
+def collect_airport_codes(raw_offers):
+    """Return the distinct departure/arrival IATA codes used by a list of offers."""
+    codes = set()
+    for offer in raw_offers:
+        for itin in offer.get("itineraries", []):
+            for seg in itin.get("segments", []):
+                codes.add(seg["departure"]["iataCode"])
+                codes.add(seg["arrival"]["iataCode"])
+    return codes
+
+
+def format_flight_offers(raw_offers, token):
+    """Shape Amadeus flight offers for the frontend.
+
+    City names are resolved once per distinct airport before formatting.
+    Each raw offer is kept in the offer store and its handle returned as
+    "offerHandle", so later booking steps can send the handle instead of
+    the whole offer. Only if the offer store could not be set up (see
+    my_utils.offer_store) is the raw offer returned as "flightOffer" instead.
+    """
+    city_names = resolve_city_names(collect_airport_codes(raw_offers), token)
+
+    # Airline lookups inside the loop are traced as their own spans too
+    with span("app", "format_flight_offers"):
+        offers = []
+        for offer in raw_offers:
+            codes = offer.get("validatingAirlineCodes", [])
+            full_names = [get_airline_name(code, token) for code in codes]
+
+            formatted_itineraries = []
+            for itin in offer.get("itineraries", []):
+                segments = []
+                for seg in itin.get("segments", []):
+                    departure_code = seg["departure"]["iataCode"]
+                    arrival_code = seg["arrival"]["iataCode"]
+                    segments.append({
+                        "departure": {
+                            "city": city_names.get(departure_code, departure_code),
+                            "airport": departure_code,
+                            "time": format_datetime(seg["departure"]["at"]),
+                            "terminal": seg["departure"].get("terminal", "N/A")  # Added terminal info
+                        },
+                        "arrival": {
+                            "city": city_names.get(arrival_code, arrival_code),
+                            "airport": arrival_code,
+                            "time": format_datetime(seg["arrival"]["at"]),
+                            "terminal": seg["arrival"].get("terminal", "N/A")  # Added terminal info
+                        },
+                        "duration": parse_duration(seg["duration"]),
+                        "airline": seg["carrierCode"],
+                        "flightNumber": seg["number"]
+                    })
+                formatted_itineraries.append({
+                    "duration": parse_duration(itin.get("duration", "")),
+                    "segments": segments
+                })
+
+            offer_handle = store_offer(offer)
+            formatted = {
+                "id": offer.get("id"),
+                "offerHandle": offer_handle,
+                "instantTicketingRequired": offer.get("instantTicketingRequired", False),
+                "isUpsellOffer": offer.get("isUpsellOffer", False),
+                "itineraries": formatted_itineraries,
+                "lastTicketingDate": offer.get("lastTicketingDate"),
+                "lastTicketingDateTime": offer.get("lastTicketingDateTime"),
+                "nonHomogeneous": offer.get("nonHomogeneous", False),
+                "numberOfBookableSeats": offer.get("numberOfBookableSeats"),
+                "oneWay": offer.get("oneWay", False),
+                "price": offer.get("price"),
+                "pricingOptions": offer.get("pricingOptions"),
+                "source": offer.get("source"),
+                "travelerPricings": offer.get("travelerPricings"),
+                "type": offer.get("type"),
+                "validatingAirlineCodes": codes,
+                "validatingAirlines": full_names
+            }
+            if not offer_handle:
+                formatted["flightOffer"] = offer
+            offers.append(formatted)
+
+    return offers
+
+def search_flight_offers(params, token):
+    """Run one /v2/shopping/flight-offers search and return the formatted offers."""
+    response = amadeus_get("/v2/shopping/flight-offers", token, params=params)
+    response.raise_for_status()
+    return format_flight_offers(response.json().get("data", []), token)
+
+def flight_search_cache_key(args):
+    """Cache key built from the normalized /real-time search parameters."""
+    trip_type = args.get("tripType", "oneway").lower()
+    parts = [
+        trip_type,
+        args.get("from", "").strip().upper(),
+        args.get("to", "").strip().upper(),
+        args.get("date", "").strip(),
+        args.get("returnDate", "").strip() if trip_type == "roundtrip" else "",
+        str(args.get("adults", 1)).strip(),
+        str(args.get("max", 20)).strip(),
+    ]
+    if trip_type == "multicity":
+        try:
+            segments = json.loads(args.get("segments") or "[]")
+            parts.append(json.dumps(
+                [[str(s.get("from", "")).upper(), str(s.get("to", "")).upper(), s.get("date")] for s in segments]
+            ))
+        except Exception:
+            parts.append(args.get("segments") or "")
+    return "flight-search:" + "|".join(parts)
+
+
+def is_cacheable_search(payload, status):
+    if status != 200:
+        return False
+    # Multicity responses with a failed leg should be retried, not served from cache
+    return not any("error" in leg for leg in payload.get("segments", []))
+
 
 @bp.route('/real-time', methods=['GET', 'OPTIONS'])
 @cross_origin(origins="*")
 def get_real_time_flights():
-    departure = request.args.get("from")
-    arrival = request.args.get("to")
-    departure_date = request.args.get("date")
-    trip_type = request.args.get("tripType", "oneway").lower()
-    return_date = request.args.get("returnDate")
-    adults = request.args.get("adults", 1)
-    max_offers = request.args.get("max", 20)
+    key = flight_search_cache_key(request.args)
+    payload = cache.get(key)
+    record_cache("flight_search", payload is not None)
+    if payload is not None:
+        response = jsonify(payload)
+        response.headers["X-Cache"] = "HIT"
+        return response, 200
+
+    args = request.args.copy()
+
+    def search_and_cache():
+        result, status = search_real_time_flights(args)
+        if is_cacheable_search(result, status):
+            cache.set(key, result, timeout=FLIGHT_SEARCH_CACHE_TTL)
+        return result, status
+
+    # Identical searches arriving together share one upstream request
+    payload, status = flight_search_flight.do(key, search_and_cache)
+    response = jsonify(payload)
+    response.headers["X-Cache"] = "MISS"
+    return response, status
+
+
+def search_real_time_flights(args):
+    """Run a /real-time search. Returns ``(payload, status_code)``."""
+    departure = args.get("from")
+    arrival = args.get("to")
+    departure_date = args.get("date")
+    trip_type = args.get("tripType", "oneway").lower()
+    return_date = args.get("returnDate")
+    adults = args.get("adults", 1)
+    max_offers = args.get("max", 20)
 
     try:
         adults = int(adults)
         max_offers = int(max_offers)
     except ValueError:
-        return jsonify({"error": "adults and max must be integers"}), 400
+        return {"error": "adults and max must be integers"}, 400
 
     token = get_amadeus_token()
     if not token:
-        return jsonify({"error": "Authentication failed"}), 401
-
-    headers = {"Authorization": f"Bearer {token}"}
+        return {"error": "Authentication failed"}, 401
 
     if trip_type == "multicity":
-        segments = request.args.get("segments")
+        segments = args.get("segments")
         if not segments:
-            return jsonify({"error": "For multicity, provide 'segments' parameter as JSON array"}), 400
+            return {"error": "For multicity, provide 'segments' parameter as JSON array"}, 400
         try:
             segments = json.loads(segments)
         except Exception as e:
-            return jsonify({"error": "Invalid 'segments' JSON format", "details": str(e)}), 400
-
-        results = []
-        try:
-            for index, segment in enumerate(segments):
-                origin = segment.get("from")
-                destination = segment.get("to")
-                date = segment.get("date")
-
-                if not origin or not destination or not is_valid_date(date):
-                    return jsonify({"error": f"Invalid segment: {segment}"}), 400
-
-                flight_params = {
+            return {"error": "Invalid 'segments' JSON format", "details": str(e)}, 400
+
+        legs = []
+        for index, segment in enumerate(segments):
+            origin = segment.get("from")
+            destination = segment.get("to")
+            date = segment.get("date")
+
+            if not origin or not destination or not is_valid_date(date):
+                return {"error": f"Invalid segment: {segment}"}, 400
+
+            legs.append({
+                "segmentIndex": index + 1,
+                "route": f"{origin} → {destination}",
+                "date": date,
+                "params": {
                     "originLocationCode": origin,
                     "destinationLocationCode": destination,
                     "departureDate": date,
@@ -276,85 +399,47 @@ def get_real_time_flights():
                     "nonStop": "false",
                     "max": max_offers
                 }
+            })
 
-                url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
-                response = requests.get(url, headers=headers, params=flight_params)
-                response.raise_for_status()
-                segment_data = response.json()
-
-                offers = []
-                for offer in segment_data.get("data", []):
-                    codes = offer.get("validatingAirlineCodes", [])
-                    full_names = [get_airline_name(code, token) for code in codes]
-
-                    formatted_itineraries = []
-                    for itin in offer.get("itineraries", []):
-                        segments = []
-                        for seg in itin.get("segments", []):
-                            departure_code = seg["departure"]["iataCode"]
-                            arrival_code = seg["arrival"]["iataCode"]
-                            segments.append({
-                                "departure": {
-                                    "city": get_city_name(departure_code, token),
-                                    "airport": departure_code,
-                                    "time": format_datetime(seg["departure"]["at"]),
-                                    "terminal": seg["departure"].get("terminal", "N/A")  # Added terminal info
-                                },
-                                "arrival": {
-                                    "city": get_city_name(arrival_code, token),
-                                    "airport": arrival_code,
-                                    "time": format_datetime(seg["arrival"]["at"]),
-                                    "terminal": seg["arrival"].get("terminal", "N/A")  # Added terminal info
-                                },
-                                "duration": parse_duration(seg["duration"]),
-                                "airline": seg["carrierCode"],
-                                "flightNumber": seg["number"]
-                            })
-                        formatted_itineraries.append({
-                            "duration": parse_duration(itin.get("duration", "")),
-                            "segments": segments
-                        })
-
-                    offers.append({
-                        "id": offer.get("id"),
-                        "instantTicketingRequired": offer.get("instantTicketingRequired", False),
-                        "isUpsellOffer": offer.get("isUpsellOffer", False),
-                        "itineraries": formatted_itineraries,
-                        "lastTicketingDate": offer.get("lastTicketingDate"),
-                        "lastTicketingDateTime": offer.get("lastTicketingDateTime"),
-                        "nonHomogeneous": offer.get("nonHomogeneous", False),
-                        "numberOfBookableSeats": offer.get("numberOfBookableSeats"),
-                        "oneWay": offer.get("oneWay", False),
-                        "price": offer.get("price"),
-                        "pricingOptions": offer.get("pricingOptions"),
-                        "source": offer.get("source"),
-                        "travelerPricings": offer.get("travelerPricings"),
-                        "type": offer.get("type"),
-                        "validatingAirlineCodes": codes,
-                        "validatingAirlines": full_names
-                    })
-
-                results.append({
-                    "segmentIndex": index + 1,
-                    "route": f"{origin} → {destination}",
-                    "date": date,
-                    "offers": offers
-                })
+        # Legs are independent, so search them in parallel
+        calls = {
+            leg["segmentIndex"]: (lambda params=leg["params"]: search_flight_offers(params, token))
+            for leg in legs
+        }
+        offers_by_leg, errors, _ = run_concurrently(calls, MULTICITY_MAX_WORKERS)
 
-            return jsonify({
+        results = []
+        for leg in legs:
+            index = leg["segmentIndex"]
+            result = {
+                "segmentIndex": index,
+                "route": leg["route"],
+                "date": leg["date"],
+                "offers": offers_by_leg.get(index, [])
+            }
+            if index in errors:
+                print(f"Multicity segment {index} failed: {errors[index]}")
+                result["error"] = f"API request failed: {str(errors[index])}"
+            results.append(result)
+
+        if errors and len(errors) == len(legs):
+            return {
+                "error": "API request failed for one or more segments",
                 "tripType": "multicity",
                 "segments": results
-            }), 200
+            }, 500
 
-        except requests.exceptions.RequestException as e:
-            return jsonify({"error": "API request failed for one or more segments", "details": str(e)}), 500
+        return {
+            "tripType": "multicity",
+            "segments": results
+        }, 200
 
     else:
         if not departure or not arrival or not departure_date:
-            return jsonify({"error": "Please provide 'from', 'to', and 'date'"}), 400
+            return {"error": "Please provide 'from', 'to', and 'date'"}, 400
 
         if not is_valid_date(departure_date):
-            return jsonify({"error": "Invalid departure date format, use YYYY-MM-DD"}), 400
+            return {"error": "Invalid departure date format, use YYYY-MM-DD"}, 400
 
         params = {
             "originLocationCode": departure,
@@ -368,79 +453,37 @@ def get_real_time_flights():
 
         if trip_type == "roundtrip":
             if not return_date:
-                return jsonify({"error": "Return date is required for roundtrip"}), 400
+                return {"error": "Return date is required for roundtrip"}, 400
             if not is_valid_date(return_date):
-                return jsonify({"error": "Invalid return date format, use YYYY-MM-DD"}), 400
+                return {"error": "Invalid return date format, use YYYY-MM-DD"}, 400
             params["returnDate"] = return_date
 
         try:
-            url = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
-            response = requests.get(url, headers=headers, params=params)
+            response = amadeus_get("/v2/shopping/flight-offers", token, params=params)
             response.raise_for_status()
             data = response.json()
 
             if "errors" in data:
-                return jsonify({"error": data["errors"]}), 400
-
-            offers = []
-            for offer in data.get("data", []):
-                codes = offer.get("validatingAirlineCodes", [])
-                full_names = [get_airline_name(code, token) for code in codes]
-
-                formatted_itineraries = []
-                for itin in offer.get("itineraries", []):
-                    segments = []
-                    for seg in itin.get("segments", []):
-                        departure_code = seg["departure"]["iataCode"]
-                        arrival_code = seg["arrival"]["iataCode"]
-                        segments.append({
-                            "departure": {
-                                "city": get_city_name(departure_code, token),
-                                "airport": departure_code,
-                                "time": format_datetime(seg["departure"]["at"]),
-                                "terminal": seg["departure"].get("terminal", "N/A")  # Added terminal info
-                            },
-                            "arrival": {
-                                "city": get_city_name(arrival_code, token),
-                                "airport": arrival_code,
-                                "time": format_datetime(seg["arrival"]["at"]),
-                                "terminal": seg["arrival"].get("terminal", "N/A")  # Added terminal info
-                            },
-                            "duration": parse_duration(seg["duration"]),
-                            "airline": seg["carrierCode"],
-                            "flightNumber": seg["number"]
-                        })
-                    formatted_itineraries.append({
-                        "duration": parse_duration(itin.get("duration", "")),
-                        "segments": segments
-                    })
+                return {"error": data["errors"]}, 400
 
-                offers.append({
-                    "id": offer.get("id"),
-                    "instantTicketingRequired": offer.get("instantTicketingRequired", False),
-                    "isUpsellOffer": offer.get("isUpsellOffer", False),
-                    "itineraries": formatted_itineraries,
-                    "lastTicketingDate": offer.get("lastTicketingDate"),
-                    "lastTicketingDateTime": offer.get("lastTicketingDateTime"),
-                    "nonHomogeneous": offer.get("nonHomogeneous", False),
-                    "numberOfBookableSeats": offer.get("numberOfBookableSeats"),
-                    "oneWay": offer.get("oneWay", False),
-                    "price": offer.get("price"),
-                    "pricingOptions": offer.get("pricingOptions"),
-                    "source": offer.get("source"),
-                    "travelerPricings": offer.get("travelerPricings"),
-                    "type": offer.get("type"),
-                    "validatingAirlineCodes": codes,
-                    "validatingAirlines": full_names
-                })
+            offers = format_flight_offers(data.get("data", []), token)
 
-            return jsonify({
+            return {
                 "tripType": trip_type,
                 "flightOffers": offers
-            }), 200
+            }, 200
 
         except requests.exceptions.RequestException as e:
-            return jsonify({"error": f"API Request Failed: {str(e)}"}), 500
+            return {"error": f"API Request Failed: {str(e)}"}, 500
+
+def offers_from_handles(handles):
+    """Resolve offer handles to stored offers, or None if any is invalid or expired."""
+    if isinstance(handles, str):
+        handles = [handles]
+    offers = [load_offer(handle) for handle in handles or []]
+    if not offers or any(offer is None for offer in offers):
+        return None
+    return offers
 
 @bp.route('/flight-price', methods=['POST'])
 @cross_origin(origins="*")
@@ -451,23 +494,23 @@ def price_flight_offer():
 
     try:
         data = request.get_json()
-        if not data or 'flightOffers' not in data:
+        if data and 'offerHandles' in data:
+            flight_offers = offers_from_handles(data['offerHandles'])
+            if flight_offers is None:
+                return jsonify({"error": "Unknown or expired offerHandle"}), 404
+        elif data and 'flightOffers' in data:
+            flight_offers = data['flightOffers']
+        else:
             return jsonify({"error": "Missing flightOffers in request body"}), 400
 
         payload = {
             "data": {
                 "type": "flight-offers-pricing",
-                "flightOffers": data['flightOffers']
+                "flightOffers": flight_offers
             }           
         }
 
-        url = f"{AMADEUS_BASE_URL}/v1/shopping/flight-offers/pricing"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-
-        response = requests.post(url, headers=headers, json=payload)
+        response = amadeus_post("/v1/shopping/flight-offers/pricing", token, json=payload)
         response.raise_for_status()
         return jsonify(response.json()), 200
     except requests.exceptions.RequestException as e:
@@ -478,9 +521,12 @@ def price_flight_offer():
 @cross_origin(origins="*")
 def start_booking():
     body = request.get_json()
-    flight_offer = body.get("flightOffer")
+    offer_handle = body.get("offerHandle")
+    flight_offer = load_offer(offer_handle) if offer_handle else body.get("flightOffer")
     travelers = body.get("travelers")
 
+    if offer_handle and not flight_offer:
+        return jsonify({"error": "Unknown or expired offerHandle"}), 404
     if not flight_offer or not travelers:
         return jsonify({"error": "Missing flightOffer or travelers"}), 400
 
@@ -506,13 +552,18 @@ def start_booking():
         total_amount = int(base_amount + seat_total)
         currency = flight_offer["price"]["currency"]
 
-        return jsonify({
+        result = {
             "message": "Ready for payment. Proceed with Razorpay.",
             "amount": total_amount,
             "currency": currency,
-            "flightOffer": flight_offer,
             "travelers": travelers
-        }), 200
+        }
+        # Clients that sent a handle get it back instead of the full offer
+        if offer_handle:
+            result["offerHandle"] = offer_handle
+        else:
+            result["flightOffer"] = flight_offer
+        return jsonify(result), 200
 
     except Exception as e:
         return jsonify({"error": "Error calculating final amount", "details": str(e)}), 500
@@ -527,31 +578,48 @@ def get_seat_map():
 
     body = request.get_json()
 
-    if not body or 'flightOffer' not in body:
+    if body and 'offerHandle' in body:
+        flight_offer = load_offer(body['offerHandle'])
+        if flight_offer is None:
+            return jsonify({"error": "Unknown or expired offerHandle"}), 404
+    elif body and 'flightOffer' in body:
+        flight_offer = body['flightOffer']
+    else:
         return jsonify({"error": "Missing 'flightOffer' in body"}), 400
 
-    flight_offer = body['flightOffer']
+    # The full Amadeus payload is large; only send (and fetch fresh) when asked for
+    include_raw = request.args.get('raw', '').lower() in ('1', 'true', 'yes')
+    segment_keys = offer_segment_keys(flight_offer)
+
+    if not include_raw and segment_keys:
+        cached = [seatmap_cache.get(key) for _, key in segment_keys]
+        if all(seat_map is not None for seat_map in cached):
+            # Another offer for the same flight may number its segments differently
+            available_seats = [dict(seat_map, segmentId=segment_id)
+                               for (segment_id, _), seat_map in zip(segment_keys, cached)]
+            return jsonify({"availableSeats": available_seats}), 200
 
     try:
-        url = f"{AMADEUS_BASE_URL}/v1/shopping/seatmaps"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
         payload = {
             "data": [flight_offer]
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = amadeus_post("/v1/shopping/seatmaps", token, json=payload)
         response.raise_for_status()
 
         seatmap_data = response.json()
         available_seats = extract_available_seats(seatmap_data)
 
-        return jsonify({
-            "availableSeats": available_seats,
-            "raw": seatmap_data  # Optional: helpful for debugging or development
-        }), 200
+        keys_by_segment = dict(segment_keys)
+        for seat_map in available_seats:
+            key = keys_by_segment.get(seat_map["segmentId"])
+            if key:
+                seatmap_cache.set(key, seat_map)
+
+        result = {"availableSeats": available_seats}
+        if include_raw:
+            result["raw"] = seatmap_data  # Opt-in with ?raw=1: helpful for debugging or development
+        return jsonify(result), 200
 
     except requests.exceptions.RequestException as e:
         return jsonify({"error": str(e)}), 500
@@ -569,23 +637,31 @@ def search_location_by_keyword():
         # It's an IATA code, so fetch the location directly
         return get_location_by_id(keyword)
 
-    # Otherwise, treat the keyword as a location name and search by keyword
+    # Otherwise, treat the keyword as a location name: answer from the local
+    # index and only search Amadeus when it has nothing
+    sub_types = ["CITY", "AIRPORT"]
+    with span("app", "location_index"):
+        matches = location_index.search(keyword, sub_types=sub_types, limit=10)
+    record_cache("location_index", bool(matches))
+    if matches:
+        return jsonify({"meta": {"count": len(matches)}, "data": matches}), 200
+
     token = get_amadeus_token()
     if not token:
         return jsonify({"error": "Authentication failed"}), 401
 
-    url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations"
-    headers = {"Authorization": f"Bearer {token}"}
     params = {
-        "subType": "CITY,AIRPORT",
+        "subType": ",".join(sub_types),
         "keyword": keyword,
         "page[limit]": 10
     }
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = amadeus_get("/v1/reference-data/locations", token, params=params)
         response.raise_for_status()
-        return jsonify(response.json()), 200
+        data = response.json()
+        location_index.add(data.get("data", []))
+        return jsonify(data), 200
     except requests.exceptions.RequestException as e:
         return jsonify({"error": str(e)}), 500
 
@@ -594,33 +670,60 @@ def search_location_by_keyword():
 @bp.route('/get-location/<location_id>', methods=['GET'])
 @cross_origin(origins="*")
 def get_location_by_id(location_id):
-    token = get_amadeus_token()
-    if not token:
-        return jsonify({"error": "Authentication failed"}), 401
+    location_id = location_id.upper()
+    found, entry = location_cache.lookup(location_id)
+    if not found:
+        token = get_amadeus_token()
+        if not token:
+            return jsonify({"error": "Authentication failed"}), 401
 
-    url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/{location_id}"
-    headers = {"Authorization": f"Bearer {token}"}
+        try:
+            entry = location_flight.do(location_id, lambda: load_location(location_id, token))
+        except requests.exceptions.RequestException as e:
+            print(f"Error: {str(e)} Response: {e.response.text if e.response is not None else ''}")  # Log response text
+            return jsonify({"error": str(e)}), 500
+        if entry is not None and entry["location"]:
+            location_index.add([entry["location"]])
+
+    if entry is None:
+        return jsonify({"error": f"Location {location_id} not found"}), 404
+    return location_response(entry)
+
+def location_response(entry):
+    """Cached location body with a strong ETag; answers If-None-Match with 304."""
+    response = current_app.response_class(entry["body"], mimetype="application/json")
+    response.set_etag(entry["etag"])
+    response.cache_control.public = True
+    response.cache_control.max_age = LOCATION_MAX_AGE
+    # Let the CDN keep serving a stale copy while it revalidates in the background
+    response.cache_control.stale_while_revalidate = LOCATION_MAX_AGE
+    return response.make_conditional(request)
 
+def get_country_for_airport(iata_code):
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return jsonify(response.json()), 200
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {str(e)} Response: {response.text}")  # Log response text
-        return jsonify({"error": str(e)}), 500
-
-
+        country = airport_country_index.get(iata_code)
+    except Exception as e:
+        # Transient DB/Amadeus failure: nothing is cached, the next call retries
+        print(f"[Country lookup failed for {iata_code}]: {e}")
+        return "UNKNOWN"
+    return country or "UNKNOWN"
 
+def load_all_airport_countries():
+    """The whole airport_countries table as {iata_code: country_code}."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT iata_code, country_code FROM airport_countries")
+            return {row['iata_code']: row['country_code'] for row in cur.fetchall() if row['country_code']}
 
-def get_country_for_airport(iata_code):
+def load_airport_country(iata_code):
     # Try fetching from DB first
     try:
-        conn = get_connection()
-        with conn.cursor() as cur:
-            cur.execute("SELECT country_code FROM airport_countries WHERE iata_code = %s", (iata_code,))
-            result = cur.fetchone()
-            if result:
-                return result['country_code']
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT country_code FROM airport_countries WHERE iata_code = %s", (iata_code,))
+                result = cur.fetchone()
+                if result:
+                    return result['country_code']
     except Exception as e:
         print(f"[DB Error fetching country]: {e}")
 
@@ -628,40 +731,63 @@ def get_country_for_airport(iata_code):
     return fetch_and_save_airport_country(iata_code)
 
 def fetch_and_save_airport_country(iata_code):
-    """Fetches the country from Amadeus and stores it in DB if not found in DB."""
-    try:
-        token = get_amadeus_token()
-        url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/{iata_code}"
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(url, headers=headers)
-        data = response.json()
-
-        country_code = data["data"]["address"]["countryCode"]
+    """Fetches the country from Amadeus and stores it in DB if not found in DB.
 
-        # Save to DB
-        try:
-            conn = get_connection()
-            with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO airport_countries (iata_code, country_code) VALUES (%s, %s)",
-                    (iata_code, country_code)
-                )
-                conn.commit()
-        except Exception as db_insert_err:
-            print(f"[DB Insert Error]: {db_insert_err}")
-
-        return country_code
-    except Exception as e:
-        print(f"[Amadeus Error]: {e}")
-        return "UNKNOWN"
+    Returns None only when Amadeus does not know the code; network errors,
+    rate limiting and 5xx responses propagate so they are not cached as unknown.
+    """
+    country_code = fetch_airport_country(iata_code, get_amadeus_token())
+    if not country_code:
+        return None
 
-def update_airports_in_db(iata_codes):
-    for iata_code in iata_codes:
-        country_code = fetch_and_save_airport_country(iata_code)
-        if country_code != "UNKNOWN":
-            print(f"Successfully saved {iata_code} with country {country_code}")
-        else:
-            print(f"Failed to fetch or save data for {iata_code}")
+    try:
+        save_airport_countries([(iata_code, country_code)])
+    except Exception as db_insert_err:
+        print(f"[DB Insert Error]: {db_insert_err}")
+
+    return country_code
+
+def update_airports_in_db(iata_codes, **options):
+    """Bulk backfill of airport_countries; see my_utils.airport_backfill.backfill_airports."""
+    def index_saved(rows):
+        for code, country in rows:
+            airport_country_index.set(code, country)
+
+    summary = backfill_airports(iata_codes, on_saved=index_saved, **options)
+    print(f"[AirportBackfill] requested={summary['requested']} skipped={summary['skipped']} "
+          f"saved={summary['saved']} unknown={len(summary['unknown'])} failed={len(summary['failed'])}")
+    return summary
+
+@bp.cli.command("backfill-airports")
+@click.argument("codes_file", type=click.File("r"))
+@click.option("--concurrency", type=int, default=AIRPORT_BACKFILL_CONCURRENCY, show_default=True)
+@click.option("--rate", type=float, default=AIRPORT_BACKFILL_RATE, show_default=True, help="Amadeus calls per second")
+@click.option("--batch-size", type=int, default=AIRPORT_BACKFILL_BATCH, show_default=True)
+@click.option("--refetch", is_flag=True, help="Fetch codes already in airport_countries too")
+@click.option("--failed-out", type=click.Path(dir_okay=False), help="Write codes that failed here, to retry later")
+def backfill_airports_command(codes_file, concurrency, rate, batch_size, refetch, failed_out):
+    """Fill airport_countries from a file of IATA codes (whitespace or comma separated).
+
+    Re-running with the same file only fetches the codes still missing.
+    """
+    codes = codes_file.read().replace(",", " ").split()
+    summary = update_airports_in_db(codes, concurrency=concurrency, rate=rate,
+                                    batch_size=batch_size, skip_existing=not refetch)
+    if failed_out:
+        with open(failed_out, "w") as f:
+            f.write("\n".join(summary["failed"]) + ("\n" if summary["failed"] else ""))
+    if summary["unknown"]:
+        click.echo(f"Unknown to Amadeus: {' '.join(summary['unknown'])}")
+    if summary["failed"]:
+        click.echo(f"Failed (re-run to retry): {' '.join(summary['failed'])}")
+
+@bp.route('/reference-cache/stats', methods=['GET'])
+@cross_origin(origins="*")
+def reference_cache_stats():
+    stats = all_cache_stats()
+    stats["airport_country_index"] = airport_country_index.stats()
+    stats["location_index"] = location_index.stats()
+    return jsonify(stats), 200
 
 # Route to create a flight order
 @bp.route('/create-order', methods=['POST'])
@@ -675,10 +801,17 @@ def create_flight_order():
 
     try:
         request_data = request.get_json()
-        logging.debug(f"Request data: {request_data}")
+        logging.debug("Request data: %s", request_data)
 
         data = request_data.get("data", {})
 
+        offer_handle = data.get("offerHandle") if data else None
+        if offer_handle:
+            stored_offer = load_offer(offer_handle)
+            if stored_offer is None:
+                return jsonify({"error": "Unknown or expired offerHandle"}), 404
+            data['flightOffers'] = [stored_offer]
+
         if not data or 'flightOffers' not in data or 'travelers' not in data:
             logging.error("Missing 'flightOffers' or 'travelers' in request body")
             return jsonify({"error": "Missing 'flightOffers' or 'travelers' in request body"}), 400
@@ -699,7 +832,8 @@ def create_flight_order():
                 return jsonify({"error": "Missing traveler contact details"}), 400
 
         travelers = build_travelers_list(travelers_data, flight_offer)
-        clean_offer = clean_flight_offer(flight_offer)
+        # Stored offers are untouched Amadeus JSON, so only client copies need cleaning
+        clean_offer = flight_offer if offer_handle else clean_flight_offer(flight_offer)
 
         data_payload = {
             "type": "flight-order",
@@ -709,13 +843,7 @@ def create_flight_order():
 
         logging.info(f"Sending request to Amadeus API: {data_payload}")
 
-        url = f"{AMADEUS_BASE_URL}/v1/booking/flight-orders"
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-
-        response = requests.post(url, headers=headers, json={"data": data_payload})
+        response = amadeus_post("/v1/booking/flight-orders", token, json={"data": data_payload})
         response.raise_for_status()
 
         order_response = response.json()
@@ -735,10 +863,10 @@ def create_flight_order():
 
         # Save flight order to database (without user_id)
         try:
-            rows_inserted = save_flight_order_to_db(flight_order)
+            rows_inserted, failed_rows = save_flight_order_rows(flight_order)
             if rows_inserted == 0:
                 logging.error(f"Failed to insert flight order into DB for order_id: {flight_order.get('id')}")
-                return jsonify({"error": "Failed to save flight order to database"}), 500
+                return jsonify({"error": "Failed to save flight order to database", "failedRows": failed_rows}), 500
         except Exception as db_error:
             logging.error(f"Failed to save flight order to database: {str(db_error)}")
             return jsonify({
@@ -747,15 +875,20 @@ def create_flight_order():
                 "order_data": flight_order
             }), 500
 
-        # Generate the ticket PDF
-        pdf_path = generate_ticket_pdf(flight_order)
-        logging.info(f"Flight order created and PDF generated at {pdf_path}")
+        # The ticket PDF is rendered in the background; poll ticketStatusUrl for it
+        ticket_job_id = submit_ticket_job(flight_order)
+        logging.info(f"Flight order {flight_order['id']} created, ticket job {ticket_job_id} queued")
 
-        return jsonify({
+        body = {
             "message": "Flight order created successfully",
             "order_data": flight_order,
-            "pdf_path": pdf_path
-        }), 200
+            "ticketJobId": ticket_job_id,
+            "ticketStatusUrl": url_for("flights.get_ticket_job_status", job_id=ticket_job_id),
+            "ticketUrl": url_for("flights.download_ticket", order_id=flight_order["id"])
+        }
+        if failed_rows:
+            body["failedRows"] = failed_rows
+        return jsonify(body), 200
 
     except requests.exceptions.HTTPError as e:
         try:
@@ -780,6 +913,69 @@ def create_flight_order():
         }), 500
 
 
+@bp.route("/ticket-jobs/<job_id>", methods=["GET"])
+def get_ticket_job_status(job_id):
+    job = get_ticket_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired ticket job"}), 404
+
+    body = {key: job.get(key) for key in ("jobId", "orderId", "status", "error", "retryAt")}
+    if job["status"] == TICKET_DONE:
+        body["downloadUrl"] = url_for("flights.download_ticket", order_id=job["orderId"])
+    return jsonify(body), 200
+
+
+@bp.route("/ticket-jobs/<job_id>/pdf", methods=["GET"])
+def download_ticket_job(job_id):
+    job = get_ticket_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired ticket job"}), 404
+    return ticket_job_response(job)
+
+
+@bp.route("/tickets/<path:order_id>", methods=["GET"])
+def download_ticket(order_id):
+    """Serve a rendered ticket; a render lost to a restart is queued again."""
+    if not os.path.isfile(ticket_path(order_id)):
+        job = ensure_ticket(order_id)
+        if job is None:
+            return jsonify({"error": "Ticket not found"}), 404
+        return ticket_job_response(job)
+    return send_ticket(order_id)
+
+
+def ticket_job_response(job):
+    if job["status"] == TICKET_FAILED and job.get("retryAt"):
+        # Asking again after retryAt queues another attempt
+        response = jsonify({"status": job["status"], "error": job.get("error")})
+        response.headers["Retry-After"] = str(max(1, math.ceil(job["retryAt"] - time.time())))
+        return response, 503
+    if job["status"] == TICKET_FAILED:
+        return jsonify({"error": "Ticket generation failed", "details": job.get("error")}), 500
+    if job["status"] != TICKET_DONE:
+        # Not rendered yet: tell the client to retry shortly
+        response = jsonify({"status": job["status"]})
+        response.headers["Retry-After"] = "1"
+        return response, 202
+    return send_ticket(job["orderId"])
+
+
+def send_ticket(order_id):
+    path = ticket_path(order_id)
+    if not os.path.isfile(path):
+        return jsonify({"error": "Ticket not found or not rendered yet"}), 404
+
+    # conditional=True answers If-None-Match / If-Modified-Since with 304 and
+    # honours Range; the file body goes out through the server's file wrapper
+    response = send_file(path, mimetype="application/pdf", as_attachment=True,
+                         download_name=f"ticket_{os.path.basename(path)}",
+                         conditional=True, etag=True, max_age=TICKET_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
 # Helper function to clean the flight offer
 def clean_flight_offer(flight_offer):
     import copy
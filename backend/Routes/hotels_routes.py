@@ -1,84 +1,196 @@
 import os
-import urllib.parse
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from flask import Blueprint, request, jsonify
+from database import db_connection
+from my_utils.amadeus_client import get_amadeus_token, amadeus_get
+from my_utils.concurrency import run_concurrently
+from my_utils.ref_cache import RefCache
 
 # Create a blueprint for hotel search
 bp = Blueprint('Hotels', __name__)
 
-# Amadeus API credentials
-AMADEUS_CLIENT_ID = os.environ.get('AMADEUS_CLIENT_ID', "LU7IEumxc5eFAYlRJKRZ88RfSuCvP6ql")
-AMADEUS_CLIENT_SECRET = os.environ.get('AMADEUS_CLIENT_SECRET', "G3JqkJS4Q5gboLUQ")
-AMADEUS_BASE_URL = "https://test.api.amadeus.com"
-
-def get_amadeus_token():
-    """Obtain Amadeus API access token."""
-    auth_url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": AMADEUS_CLIENT_ID,
-        "client_secret": AMADEUS_CLIENT_SECRET
-    }
-    try:
-        response = requests.post(auth_url, headers=headers, data=urllib.parse.urlencode(data))
-        response.raise_for_status()
-        token = response.json().get("access_token")
-        print("✅ Access Token:", token)
-        return token
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error getting Amadeus token: {e}")
-        return None
+# How many hotel-offer batches to request at once, and how long (seconds) to wait for them
+HOTEL_OFFERS_CONCURRENCY = int(os.environ.get('HOTEL_OFFERS_CONCURRENCY', 8))
+HOTEL_OFFERS_DEADLINE = float(os.environ.get('HOTEL_OFFERS_DEADLINE', 8))
 
-def get_hotel_ids(destination, access_token):
-    """Fetch hotel IDs for a given city."""
-    hotel_list_url = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/hotels/by-city"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    params = {"cityCode": destination}
+# A city's hotel list barely changes: keep it for a week, refresh in the background after 12h
+HOTEL_IDS_TTL = int(os.environ.get('HOTEL_IDS_TTL', 7 * 24 * 3600))
+HOTEL_IDS_REFRESH_AFTER = int(os.environ.get('HOTEL_IDS_REFRESH_AFTER', 12 * 3600))
+# After a failed background refresh, wait this long (seconds) before trying again
+HOTEL_IDS_RETRY_AFTER = int(os.environ.get('HOTEL_IDS_RETRY_AFTER', 600))
+
+hotel_ids_cache = RefCache("hotel_ids", maxsize=1024, ttl=HOTEL_IDS_TTL)
+_refresh_executor = ThreadPoolExecutor(max_workers=2)
+_refresh_lock = threading.Lock()
+_refreshing = set()
 
-    response = requests.get(hotel_list_url, headers=headers, params=params)
+def fetch_hotel_ids_from_amadeus(city_code, access_token):
+    """Download the hotel list for a city. Returns None if the call fails."""
+    params = {"cityCode": city_code}
+
+    response = amadeus_get("/v1/reference-data/locations/hotels/by-city", access_token, params=params)
     
     if response.status_code == 200:
         hotels = response.json().get("data", [])
         hotel_ids = [hotel["hotelId"] for hotel in hotels]
-        print(f"✅ Found {len(hotel_ids)} hotels in {destination}: {hotel_ids}")
+        print(f"✅ Found {len(hotel_ids)} hotels in {city_code}")
         return hotel_ids
     else:
         print("❌ Error fetching hotel IDs:", response.text)
         return None
 
-def fetch_hotel_offers(hotel_ids, access_token, check_in_date, check_out_date, adults):
-    """Fetch hotel offers in batches of 10 hotels at a time."""
-    hotel_offers_url = f"{AMADEUS_BASE_URL}/v3/shopping/hotel-offers"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    
+def load_hotel_ids_from_db(city_code):
+    """Return (hotel_ids, oldest_update_epoch) from city_hotel_ids, or (None, None)."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                # UNIX_TIMESTAMP returns epoch seconds whatever the DB or app server time zone
+                cur.execute(
+                    "SELECT hotel_id, UNIX_TIMESTAMP(updated_at) AS updated_at FROM city_hotel_ids "
+                    "WHERE city_code = %s ORDER BY hotel_id",
+                    (city_code,)
+                )
+                rows = cur.fetchall()
+    except Exception as e:
+        print(f"[DB Error fetching hotel IDs]: {e}")
+        return None, None
+
+    if not rows:
+        return None, None
+    oldest = min(row['updated_at'] for row in rows)
+    return [row['hotel_id'] for row in rows], float(oldest)
+
+def save_hotel_ids_to_db(city_code, hotel_ids):
+    """Replace the stored hotel list for a city in a single transaction."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM city_hotel_ids WHERE city_code = %s", (city_code,))
+                if hotel_ids:
+                    cur.executemany(
+                        "INSERT INTO city_hotel_ids (city_code, hotel_id) VALUES (%s, %s)",
+                        [(city_code, hotel_id) for hotel_id in hotel_ids]
+                    )
+            conn.commit()
+    except Exception as e:
+        print(f"[DB Error saving hotel IDs]: {e}")
+
+def refresh_hotel_ids(city_code, access_token=None):
+    """Fetch a city's hotel list from Amadeus and store it in the cache and DB."""
+    hotel_ids = fetch_hotel_ids_from_amadeus(city_code, access_token or get_amadeus_token())
+    if hotel_ids is None:
+        return None
+    if hotel_ids:
+        hotel_ids_cache.set(city_code, {"ids": hotel_ids, "fetchedAt": time.time()})
+    else:
+        hotel_ids_cache.set_negative(city_code)
+    save_hotel_ids_to_db(city_code, hotel_ids)
+    return hotel_ids
+
+def _background_refresh(city_code):
+    try:
+        try:
+            refreshed = refresh_hotel_ids(city_code) is not None
+        except Exception as e:
+            print(f"❌ Background refresh of hotel IDs for {city_code} failed: {e}")
+            refreshed = False
+        if not refreshed:
+            # Keep serving the old list, but don't schedule another refresh on every request
+            found, entry = hotel_ids_cache.lookup(city_code)
+            if found and entry is not None:
+                hotel_ids_cache.set(city_code, {**entry, "retryAt": time.time() + HOTEL_IDS_RETRY_AFTER})
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(city_code)
+
+def schedule_hotel_ids_refresh(city_code):
+    """Refresh a city's hotel list off the request path, at most once at a time."""
+    with _refresh_lock:
+        if city_code in _refreshing:
+            return
+        _refreshing.add(city_code)
+    _refresh_executor.submit(_background_refresh, city_code)
+
+def get_hotel_ids(destination, access_token):
+    """Return hotel IDs for a city from the cache, then the DB, then Amadeus.
+
+    Lists older than HOTEL_IDS_REFRESH_AFTER are served as-is while a
+    background refresh replaces them.
+    """
+    city_code = destination.upper()
+
+    found, entry = hotel_ids_cache.lookup(city_code)
+    if not found:
+        hotel_ids, fetched_at = load_hotel_ids_from_db(city_code)
+        if hotel_ids:
+            entry = {"ids": hotel_ids, "fetchedAt": fetched_at}
+            hotel_ids_cache.set(city_code, entry)
+        else:
+            return refresh_hotel_ids(city_code, access_token)
+
+    if entry is None:
+        return None
+    now = time.time()
+    if now - entry["fetchedAt"] > HOTEL_IDS_REFRESH_AFTER and now >= entry.get("retryAt", 0):
+        schedule_hotel_ids_refresh(city_code)
+    return entry["ids"]
+
+def fetch_hotel_offer_batch(batch, access_token, check_in_date, check_out_date, adults, timeout):
+    """Fetch offers for one batch of hotel IDs. Raises on a non-200 response."""
+    params = {
+        "hotelIds": ",".join(batch),
+        "checkInDate": check_in_date,
+        "checkOutDate": check_out_date,
+        "adults": adults
+    }
+
+    response = amadeus_get("/v3/shopping/hotel-offers", access_token, params=params, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text}")
+    return response.json().get("data", [])
+
+def fetch_hotel_offers(hotel_ids, access_token, check_in_date, check_out_date, adults,
+                       max_workers=HOTEL_OFFERS_CONCURRENCY, deadline=HOTEL_OFFERS_DEADLINE):
+    """Fetch hotel offers in batches of 10 hotels, several batches at a time.
+
+    Batches still running after ``deadline`` seconds are dropped. Returns
+    ``(hotel_offers, skipped_batches)`` where each skipped batch lists its
+    hotel IDs and the reason it was left out.
+    """
+
     if not hotel_ids:
         print("❌ No hotel IDs found.")
-        return []
+        return [], []
 
-    hotel_offers = []
     batch_size = 10  # Amadeus allows a limited number per request
-    
-    for i in range(0, len(hotel_ids), batch_size):
-        batch = hotel_ids[i:i + batch_size]
-        params = {
-            "hotelIds": ",".join(batch),
-            "checkInDate": check_in_date,
-            "checkOutDate": check_out_date,
-            "adults": adults
-        }
-
-        response = requests.get(hotel_offers_url, headers=headers, params=params)
-        
-        if response.status_code == 200:
-            offers = response.json().get("data", [])
-            print(f"✅ Batch {i//batch_size + 1}: Retrieved {len(offers)} offers.")
-            hotel_offers.extend(offers)
-        else:
-            print(f"❌ Error fetching hotel offers for batch {i//batch_size + 1}: {response.text}")
+    batches = {
+        i // batch_size + 1: hotel_ids[i:i + batch_size]
+        for i in range(0, len(hotel_ids), batch_size)
+    }
+    calls = {
+        number: (lambda batch=batch: fetch_hotel_offer_batch(
+            batch, access_token, check_in_date, check_out_date, adults, deadline))
+        for number, batch in batches.items()
+    }
+    results, errors, pending = run_concurrently(calls, max_workers, timeout=deadline)
+
+    hotel_offers = []
+    for number in sorted(results):
+        print(f"✅ Batch {number}: Retrieved {len(results[number])} offers.")
+        hotel_offers.extend(results[number])
+
+    skipped_batches = []
+    for number, error in sorted(errors.items()):
+        print(f"❌ Error fetching hotel offers for batch {number}: {error}")
+        skipped_batches.append({"batch": number, "hotelIds": batches[number], "reason": str(error)})
+    for number in sorted(pending):
+        print(f"❌ Batch {number} missed the {deadline}s deadline")
+        skipped_batches.append({"batch": number, "hotelIds": batches[number], "reason": "deadline exceeded"})
 
-    print(f"✅ Total offers fetched: {len(hotel_offers)}")
-    return hotel_offers
+    print(f"✅ Total offers fetched: {len(hotel_offers)} ({len(skipped_batches)} batches skipped)")
+    return hotel_offers, skipped_batches
 
 @bp.route('/search', methods=['GET'])
 def search_holiday_packages():
@@ -99,6 +211,6 @@ def search_holiday_packages():
     if not hotel_ids or len(hotel_ids) == 0:
         return jsonify({"error": "No hotels found for the given destination"}), 404
 
-    hotel_offers = fetch_hotel_offers(hotel_ids, access_token, check_in_date, check_out_date, adults)
+    hotel_offers, skipped_batches = fetch_hotel_offers(hotel_ids, access_token, check_in_date, check_out_date, adults)
     
-    return jsonify({"hotels": hotel_offers})
+    return jsonify({"hotels": hotel_offers, "skippedBatches": skipped_batches})
@@ -1,34 +1,59 @@
 from flask import Blueprint, request, jsonify
 import requests
 import os
-import urllib.parse
+from my_utils.amadeus_client import get_amadeus_token, amadeus_get
+from my_utils.concurrency import run_concurrently
 
 bp = Blueprint('packages', __name__)
 
-# Amadeus API credentials
-AMADEUS_CLIENT_ID = os.environ.get('AMADEUS_CLIENT_ID', "LU7IEumxc5eFAYlRJKRZ88RfSuCvP6ql")
-AMADEUS_CLIENT_SECRET = os.environ.get('AMADEUS_CLIENT_SECRET', "G3JqkJS4Q5gboLUQ")
-AMADEUS_BASE_URL = "https://test.api.amadeus.com"
+# Shared deadline (seconds) for the concurrent flight and hotel searches
+PACKAGE_DEADLINE = float(os.environ.get('PACKAGE_DEADLINE', 10))
+# Strings accepted for boolean request fields; anything else is a 400
+FLAG_VALUES = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+def search_package_flights(token, origin, destination, departure_date, return_date, adults, timeout):
+    flight_params = {
+        'originLocationCode': origin,
+        'destinationLocationCode': destination,
+        'departureDate': departure_date,
+        'returnDate': return_date,
+        'adults': adults,
+        'max': 3
+    }
+    flight_resp = amadeus_get('/v2/shopping/flight-offers', token, params=flight_params, timeout=timeout)
+    flight_resp.raise_for_status()
+    return flight_resp.json().get('data', [])
 
 
-def get_amadeus_token():
-    """Obtain Amadeus API access token."""
-    auth_url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    data = {
-        "grant_type": "client_credentials",
-        "client_id": AMADEUS_CLIENT_ID,
-        "client_secret": AMADEUS_CLIENT_SECRET
+def search_package_hotels(token, destination, departure_date, return_date, adults, timeout):
+    hotel_params = {
+        'cityCode': destination,
+        'checkInDate': departure_date,
+        'checkOutDate': return_date,
+        'adults': adults
     }
-    try:
-        response = requests.post(auth_url, headers=headers, data=urllib.parse.urlencode(data))
-        response.raise_for_status()
-        token = response.json().get("access_token")
-        print("✅ Access Token:", token)
-        return token
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error getting Amadeus token: {e}")
-        return None
+    hotel_resp = amadeus_get('/v2/shopping/hotel-offers', token, params=hotel_params, timeout=timeout)
+    hotel_resp.raise_for_status()
+    return hotel_resp.json().get('data', [])
+
+
+def describe_error(error):
+    details = {'error': str(error)}
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        try:
+            details['details'] = error.response.json()
+        except ValueError:
+            details['details'] = error.response.text
+    return details
+
+
+def parse_flag(value):
+    """JSON booleans, or "true"/"false", "1"/"0", "yes"/"no"; None for anything else."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return FLAG_VALUES.get(value.strip().lower())
+    return None
 
 
 @bp.route('/package', methods=['POST'])
@@ -39,50 +64,47 @@ def holiday_package():
     departure_date = data.get('departure_date')
     return_date = data.get('return_date')
     adults = data.get('adults', 1)
+    # Return whichever half finished when the other one fails or times out
+    allow_partial = parse_flag(data.get('allow_partial', False))
 
     if not origin or not destination or not departure_date or not return_date:
         return jsonify({'error': 'Missing required fields'}), 400
+    if allow_partial is None:
+        return jsonify({'error': "allow_partial must be true or false"}), 400
 
     try:
         token = get_amadeus_token()
         if not token:
             return jsonify({'error': 'Failed to authenticate with Amadeus API'}), 500
 
-        headers = {'Authorization': f'Bearer {token}'}
-
-        # Flight search
-        flight_url = f'{AMADEUS_BASE_URL}/v2/shopping/flight-offers'
-        flight_params = {
-            'originLocationCode': origin,
-            'destinationLocationCode': destination,
-            'departureDate': departure_date,
-            'returnDate': return_date,
-            'adults': adults,
-            'max': 3
-        }
-        flight_resp = requests.get(flight_url, headers=headers, params=flight_params)
-        flight_resp.raise_for_status()
-        flights = flight_resp.json().get('data', [])
-
-        # Hotel search
-        hotel_url = f'{AMADEUS_BASE_URL}/v2/shopping/hotel-offers'
-        hotel_params = {
-            'cityCode': destination,
-            'checkInDate': departure_date,
-            'checkOutDate': return_date,
-            'adults': adults
+        # Flight and hotel searches are independent: run both under one deadline
+        deadline = PACKAGE_DEADLINE
+        calls = {
+            'flights': lambda: search_package_flights(
+                token, origin, destination, departure_date, return_date, adults, deadline),
+            'hotels': lambda: search_package_hotels(
+                token, destination, departure_date, return_date, adults, deadline),
         }
-        hotel_resp = requests.get(hotel_url, headers=headers, params=hotel_params)
-        hotel_resp.raise_for_status()
-        hotels = hotel_resp.json().get('data', [])
+        results, errors, pending = run_concurrently(calls, max_workers=2, timeout=deadline)
+
+        failures = {key: describe_error(error) for key, error in errors.items()}
+        for key in pending:
+            failures[key] = {'error': f'Timed out after {deadline}s'}
 
-        return jsonify({
+        if failures and (not allow_partial or not results):
+            status = 504 if pending and not errors else 500
+            first = failures.get('flights') or failures.get('hotels')
+            return jsonify(dict(first, failed=sorted(failures))), status
+
+        response = {
             'destination': destination,
-            'flights': flights,
-            'hotels': hotels
-        })
+            'flights': results.get('flights', []),
+            'hotels': results.get('hotels', [])
+        }
+        if failures:
+            response['partial'] = True
+            response['errors'] = failures
+        return jsonify(response)
 
-    except requests.HTTPError as e:
-        return jsonify({'error': str(e), 'details': e.response.json()}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from database import get_connection
+from database import db_connection
 from werkzeug.security import generate_password_hash
 import random
 import smtplib
@@ -71,136 +71,132 @@ def register_user():
     otp = generate_otp()
     otp_expiry_time = datetime.now(timezone.utc) + timedelta(minutes=10)
 
-    connection = get_connection()
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT email FROM users WHERE email = %s", (email,))
-            if cursor.fetchone():
-                return jsonify({'error': 'Email already registered'}), 400
-
-            cursor.execute("SELECT phone FROM users WHERE phone = %s", (phone,))
-            if cursor.fetchone():
-                return jsonify({'error': 'Phone number already registered'}), 400
-
-            cursor.execute("DELETE FROM pending_registrations WHERE email = %s OR phone = %s", (email, phone))
-
-            sql = """
-                INSERT INTO pending_registrations 
-                (first_name, last_name, email, password_hash, phone, passport_number, date_of_birth, user_type, otp, otp_expiry_time)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(sql, (
-                first_name, last_name, email, password_hash, phone,
-                passport_number, date_of_birth, user_type, otp, otp_expiry_time
-            ))
-            connection.commit()
-
-        otp_sent = send_otp_email(email, otp) if otp_channel == 'email' else send_otp_sms(phone, otp)
-
-        if otp_sent:
-            return jsonify({
-                'message': f'OTP sent to your {otp_channel}',
-                'email': email
-            }), 200
-        else:
+    with db_connection() as connection:
+        try:
             with connection.cursor() as cursor:
-                cursor.execute("DELETE FROM pending_registrations WHERE email = %s OR phone = %s", (email, phone))
-                connection.commit()
-            return jsonify({'error': f'Failed to send OTP via {otp_channel}. Please try again.'}), 500
+                cursor.execute("SELECT email FROM users WHERE email = %s", (email,))
+                if cursor.fetchone():
+                    return jsonify({'error': 'Email already registered'}), 400
 
-    except Exception:
-        return jsonify({'error': 'Internal server error'}), 500
-    finally:
-        connection.close()
+                cursor.execute("SELECT phone FROM users WHERE phone = %s", (phone,))
+                if cursor.fetchone():
+                    return jsonify({'error': 'Phone number already registered'}), 400
 
-@bp.route('/verify-otp', methods=['POST'])
-def verify_otp():
-    connection = get_connection()
-    try:
-        data = request.json
-        email = data.get('email')
-        otp = data.get('otp')
+                cursor.execute("DELETE FROM pending_registrations WHERE email = %s OR phone = %s", (email, phone))
 
-        if not email or not otp:
-            return jsonify({'error': 'Email and OTP are required'}), 400
+                sql = """
+                    INSERT INTO pending_registrations 
+                    (first_name, last_name, email, password_hash, phone, passport_number, date_of_birth, user_type, otp, otp_expiry_time)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                cursor.execute(sql, (
+                    first_name, last_name, email, password_hash, phone,
+                    passport_number, date_of_birth, user_type, otp, otp_expiry_time
+                ))
+                connection.commit()
 
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT * FROM pending_registrations WHERE email = %s", (email,))
-            row = cursor.fetchone()
-            if not row:
-                return jsonify({'error': 'User not found or OTP expired'}), 404
+            otp_sent = send_otp_email(email, otp) if otp_channel == 'email' else send_otp_sms(phone, otp)
 
-            pending_user = row
-            db_otp = str(pending_user['otp']).zfill(6)
-            submitted_otp = str(otp).zfill(6)
+            if otp_sent:
+                return jsonify({
+                    'message': f'OTP sent to your {otp_channel}',
+                    'email': email
+                }), 200
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute("DELETE FROM pending_registrations WHERE email = %s OR phone = %s", (email, phone))
+                    connection.commit()
+                return jsonify({'error': f'Failed to send OTP via {otp_channel}. Please try again.'}), 500
 
-            if db_otp != submitted_otp:
-                return jsonify({'error': 'Invalid OTP'}), 400
+        except Exception:
+            return jsonify({'error': 'Internal server error'}), 500
 
-            expiry_time = pending_user.get('otp_expiry_time')
-            current_time = datetime.now(timezone.utc)
+@bp.route('/verify-otp', methods=['POST'])
+def verify_otp():
+    with db_connection() as connection:
+        try:
+            data = request.json
+            email = data.get('email')
+            otp = data.get('otp')
 
-            if expiry_time is None:
-                return jsonify({'error': 'OTP expiry not set'}), 500
+            if not email or not otp:
+                return jsonify({'error': 'Email and OTP are required'}), 400
 
-            if isinstance(expiry_time, str):
-                try:
-                    expiry_time = datetime.fromisoformat(expiry_time)
-                except ValueError:
-                    expiry_time = datetime.strptime(expiry_time, '%Y-%m-%d %H:%M:%S')
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT * FROM pending_registrations WHERE email = %s", (email,))
+                row = cursor.fetchone()
+                if not row:
+                    return jsonify({'error': 'User not found or OTP expired'}), 404
+
+                pending_user = row
+                db_otp = str(pending_user['otp']).zfill(6)
+                submitted_otp = str(otp).zfill(6)
+
+                if db_otp != submitted_otp:
+                    return jsonify({'error': 'Invalid OTP'}), 400
+
+                expiry_time = pending_user.get('otp_expiry_time')
+                current_time = datetime.now(timezone.utc)
+
+                if expiry_time is None:
+                    return jsonify({'error': 'OTP expiry not set'}), 500
+
+                if isinstance(expiry_time, str):
+                    try:
+                        expiry_time = datetime.fromisoformat(expiry_time)
+                    except ValueError:
+                        expiry_time = datetime.strptime(expiry_time, '%Y-%m-%d %H:%M:%S')
+
+                if current_time > expiry_time.replace(tzinfo=timezone.utc):
+                    return jsonify({'error': 'OTP expired'}), 400
+
+                # Check if passport_number already exists in users table
+                passport_number = pending_user.get('passport_number')
+                if passport_number:
+                    cursor.execute("SELECT passport_number FROM users WHERE passport_number = %s", (passport_number,))
+                    if cursor.fetchone():
+                        return jsonify({'error': 'Passport number already registered'}), 400
+
+                # Insert the user data into the users table
+                insert_query = """
+                    INSERT INTO users (first_name, last_name, email, password_hash, phone, passport_number, date_of_birth, user_type)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """
+                cursor.execute(insert_query, (
+                    pending_user['first_name'],
+                    pending_user['last_name'],
+                    pending_user['email'],
+                    pending_user['password_hash'],
+                    pending_user['phone'],
+                    pending_user['passport_number'],
+                    pending_user['date_of_birth'],
+                    pending_user['user_type']
+                ))
+
+                # Get the user_id of the newly created user
+                user_id = cursor.lastrowid  # Assuming auto-incremented user_id
+
+                # Insert the traveler data into the travelers table
+                insert_travelers_query = """
+                    INSERT INTO travelers (user_id, first_name, last_name, email, phone, order_id)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """
+                cursor.execute(insert_travelers_query, (
+                    user_id,
+                    pending_user['first_name'],
+                    pending_user['last_name'],
+                    pending_user['email'],
+                    pending_user['phone'],
+                    None  # order_id can be set later when there's a booking
+                ))
+
+                # Remove the pending registration from the pending_registrations table
+                cursor.execute("DELETE FROM pending_registrations WHERE email = %s", (email,))
+                connection.commit()
 
-            if current_time > expiry_time.replace(tzinfo=timezone.utc):
-                return jsonify({'error': 'OTP expired'}), 400
+            return jsonify({'message': 'OTP verified. Registration successful.'}), 200
 
-            # Check if passport_number already exists in users table
-            passport_number = pending_user.get('passport_number')
-            if passport_number:
-                cursor.execute("SELECT passport_number FROM users WHERE passport_number = %s", (passport_number,))
-                if cursor.fetchone():
-                    return jsonify({'error': 'Passport number already registered'}), 400
-
-            # Insert the user data into the users table
-            insert_query = """
-                INSERT INTO users (first_name, last_name, email, password_hash, phone, passport_number, date_of_birth, user_type)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(insert_query, (
-                pending_user['first_name'],
-                pending_user['last_name'],
-                pending_user['email'],
-                pending_user['password_hash'],
-                pending_user['phone'],
-                pending_user['passport_number'],
-                pending_user['date_of_birth'],
-                pending_user['user_type']
-            ))
-
-            # Get the user_id of the newly created user
-            user_id = cursor.lastrowid  # Assuming auto-incremented user_id
-
-            # Insert the traveler data into the travelers table
-            insert_travelers_query = """
-                INSERT INTO travelers (user_id, first_name, last_name, email, phone, order_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(insert_travelers_query, (
-                user_id,
-                pending_user['first_name'],
-                pending_user['last_name'],
-                pending_user['email'],
-                pending_user['phone'],
-                None  # order_id can be set later when there's a booking
-            ))
-
-            # Remove the pending registration from the pending_registrations table
-            cursor.execute("DELETE FROM pending_registrations WHERE email = %s", (email,))
-            connection.commit()
-
-        return jsonify({'message': 'OTP verified. Registration successful.'}), 200
-
-    except Exception as e:
-        logging.error(f"Error in OTP verification: {str(e)}")
-        logging.error(traceback.format_exc())
-        return jsonify({'error': 'Internal server error'}), 500
-    finally:
-        connection.close()
+        except Exception as e:
+            logging.error(f"Error in OTP verification: {str(e)}")
+            logging.error(traceback.format_exc())
+            return jsonify({'error': 'Internal server error'}), 500
@@ -140,14 +140,20 @@ CREATE TABLE bookings (
     user_id INT NOT NULL,
     service_type ENUM('flight', 'hotel', 'cab', 'package') NOT NULL,
     service_id INT NOT NULL,
-    booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    booking_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     total_amount DECIMAL(12,2) NOT NULL,
     currency CHAR(3) DEFAULT 'USD',
     status ENUM('pending', 'confirmed', 'canceled') DEFAULT 'pending',
     payment_status ENUM('unpaid', 'paid', 'refunded') DEFAULT 'unpaid',
     FOREIGN KEY (user_id) REFERENCES users(user_id),
     INDEX idx_booking_date (booking_date),
-    INDEX idx_service (service_type, service_id)
+    INDEX idx_service (service_type, service_id),
+    -- Keyset pagination of GET /bookings on (booking_date, booking_id), per filter;
+    -- InnoDB appends booking_id to idx_booking_date for the unfiltered listing
+    INDEX idx_user_booking_date (user_id, booking_date, booking_id),
+    INDEX idx_status_booking_date (status, booking_date, booking_id),
+    INDEX idx_payment_status_booking_date (payment_status, booking_date, booking_id),
+    INDEX idx_service_type_booking_date (service_type, booking_date, booking_id)
 ) ENGINE=InnoDB;
 
 -- PAYMENTS TABLE
@@ -200,6 +206,51 @@ CREATE TABLE flight_orders (
     INDEX idx_pnr (pnr)
 ) ENGINE=InnoDB;
 
+-- Normalized flight orders written by save_flight_order_to_db;
+-- migrations/001_air_orders.sql creates them on existing databases and backfills from flight_orders
+CREATE TABLE air_orders (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    flight_order_id VARCHAR(100) NOT NULL,
+    pnr VARCHAR(20) NOT NULL,
+    flight_offer_id VARCHAR(50),
+    user_id INT,
+    total_price DECIMAL(10, 2),
+    currency VARCHAR(10),
+    status ENUM('pending', 'confirmed', 'canceled') DEFAULT 'pending',
+    booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_flight_order_id (flight_order_id),
+    INDEX idx_pnr (pnr),
+    INDEX idx_user_booking_date (user_id, booking_date)
+) ENGINE=InnoDB;
+
+CREATE TABLE air_order_travelers (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    air_order_id BIGINT NOT NULL,
+    traveler_ref VARCHAR(10) NOT NULL,
+    first_name VARCHAR(100),
+    last_name VARCHAR(100),
+    email VARCHAR(255),
+    UNIQUE KEY uq_order_traveler (air_order_id, traveler_ref),
+    INDEX idx_email (email, air_order_id),
+    FOREIGN KEY (air_order_id) REFERENCES air_orders(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE air_order_segments (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    air_order_id BIGINT NOT NULL,
+    itinerary_index TINYINT UNSIGNED NOT NULL,
+    segment_index TINYINT UNSIGNED NOT NULL,
+    departure_airport VARCHAR(10) NOT NULL,
+    arrival_airport VARCHAR(10) NOT NULL,
+    departure_time DATETIME NOT NULL,
+    arrival_time DATETIME NOT NULL,
+    carrier_code VARCHAR(5),
+    flight_number VARCHAR(10),
+    UNIQUE KEY uq_order_segment (air_order_id, itinerary_index, segment_index),
+    INDEX idx_departure (departure_airport, departure_time),
+    FOREIGN KEY (air_order_id) REFERENCES air_orders(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 -- ITINERARIES TABLE
 CREATE TABLE itineraries (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -231,6 +282,14 @@ CREATE TABLE airport_countries (
     iata_code VARCHAR(10) PRIMARY KEY,
     country_code VARCHAR(5)
 );
+
+-- Amadeus hotel IDs per city code, used to skip the hotels/by-city lookup
+CREATE TABLE city_hotel_ids (
+    city_code CHAR(3) NOT NULL,
+    hotel_id VARCHAR(20) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (city_code, hotel_id)
+) ENGINE=InnoDB;
 CREATE TABLE travelers (
     traveler_id INT PRIMARY KEY AUTO_INCREMENT,
     user_id INT,
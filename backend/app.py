@@ -1,13 +1,16 @@
 from flask import Flask
 import os
-from flask_caching import Cache
+from my_utils.cache import cache
+from my_utils import tracing
 from Routes import user_routes, flight_routes, booking_routes, package_routes, hotels_routes, payment_routes
 
 app = Flask(__name__)
 app.config.from_pyfile('config.py')
 port = int(os.environ.get("PORT", 10000))
 # Configure caching
-cache = Cache(app, config={'CACHE_TYPE': 'simple'})
+cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache', 'CACHE_THRESHOLD': 2000})
+# Server-Timing header, per-request trace log line and GET /metrics
+tracing.init_app(app)
 
 # Register blueprints
 app.register_blueprint(user_routes.bp, url_prefix='/users')
@@ -0,0 +1,322 @@
+"""End-to-end benchmark for the Flask blueprints.
+
+Starts the backend in-process on a local port, points it at the fake
+Amadeus server (benchmarks/fake_amadeus.py, started here unless
+--amadeus-url is given) and a MySQL server taken from the MYSQL_* env
+vars, then drives each scenario with concurrent HTTP clients.
+
+For every scenario it reports throughput, p50/p95/p99 latency and the
+number of upstream Amadeus calls per request. Results are written as JSON
+so two runs can be compared:
+
+    MYSQL_HOST=127.0.0.1 MYSQL_USER=root MYSQL_PASSWORD=... MYSQL_SSL_CA= \\
+        python benchmarks/bench_endpoints.py --requests 200 --concurrency 8 --out before.json
+    python benchmarks/bench_endpoints.py --compare before.json after.json
+
+Load travel.sql and "SQL database.sql" into the local database first;
+DB-backed scenarios (bookings, users, create-order) report errors otherwise.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def future_date(days):
+    return (date.today() + timedelta(days=days)).isoformat()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Context:
+    """State shared by scenario request builders (e.g. an offer handle to book)."""
+
+    def __init__(self, base_url, cold):
+        self.base_url = base_url
+        self.cold = cold
+        self.counter = 0
+        self.lock = threading.Lock()
+        self.offer_handle = None
+
+    def next_index(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def search_date(self, offset=30):
+        # In cold mode every request searches a different day so caches never hit
+        if self.cold:
+            return future_date(offset + self.next_index() % 300)
+        return future_date(offset)
+
+
+def traveler(index):
+    return {
+        "id": "1",
+        "dateOfBirth": "1990-01-01",
+        "gender": "MALE",
+        "name": {"firstName": "BENCH", "lastName": f"USER{index}"},
+        "contact": {
+            "emailAddress": f"bench{index}@example.com",
+            "phones": [{"deviceType": "MOBILE", "countryCallingCode": "91", "number": "9999999999"}]
+        }
+    }
+
+
+# Each scenario builds (method, path, kwargs) for one request
+SCENARIOS = {
+    "flights_oneway": lambda ctx: ("GET", "/flights/real-time", {"params": {
+        "from": "DEL", "to": "BOM", "date": ctx.search_date(), "adults": 1, "max": 20}}),
+    "flights_roundtrip": lambda ctx: ("GET", "/flights/real-time", {"params": {
+        "from": "DEL", "to": "BOM", "date": ctx.search_date(), "returnDate": ctx.search_date(40),
+        "tripType": "roundtrip", "adults": 1, "max": 20}}),
+    "flights_multicity": lambda ctx: ("GET", "/flights/real-time", {"params": {
+        "tripType": "multicity", "adults": 1, "max": 10,
+        "segments": json.dumps([
+            {"from": "DEL", "to": "BOM", "date": ctx.search_date()},
+            {"from": "BOM", "to": "GOI", "date": ctx.search_date(33)},
+            {"from": "GOI", "to": "BLR", "date": ctx.search_date(36)},
+            {"from": "BLR", "to": "DEL", "date": ctx.search_date(39)},
+        ])}}),
+    "hotels_search": lambda ctx: ("GET", "/hotels/search", {"params": {
+        "destination": "PAR", "check_in_date": ctx.search_date(), "check_out_date": ctx.search_date(34), "adults": 1}}),
+    "packages_package": lambda ctx: ("POST", "/packages/package", {"json": {
+        "origin": "DEL", "destination": "PAR", "departure_date": ctx.search_date(),
+        "return_date": ctx.search_date(37), "adults": 1}}),
+    "bookings_list": lambda ctx: ("GET", "/bookings/", {"params": {"user_id": 1}}),
+    "users_register": lambda ctx: ("POST", "/users/register", {"json": {
+        "first_name": "Bench", "last_name": "User", "password": "bench-pass",
+        "email": f"bench-{uuid.uuid4().hex[:12]}@example.com",
+        "phone": f"9{uuid.uuid4().int % 10**9:09d}"}}),
+    "flights_create_order": lambda ctx: ("POST", "/flights/create-order", {"json": {"data": {
+        "type": "flight-order", "offerHandle": ctx.offer_handle,
+        "travelers": [traveler(ctx.next_index())]}}}),
+}
+
+
+def prepare(scenario, ctx, session):
+    """Fetch whatever a scenario needs before timing starts."""
+    if scenario == "flights_create_order":
+        response = session.get(ctx.base_url + "/flights/real-time",
+                               params={"from": "DEL", "to": "BOM", "date": future_date(30), "max": 5})
+        response.raise_for_status()
+        ctx.offer_handle = response.json()["flightOffers"][0]["offerHandle"]
+
+
+def upstream_stats(amadeus_url):
+    try:
+        return requests.get(amadeus_url + "/__stats", timeout=5).json()
+    except requests.RequestException:
+        return {}
+
+
+def reset_upstream_stats(amadeus_url):
+    try:
+        requests.post(amadeus_url + "/__reset", timeout=5)
+    except requests.RequestException:
+        pass
+
+
+def run_scenario(name, ctx, amadeus_url, total_requests, concurrency, warmup):
+    build = SCENARIOS[name]
+    setup_session = requests.Session()
+    prepare(name, ctx, setup_session)
+
+    for _ in range(warmup):
+        method, path, kwargs = build(ctx)
+        setup_session.request(method, ctx.base_url + path, timeout=120, **kwargs)
+
+    reset_upstream_stats(amadeus_url)
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    remaining = [total_requests]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            method, path, kwargs = build(ctx)
+            started = time.perf_counter()
+            try:
+                status = session.request(method, ctx.base_url + path, timeout=120, **kwargs).status_code
+            except requests.RequestException:
+                status = "exception"
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed_ms)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    upstream = upstream_stats(amadeus_url)
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else None,
+        "p50_ms": round(percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "upstream_calls_per_request": {
+            endpoint: round(count / len(latencies), 3) for endpoint, count in sorted(upstream.items())
+        } if latencies else {},
+    }
+
+
+def start_fake_amadeus(port, latency_ms, jitter_ms, error_rate):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_amadeus.py"), "--port", str(port),
+         "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms), "--error-rate", str(error_rate)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(url + "/__stats", timeout=1)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("fake Amadeus server did not start")
+
+
+def start_backend(port):
+    # Imported late so AMADEUS_BASE_URL is already set when the client module loads
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Per-request access logs would dominate the run and skew latencies
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{'scenario':<22}{'metric':<24}{'old':>12}{'new':>12}{'change':>10}")
+    # Only scenarios measured in both runs are comparable
+    for name in sorted(set(old["scenarios"]) & set(new["scenarios"])):
+        before = old["scenarios"].get(name, {})
+        after = new["scenarios"].get(name, {})
+        metrics = ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "errors"]
+        calls = set(before.get("upstream_calls_per_request", {})) | set(after.get("upstream_calls_per_request", {}))
+        rows = [(m, before.get(m), after.get(m)) for m in metrics]
+        rows += [(f"calls:{c}", before.get("upstream_calls_per_request", {}).get(c, 0),
+                  after.get("upstream_calls_per_request", {}).get(c, 0)) for c in sorted(calls)]
+        for metric, a, b in rows:
+            change = f"{(b - a) / a * 100:+.1f}%" if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a else ""
+            print(f"{name:<22}{metric:<24}{str(a):>12}{str(b):>12}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset to run")
+    parser.add_argument("--requests", type=int, default=100, help="timed requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="vary search dates so response caches never hit")
+    parser.add_argument("--port", type=int, default=5099, help="port for the backend under test")
+    parser.add_argument("--amadeus-url", help="use an already running fake Amadeus server")
+    parser.add_argument("--amadeus-port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    fake = None
+    amadeus_url = args.amadeus_url
+    if not amadeus_url:
+        fake, amadeus_url = start_fake_amadeus(args.amadeus_port, args.latency_ms, args.jitter_ms, args.error_rate)
+    os.environ["AMADEUS_BASE_URL"] = amadeus_url
+
+    try:
+        server, base_url = start_backend(args.port)
+        ctx = Context(base_url, args.cold)
+        results = {}
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            print(f"running {name}...", file=sys.stderr)
+            try:
+                results[name] = run_scenario(name, ctx, amadeus_url, args.requests, args.concurrency, args.warmup)
+            except Exception as e:
+                results[name] = {"error": str(e)}
+        server.shutdown()
+    finally:
+        if fake is not None:
+            fake.terminate()
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "cold": args.cold,
+            "upstream_latency_ms": args.latency_ms,
+            "upstream_jitter_ms": args.jitter_ms,
+            "upstream_error_rate": args.error_rate,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
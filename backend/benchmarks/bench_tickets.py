@@ -0,0 +1,95 @@
+"""Ticket PDF throughput benchmark.
+
+Renders tickets for a sample order built from benchmarks/fixtures and
+reports orders/second, one at a time and as a concurrent batch (the way
+the ticket job pool runs them). Each order renders one page per traveler:
+
+    python benchmarks/bench_tickets.py --tickets 200 --workers 2 --travelers 5 --per-traveler
+"""
+import argparse
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, BACKEND_DIR)
+
+from my_utils.pdf_generator import generate_ticket_pdf  # noqa: E402
+
+
+def sample_order(travelers, legs):
+    """A created order like the one Amadeus returns, with ``travelers`` passengers and ``legs`` itineraries."""
+    with open(os.path.join(FIXTURES_DIR, "flight_order.json"), encoding="utf-8") as f:
+        order = json.load(f)["data"]
+    with open(os.path.join(FIXTURES_DIR, "flight_offers.json"), encoding="utf-8") as f:
+        offer = json.load(f)["data"][0]
+
+    offer["itineraries"] = [copy.deepcopy(offer["itineraries"][0]) for _ in range(legs)]
+    order["flightOffers"] = [offer]
+    order["travelers"] = [
+        {"id": str(i + 1), "name": {"firstName": "BENCH", "lastName": f"TRAVELER{i + 1}"}}
+        for i in range(travelers)
+    ]
+    return order
+
+
+def numbered(order, index):
+    """Copy of ``order`` with a unique ID so every render writes its own file."""
+    ticket = dict(order)
+    ticket["id"] = f"{order['id']}{index}"
+    return ticket
+
+
+def run(order, tickets, workers, out_dir, per_traveler=False):
+    started = time.perf_counter()
+    if workers <= 1:
+        for i in range(tickets):
+            generate_ticket_pdf(numbered(order, i), save_path=out_dir, per_traveler=per_traveler)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda i: generate_ticket_pdf(numbered(order, i), save_path=out_dir,
+                                                           per_traveler=per_traveler), range(tickets)))
+    elapsed = time.perf_counter() - started
+    return {"tickets": tickets, "workers": workers, "seconds": round(elapsed, 3),
+            "tickets_per_second": round(tickets / elapsed, 1), "ms_per_ticket": round(elapsed / tickets * 1000, 2),
+            "pages_per_second": round(tickets * len(order["travelers"]) / elapsed, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("TICKET_WORKERS", 2)),
+                        help="threads for the batch run")
+    parser.add_argument("--travelers", type=int, default=1)
+    parser.add_argument("--per-traveler", action="store_true", help="one file per traveler instead of one multi-page PDF")
+    parser.add_argument("--legs", type=int, default=1, help="itineraries per order (2 = round trip)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated PDFs and print their directory")
+    args = parser.parse_args()
+
+    order = sample_order(args.travelers, args.legs)
+    out_dir = tempfile.mkdtemp(prefix="bench-tickets-")
+    try:
+        # First render pays one-off import and font costs; keep it out of the numbers
+        generate_ticket_pdf(numbered(order, "warmup"), save_path=out_dir)
+        results = {
+            "single": run(order, args.tickets, 1, out_dir, args.per_traveler),
+            "batch": run(order, args.tickets, args.workers, out_dir, args.per_traveler),
+        }
+    finally:
+        if args.keep:
+            print(f"PDFs kept in {out_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    print(json.dumps({"travelers": args.travelers, "legs": args.legs, "per_traveler": args.per_traveler,
+                      "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""Local stand-in for the Amadeus endpoints used in Routes/.
+
+Replays the JSON fixtures in benchmarks/fixtures with configurable latency
+and error injection, so /flights, /hotels and /packages can be load-tested
+without spending Amadeus quota. Point the backend at it with:
+
+    python benchmarks/fake_amadeus.py --port 8089 --latency-ms 150 --jitter-ms 50
+    AMADEUS_BASE_URL=http://127.0.0.1:8089 python app.py
+
+Fixtures can be filled from real responses: run with --record-from
+https://test.api.amadeus.com and every call is proxied upstream. Each
+response is saved under fixtures/recorded/ keyed by the request, and is
+replayed verbatim when the same request is made later. It is also merged
+into the endpoint's fixture (new locations, airlines and hotels are added
+next to the existing ones) so other requests are synthesized from it.
+
+GET /__stats returns per-endpoint call counts; POST /__reset clears them.
+"""
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+import requests
+from flask import Flask, jsonify, request
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+app = Flask(__name__)
+
+settings = {
+    "latency_ms": float(os.environ.get("FAKE_AMADEUS_LATENCY_MS", 0)),
+    "jitter_ms": float(os.environ.get("FAKE_AMADEUS_JITTER_MS", 0)),
+    "error_rate": float(os.environ.get("FAKE_AMADEUS_ERROR_RATE", 0)),
+    "fixtures_dir": os.environ.get("FAKE_AMADEUS_FIXTURES", FIXTURES_DIR),
+    "record_from": None,
+}
+
+_stats_lock = threading.Lock()
+call_counts = Counter()
+_fixture_cache = {}
+
+# Endpoint name -> fixture file, used for both replay and recording
+FIXTURES = {
+    "token": "token.json",
+    "flight_offers": "flight_offers.json",
+    "locations": "locations.json",
+    "airlines": "airlines.json",
+    "hotels_by_city": "hotels_by_city.json",
+    "hotel_offers": "hotel_offer.json",
+    "seatmaps": "seatmaps.json",
+    "flight_orders": "flight_order.json",
+}
+
+
+def fixture(name):
+    """Return a deep copy of a fixture so handlers can edit it freely."""
+    if name not in _fixture_cache:
+        with open(os.path.join(settings["fixtures_dir"], FIXTURES[name]), encoding="utf-8") as f:
+            _fixture_cache[name] = json.load(f)
+    return copy.deepcopy(_fixture_cache[name])
+
+
+def merge_items(key):
+    """Merger for list fixtures: recorded items replace those with the same ``key``, the rest are kept."""
+    def merge(current, recorded):
+        items = {item.get(key): item for item in current.get("data", [])}
+        items.update((item[key], item) for item in recorded.get("data", []) if key in item)
+        merged = dict(current)
+        merged["data"] = list(items.values())
+        merged["meta"] = {"count": len(merged["data"])}
+        return merged
+    return merge
+
+
+def replace_if_data(current, recorded):
+    return recorded if recorded.get("data") else current
+
+
+def first_hotel_offer(current, recorded):
+    # hotel_offer.json is the single offer hotel_offers() copies for every hotel ID
+    offers = recorded.get("data") or []
+    return offers[0] if offers else current
+
+
+def add_location(current, recorded):
+    location = recorded.get("data")
+    return merge_items("id")(current, {"data": [location]}) if location else current
+
+
+# Endpoint name -> (fixture it updates, how a recorded response is folded into it)
+RECORDERS = {
+    "flight_offers": ("flight_offers", replace_if_data),
+    "locations": ("locations", merge_items("id")),
+    "location_by_id": ("locations", add_location),
+    "airlines": ("airlines", merge_items("iataCode")),
+    "hotels_by_city": ("hotels_by_city", merge_items("hotelId")),
+    "hotel_offers": ("hotel_offers", first_hotel_offer),
+    "seatmaps": ("seatmaps", replace_if_data),
+    "flight_orders": ("flight_orders", replace_if_data),
+}
+
+_record_lock = threading.Lock()
+
+
+def request_key():
+    """Stable key for the current request: method, path, sorted query and JSON body."""
+    body = request.get_json(silent=True)
+    parts = [request.method, request.path, json.dumps(sorted(request.args.items(multi=True))),
+             json.dumps(body, sort_keys=True) if body is not None else ""]
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def recording_path(name):
+    return os.path.join(settings["fixtures_dir"], "recorded", name, f"{request_key()}.json")
+
+
+def load_recording(name):
+    """The recorded ``(payload, status)`` for exactly this request, or None."""
+    path = recording_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    return saved["body"], saved["status"]
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def record(name, payload, status):
+    """Save a proxied response for this exact request and fold successful ones into the fixture."""
+    write_json(recording_path(name), {"status": status, "body": payload})
+    if status >= 300 or name not in RECORDERS:
+        return
+    fixture_name, merge = RECORDERS[name]
+    with _record_lock:
+        merged = merge(fixture(fixture_name), payload)
+        write_json(os.path.join(settings["fixtures_dir"], FIXTURES[fixture_name]), merged)
+        _fixture_cache.pop(fixture_name, None)
+
+
+def simulate(name):
+    """Count the call, sleep for the configured latency and maybe inject an error.
+
+    Returns an error response to send instead of the fixture, or None.
+    """
+    with _stats_lock:
+        call_counts[name] += 1
+
+    delay = settings["latency_ms"] + random.uniform(-1, 1) * settings["jitter_ms"]
+    if delay > 0:
+        time.sleep(delay / 1000.0)
+
+    if name != "token" and random.random() < settings["error_rate"]:
+        return jsonify({"errors": [{"status": 500, "code": 141, "title": "SYSTEM ERROR HAS OCCURRED",
+                                    "detail": "Injected by fake_amadeus"}]}), 500
+    return None
+
+
+def replay_or_record(name, build):
+    """Serve ``build()`` from fixtures, or proxy upstream and save when recording.
+
+    ``build`` returns the JSON payload, or a ``(payload, status)`` tuple.
+    """
+    error = simulate(name)
+    if error is not None:
+        return error
+
+    upstream = settings["record_from"]
+    if upstream:
+        response = requests.request(
+            request.method, upstream + request.full_path.rstrip("?"),
+            headers={"Authorization": request.headers.get("Authorization", "")},
+            json=request.get_json(silent=True), data=request.form or None, timeout=60
+        )
+        # Tokens are never written to disk; upstream failures and throttling are not worth replaying
+        if name != "token" and (response.ok or response.status_code in (400, 404)):
+            record(name, response.json(), response.status_code)
+        return response.content, response.status_code, {"Content-Type": "application/json"}
+
+    recorded = load_recording(name)
+    if recorded is not None:
+        payload, status = recorded
+        return jsonify(payload), status
+
+    result = build()
+    if isinstance(result, tuple):
+        payload, status = result
+        return jsonify(payload), status
+    return jsonify(result)
+
+
+@app.route("/v1/security/oauth2/token", methods=["POST"])
+def token():
+    return replay_or_record("token", lambda: fixture("token"))
+
+
+@app.route("/v2/shopping/flight-offers", methods=["GET"])
+def flight_offers():
+    def build():
+        payload = fixture("flight_offers")
+        origin = request.args.get("originLocationCode", "DEL").upper()
+        destination = request.args.get("destinationLocationCode", "BOM").upper()
+        departure_date = request.args.get("departureDate", "2030-01-01")
+        return_date = request.args.get("returnDate")
+        limit = int(request.args.get("max", 250))
+
+        templates = payload["data"]
+        offers = []
+        # Cycle through the recorded offers until "max" is reached, like a busy route would
+        for i in range(limit):
+            offer = copy.deepcopy(templates[i % len(templates)])
+            offer["id"] = str(i + 1)
+            outbound = offer["itineraries"][0]
+            retarget(outbound["segments"], origin, destination, departure_date)
+            if return_date:
+                inbound = copy.deepcopy(outbound)
+                inbound["segments"] = list(reversed(inbound["segments"]))
+                for seg in inbound["segments"]:
+                    seg["departure"], seg["arrival"] = seg["arrival"], seg["departure"]
+                    seg["id"] = f"{seg['id']}R"
+                retarget(inbound["segments"], destination, origin, return_date)
+                offer["itineraries"].append(inbound)
+                offer["oneWay"] = False
+            offers.append(offer)
+        payload["data"] = offers
+        payload["meta"] = {"count": len(offers)}
+        return payload
+
+    return replay_or_record("flight_offers", build)
+
+
+def retarget(segments, origin, destination, date):
+    """Rewrite a recorded itinerary so it departs from origin and lands at destination on date."""
+    segments[0]["departure"]["iataCode"] = origin
+    segments[-1]["arrival"]["iataCode"] = destination
+    for seg in segments:
+        for side in ("departure", "arrival"):
+            seg[side]["at"] = date + seg[side]["at"][10:]
+
+
+@app.route("/v1/shopping/flight-offers/pricing", methods=["POST"])
+def flight_offers_pricing():
+    def build():
+        body = request.get_json(silent=True) or {}
+        offers = body.get("data", {}).get("flightOffers", [])
+        return {"data": {"type": "flight-offers-pricing", "flightOffers": offers,
+                         "bookingRequirements": {"emailAddressRequired": True, "mobilePhoneNumberRequired": True}}}
+
+    # Pricing echoes the posted offers, so there is no fixture to record into
+    return replay_or_record("pricing", build)
+
+
+@app.route("/v1/shopping/seatmaps", methods=["POST"])
+def seatmaps():
+    def build():
+        payload = fixture("seatmaps")
+        body = request.get_json(silent=True) or {}
+        offers = body.get("data", [])
+        template = payload["data"][0]
+        maps = []
+        # One seat map per segment of the posted offer
+        for offer in offers or [{}]:
+            for itinerary in offer.get("itineraries", [{"segments": [{}]}]):
+                for seg in itinerary.get("segments", [{}]):
+                    seat_map = copy.deepcopy(template)
+                    seat_map["segmentId"] = seg.get("id", template["segmentId"])
+                    seat_map["flightOfferId"] = offer.get("id", template["flightOfferId"])
+                    maps.append(seat_map)
+        payload["data"] = maps
+        payload["meta"] = {"count": len(maps)}
+        return payload
+
+    return replay_or_record("seatmaps", build)
+
+
+@app.route("/v1/reference-data/locations", methods=["GET"])
+def locations():
+    def build():
+        payload = fixture("locations")
+        keyword = request.args.get("keyword", "").upper()
+        limit = int(request.args.get("page[limit]", 10))
+        matches = [
+            loc for loc in payload["data"]
+            if loc["iataCode"].startswith(keyword) or loc["address"]["cityName"].startswith(keyword)
+            or loc["name"].startswith(keyword)
+        ]
+        payload["data"] = matches[:limit]
+        payload["meta"] = {"count": len(payload["data"])}
+        return payload
+
+    return replay_or_record("locations", build)
+
+
+@app.route("/v1/reference-data/locations/<location_id>", methods=["GET"])
+def location_by_id(location_id):
+    def build():
+        code = location_id.upper()
+        code = code[1:] if len(code) == 4 and code[0] in "AC" else code
+        for loc in fixture("locations")["data"]:
+            if loc["iataCode"] == code:
+                return {"meta": {}, "data": loc}
+        return {"errors": [{"status": 404, "code": 1797, "title": "NOT FOUND"}]}, 404
+
+    return replay_or_record("location_by_id", build)
+
+
+@app.route("/v1/reference-data/airlines", methods=["GET"])
+def airlines():
+    def build():
+        payload = fixture("airlines")
+        codes = {c.strip().upper() for c in request.args.get("airlineCodes", "").split(",") if c.strip()}
+        if codes:
+            payload["data"] = [a for a in payload["data"] if a["iataCode"] in codes]
+        payload["meta"] = {"count": len(payload["data"])}
+        return payload
+
+    return replay_or_record("airlines", build)
+
+
+@app.route("/v1/reference-data/locations/hotels/by-city", methods=["GET"])
+def hotels_by_city():
+    def build():
+        payload = fixture("hotels_by_city")
+        city = request.args.get("cityCode", "PAR").upper()
+        for hotel in payload["data"]:
+            hotel["iataCode"] = city
+        return payload
+
+    return replay_or_record("hotels_by_city", build)
+
+
+@app.route("/v3/shopping/hotel-offers", methods=["GET"])
+@app.route("/v2/shopping/hotel-offers", methods=["GET"])
+def hotel_offers():
+    def build():
+        template = fixture("hotel_offers")
+        hotel_ids = [h for h in request.args.get("hotelIds", "").split(",") if h]
+        if not hotel_ids:
+            # Old v2 city search used by /packages
+            hotel_ids = [h["hotelId"] for h in fixture("hotels_by_city")["data"][:10]]
+        offers = []
+        for hotel_id in hotel_ids:
+            offer = copy.deepcopy(template)
+            offer["hotel"]["hotelId"] = hotel_id
+            offer["hotel"]["cityCode"] = request.args.get("cityCode", offer["hotel"]["cityCode"])
+            for room_offer in offer["offers"]:
+                room_offer["checkInDate"] = request.args.get("checkInDate", room_offer["checkInDate"])
+                room_offer["checkOutDate"] = request.args.get("checkOutDate", room_offer["checkOutDate"])
+            offers.append(offer)
+        return {"data": offers}
+
+    return replay_or_record("hotel_offers", build)
+
+
+@app.route("/v1/booking/flight-orders", methods=["POST"])
+def flight_orders():
+    def build():
+        payload = fixture("flight_orders")
+        body = (request.get_json(silent=True) or {}).get("data", {})
+        order = payload["data"]
+        with _stats_lock:
+            number = call_counts["flight_orders"]
+        order["id"] = f"{order['id']}{number}"
+        order["associatedRecords"][0]["reference"] = f"KB{number:04d}"
+        order["flightOffers"] = body.get("flightOffers", [])
+        order["travelers"] = body.get("travelers", [])
+        return payload
+
+    return replay_or_record("flight_orders", build)
+
+
+@app.route("/__stats", methods=["GET"])
+def stats():
+    with _stats_lock:
+        return jsonify(dict(call_counts))
+
+
+@app.route("/__reset", methods=["POST"])
+def reset():
+    with _stats_lock:
+        call_counts.clear()
+    return jsonify({"status": "reset"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=settings["latency_ms"],
+                        help="mean delay added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=settings["jitter_ms"],
+                        help="uniform +/- jitter around the mean delay")
+    parser.add_argument("--error-rate", type=float, default=settings["error_rate"],
+                        help="fraction (0-1) of non-token calls answered with HTTP 500")
+    parser.add_argument("--fixtures", default=settings["fixtures_dir"], help="directory of fixture JSON files")
+    parser.add_argument("--record-from", help="proxy to this Amadeus base URL and save responses as fixtures")
+    args = parser.parse_args()
+
+    settings.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                    fixtures_dir=args.fixtures, record_from=args.record_from and args.record_from.rstrip("/"))
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
 #config.py
-MYSQL_HOST = 'trio-database.mysql.database.azure.com'
-MYSQL_USER = 'Trio' 
-MYSQL_PASSWORD = 'Qwerty@123'
-MYSQL_DB = 'Travels'
-SSL_CA_PATH = 'D:/projects/python/trio/backend/DigiCertGlobalRootCA.crt.pem'
+import os
+
+# Environment overrides let benchmarks run against a local MySQL
+MYSQL_HOST = os.environ.get('MYSQL_HOST', 'trio-database.mysql.database.azure.com')
+MYSQL_USER = os.environ.get('MYSQL_USER', 'Trio')
+MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD', 'Qwerty@123')
+MYSQL_DB = os.environ.get('MYSQL_DB', 'Travels')
+# Set MYSQL_SSL_CA to an empty string to connect without TLS (local servers)
+SSL_CA_PATH = os.environ.get('MYSQL_SSL_CA', 'D:/projects/python/trio/backend/DigiCertGlobalRootCA.crt.pem')
+
+# Connection pool (see database.py)
+DB_POOL_SIZE = 5            # connections kept open per worker
+DB_POOL_MAX_OVERFLOW = 10   # extra connections allowed under burst load
+DB_POOL_RECYCLE = 1800      # seconds before a connection is replaced
+DB_POOL_TIMEOUT = 30        # seconds to wait for a free connection
 
 # # Database configuration
 # MYSQL_HOST = 'localhost'
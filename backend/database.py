@@ -1,16 +1,85 @@
 import pymysql
+import re
+import time
+from contextlib import contextmanager
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
 from config import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB, SSL_CA_PATH
+from config import DB_POOL_SIZE, DB_POOL_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT
+from my_utils.tracing import record
 
-def get_connection():
+_QUERY_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+def query_name(query):
+   """Short metric name for a statement, e.g. "SELECT locations"."""
+   verb = query.split(None, 1)[0].upper() if query.strip() else "QUERY"
+   match = _QUERY_TABLE.search(query)
+   return f"{verb} {match.group(1)}" if match else verb
+
+class TracedDictCursor(pymysql.cursors.DictCursor):
+   """DictCursor that records every statement's duration on the current request trace."""
+
+   _in_executemany = False
+
+   def execute(self, query, args=None):
+      if self._in_executemany:
+         return super().execute(query, args)
+      started = time.perf_counter()
+      try:
+         return super().execute(query, args)
+      finally:
+         record("db", query_name(query), (time.perf_counter() - started) * 1000, rows=self.rowcount)
+
+   def executemany(self, query, args):
+      # pymysql runs non-INSERT batches as one execute() per row; record the batch as one span
+      started = time.perf_counter()
+      self._in_executemany = True
+      try:
+         return super().executemany(query, args)
+      finally:
+         self._in_executemany = False
+         record("db", query_name(query) + " (batch)", (time.perf_counter() - started) * 1000, rows=self.rowcount)
+
+def _connect():
    return pymysql.connect(
        host=MYSQL_HOST,
        user=MYSQL_USER,
        password=MYSQL_PASSWORD,
        db=MYSQL_DB,
-       ssl={'ca': SSL_CA_PATH},
-       cursorclass=pymysql.cursors.DictCursor
+       ssl={'ca': SSL_CA_PATH} if SSL_CA_PATH else None,
+       cursorclass=TracedDictCursor
    )
-   return connection
+
+# One pool per worker process. Connections are replaced after DB_POOL_RECYCLE
+# seconds so Azure's idle timeout never hands us a dead socket.
+pool = QueuePool(
+   _connect,
+   pool_size=DB_POOL_SIZE,
+   max_overflow=DB_POOL_MAX_OVERFLOW,
+   recycle=DB_POOL_RECYCLE,
+   timeout=DB_POOL_TIMEOUT
+)
+
+@event.listens_for(pool, "checkout")
+def _ping_on_checkout(dbapi_connection, connection_record, connection_proxy):
+   # Liveness check before reuse; the pool retries with a fresh connection
+   try:
+       dbapi_connection.ping(reconnect=False)
+   except Exception:
+       raise exc.DisconnectionError()
+
+def get_connection():
+   """Check a connection out of the pool. Calling close() returns it to the pool."""
+   return pool.connect()
+
+@contextmanager
+def db_connection():
+   """Pooled connection for a ``with`` block; rolled back and returned on exit."""
+   connection = get_connection()
+   try:
+       yield connection
+   finally:
+       connection.close()
 
 # import pymysql
 # from config import MYSQL_HOST, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB
@@ -0,0 +1,90 @@
+-- Normalized flight order storage.
+--
+-- flight_orders repeats the order, PNR, price and currency on every
+-- traveler x segment row. These tables store each order once, with its
+-- travelers and segments alongside. The names avoid the existing orders,
+-- travelers and segments tables, which belong to other flows.
+--
+-- Run once per database. The statements are idempotent: tables are only
+-- created if missing and the backfill skips orders that already exist.
+
+CREATE TABLE IF NOT EXISTS air_orders (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    flight_order_id VARCHAR(100) NOT NULL,
+    pnr VARCHAR(20) NOT NULL,
+    flight_offer_id VARCHAR(50),
+    user_id INT,
+    total_price DECIMAL(10, 2),
+    currency VARCHAR(10),
+    status ENUM('pending', 'confirmed', 'canceled') DEFAULT 'pending',
+    booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_flight_order_id (flight_order_id),
+    INDEX idx_pnr (pnr),
+    INDEX idx_user_booking_date (user_id, booking_date)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS air_order_travelers (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    air_order_id BIGINT NOT NULL,
+    traveler_ref VARCHAR(10) NOT NULL,
+    first_name VARCHAR(100),
+    last_name VARCHAR(100),
+    email VARCHAR(255),
+    UNIQUE KEY uq_order_traveler (air_order_id, traveler_ref),
+    INDEX idx_email (email, air_order_id),
+    FOREIGN KEY (air_order_id) REFERENCES air_orders(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS air_order_segments (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    air_order_id BIGINT NOT NULL,
+    itinerary_index TINYINT UNSIGNED NOT NULL,
+    segment_index TINYINT UNSIGNED NOT NULL,
+    departure_airport VARCHAR(10) NOT NULL,
+    arrival_airport VARCHAR(10) NOT NULL,
+    departure_time DATETIME NOT NULL,
+    arrival_time DATETIME NOT NULL,
+    carrier_code VARCHAR(5),
+    flight_number VARCHAR(10),
+    UNIQUE KEY uq_order_segment (air_order_id, itinerary_index, segment_index),
+    INDEX idx_departure (departure_airport, departure_time),
+    FOREIGN KEY (air_order_id) REFERENCES air_orders(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- Backfill from flight_orders (MySQL 8+ for ROW_NUMBER). The old rows do not
+-- record which itinerary a segment belonged to, so backfilled segments all
+-- get itinerary_index 0 and are numbered by departure time.
+INSERT INTO air_orders (flight_order_id, pnr, flight_offer_id, total_price, currency, status, booking_date)
+SELECT fo.flight_order_id, MIN(fo.pnr), MIN(fo.flight_offer_id), MAX(fo.total_price), MIN(fo.currency),
+       MIN(fo.status), MIN(fo.booking_date)
+FROM flight_orders fo
+LEFT JOIN air_orders ao ON ao.flight_order_id = fo.flight_order_id
+WHERE ao.id IS NULL
+GROUP BY fo.flight_order_id;
+
+INSERT IGNORE INTO air_order_travelers (air_order_id, traveler_ref, first_name, last_name, email)
+SELECT ao.id,
+       ROW_NUMBER() OVER (PARTITION BY ao.id ORDER BY t.traveler_last_name, t.traveler_first_name),
+       t.traveler_first_name, t.traveler_last_name, LOWER(NULLIF(t.traveler_email, ''))
+FROM (
+    SELECT DISTINCT flight_order_id, traveler_first_name, traveler_last_name, traveler_email
+    FROM flight_orders
+) t
+JOIN air_orders ao ON ao.flight_order_id = t.flight_order_id;
+
+INSERT IGNORE INTO air_order_segments (
+    air_order_id, itinerary_index, segment_index, departure_airport, arrival_airport, departure_time, arrival_time
+)
+SELECT ao.id, 0,
+       ROW_NUMBER() OVER (PARTITION BY ao.id ORDER BY s.departure_time) - 1,
+       s.departure_airport, s.arrival_airport, s.departure_time, s.arrival_time
+FROM (
+    SELECT DISTINCT flight_order_id, departure_airport, arrival_airport, departure_time, arrival_time
+    FROM flight_orders
+    WHERE departure_airport <> '' AND arrival_airport <> '' AND departure_time IS NOT NULL AND arrival_time IS NOT NULL
+) s
+JOIN air_orders ao ON ao.flight_order_id = s.flight_order_id;
+
+-- flight_orders is no longer written by the application. Keep it until the
+-- backfill has been checked, then drop it:
+-- DROP TABLE flight_orders;
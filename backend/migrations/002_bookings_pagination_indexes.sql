@@ -0,0 +1,13 @@
+-- Composite indexes behind the keyset-paginated GET /bookings.
+--
+-- Each filter column is followed by the (booking_date, booking_id) sort key,
+-- so a filtered page is one index range scan in sort order, with no
+-- filesort. The unfiltered listing uses the existing idx_booking_date;
+-- InnoDB appends the primary key (booking_id) to every secondary index.
+-- travel.sql already has these for new databases.
+
+ALTER TABLE bookings
+    ADD INDEX idx_user_booking_date (user_id, booking_date, booking_id),
+    ADD INDEX idx_status_booking_date (status, booking_date, booking_id),
+    ADD INDEX idx_payment_status_booking_date (payment_status, booking_date, booking_id),
+    ADD INDEX idx_service_type_booking_date (service_type, booking_date, booking_id);
@@ -0,0 +1,11 @@
+-- GET /bookings pages on (booking_date, booking_id); a NULL booking_date
+-- cannot be encoded in a cursor and would drop out of every page after the
+-- first, so the column becomes NOT NULL.
+--
+-- Rows without a date are backfilled with the epoch so they list last
+-- (oldest). travel.sql already declares the column NOT NULL for new databases.
+
+UPDATE bookings SET booking_date = '1970-01-01 00:00:00' WHERE booking_date IS NULL;
+
+ALTER TABLE bookings
+    MODIFY booking_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP;
@@ -0,0 +1,11 @@
+-- Amadeus hotel IDs per city code, read and written by GET /hotels so a
+-- search can skip the hotels/by-city lookup.
+--
+-- travel.sql already has this table for new databases.
+
+CREATE TABLE IF NOT EXISTS city_hotel_ids (
+    city_code CHAR(3) NOT NULL,
+    hotel_id VARCHAR(20) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (city_code, hotel_id)
+) ENGINE=InnoDB;
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from database import db_connection
+from my_utils.amadeus_client import get_amadeus_token
+from my_utils.reference_data import fetch_airport_country
+
+# Parallel Amadeus lookups and the overall request rate (per second) during a backfill
+AIRPORT_BACKFILL_CONCURRENCY = int(os.environ.get('AIRPORT_BACKFILL_CONCURRENCY', 8))
+AIRPORT_BACKFILL_RATE = float(os.environ.get('AIRPORT_BACKFILL_RATE', 10))
+# Rows buffered before one batched upsert
+AIRPORT_BACKFILL_BATCH = int(os.environ.get('AIRPORT_BACKFILL_BATCH', 200))
+# Attempts per code when Amadeus answers 429/5xx or the call errors
+AIRPORT_BACKFILL_ATTEMPTS = 3
+
+UPSERT_SQL = """
+    INSERT INTO airport_countries (iata_code, country_code) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE country_code = VALUES(country_code)
+"""
+
+
+class RateLimiter:
+    """Spaces calls evenly so no more than ``rate`` start per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def existing_airport_codes(iata_codes):
+    """The subset of ``iata_codes`` already stored in airport_countries."""
+    found = set()
+    codes = list(iata_codes)
+    for start in range(0, len(codes), 1000):
+        chunk = codes[start:start + 1000]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT iata_code FROM airport_countries WHERE iata_code IN ({placeholders})", tuple(chunk))
+                found.update(row['iata_code'] for row in cur.fetchall())
+    return found
+
+
+def save_airport_countries(rows):
+    """Upsert ``[(iata_code, country_code), ...]`` in one transaction."""
+    if not rows:
+        return
+    with db_connection() as conn:
+        try:
+            with conn.cursor() as cur:
+                cur.executemany(UPSERT_SQL, rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def _fetch_with_retries(iata_code, limiter):
+    delay = 1.0
+    for attempt in range(1, AIRPORT_BACKFILL_ATTEMPTS + 1):
+        limiter.acquire()
+        try:
+            return fetch_airport_country(iata_code, get_amadeus_token())
+        except Exception:
+            if attempt == AIRPORT_BACKFILL_ATTEMPTS:
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+
+def backfill_airports(iata_codes, concurrency=AIRPORT_BACKFILL_CONCURRENCY, rate=AIRPORT_BACKFILL_RATE,
+                      batch_size=AIRPORT_BACKFILL_BATCH, skip_existing=True, on_saved=None):
+    """Resolve airport countries through Amadeus and upsert them in batches.
+
+    Lookups run on ``concurrency`` threads, limited to ``rate`` calls per
+    second overall. Results are written every ``batch_size`` rows, so an
+    interrupted run keeps what it had flushed. With ``skip_existing`` a
+    re-run only fetches codes not in airport_countries yet, which makes the
+    backfill resumable. ``on_saved(rows)`` is called after each flush.
+
+    Returns a summary with the codes that were unknown to Amadeus or failed.
+    """
+    codes = sorted({code.strip().upper() for code in iata_codes if code and code.strip()})
+    skipped = existing_airport_codes(codes) if skip_existing else set()
+    pending = [code for code in codes if code not in skipped]
+
+    limiter = RateLimiter(rate)
+    buffer = []
+    summary = {"requested": len(codes), "skipped": len(skipped), "saved": 0, "unknown": [], "failed": []}
+
+    def flush():
+        rows = buffer[:]
+        buffer.clear()
+        try:
+            save_airport_countries(rows)
+        except Exception as e:
+            print(f"[AirportBackfill] Failed to save {len(rows)} rows: {e}")
+            summary["failed"].extend(code for code, _ in rows)
+            return
+        summary["saved"] += len(rows)
+        if on_saved:
+            on_saved(rows)
+        print(f"[AirportBackfill] Saved {summary['saved']}/{len(pending)}")
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {executor.submit(_fetch_with_retries, code, limiter): code for code in pending}
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                country = future.result()
+            except Exception as e:
+                print(f"[AirportBackfill] {code} failed: {e}")
+                summary["failed"].append(code)
+                continue
+            if country is None:
+                summary["unknown"].append(code)
+                continue
+            buffer.append((code, country))
+            if len(buffer) >= batch_size:
+                flush()
+
+    if buffer:
+        flush()
+    summary["unknown"].sort()
+    summary["failed"].sort()
+    return summary
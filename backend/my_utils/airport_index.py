@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from my_utils.periodic import PeriodicReload
+from my_utils.singleflight import SingleFlight
+
+# Reload the whole table this often (seconds) to pick up rows written by other workers
+AIRPORT_INDEX_REFRESH = int(os.environ.get('AIRPORT_INDEX_REFRESH', 3600))
+# Codes nobody could resolve are not looked up again for this long (seconds)
+AIRPORT_INDEX_NEGATIVE_TTL = int(os.environ.get('AIRPORT_INDEX_NEGATIVE_TTL', 600))
+# At most this many unknown codes are remembered; codes come from client-supplied offers
+AIRPORT_INDEX_MAX_UNKNOWN = int(os.environ.get('AIRPORT_INDEX_MAX_UNKNOWN', 10000))
+
+
+class AirportCountryIndex:
+    """In-process IATA code -> country code map.
+
+    ``load_all()`` returns the full mapping (the airport_countries table) and
+    is run by ``start()`` and then every AIRPORT_INDEX_REFRESH seconds in a
+    background thread. ``load_one(code)`` resolves a single code that is not
+    in the map yet (DB, then Amadeus) and returns None if it is unknown;
+    only that result is negatively cached, for at most max_unknown codes
+    (oldest dropped first). Errors raised by ``load_one``
+    propagate from ``get()`` and nothing is cached, so a brief upstream
+    outage is retried on the next lookup.
+
+    Hits are a plain dict lookup. Concurrent misses for the same code share
+    one ``load_one`` call.
+    """
+
+    def __init__(self, load_all, load_one, refresh_interval=AIRPORT_INDEX_REFRESH,
+                 negative_ttl=AIRPORT_INDEX_NEGATIVE_TTL, max_unknown=AIRPORT_INDEX_MAX_UNKNOWN):
+        self._load_all = load_all
+        self._load_one = load_one
+        self.refresh_interval = refresh_interval
+        self.negative_ttl = negative_ttl
+        self.max_unknown = max_unknown
+        self._countries = {}
+        # code -> expiry; every entry has the same TTL, so the oldest is first
+        self._unknown = OrderedDict()
+        self._unknown_lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._refresher = PeriodicReload("airport-index", self.reload, refresh_interval)
+        self.loaded_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Preload in the background and keep refreshing; safe to call on every request."""
+        self._refresher.start()
+
+    def reload(self):
+        try:
+            countries = self._load_all()
+        except Exception as e:
+            print(f"[AirportIndex] Reload failed: {e}")
+            return False
+        # Keep codes resolved since the query started; swap the dict in one assignment
+        merged = dict(self._countries)
+        merged.update(countries)
+        self._countries = merged
+        self.loaded_at = time.time()
+        print(f"[AirportIndex] Loaded {len(countries)} airports")
+        return True
+
+    def get(self, iata_code):
+        """Country code for an airport, or None if it cannot be resolved."""
+        country = self._countries.get(iata_code)
+        if country is not None:
+            self.hits += 1
+            return country
+
+        unknown_until = self._unknown.get(iata_code)
+        if unknown_until is not None:
+            if unknown_until > time.monotonic():
+                return None
+            with self._unknown_lock:
+                self._unknown.pop(iata_code, None)
+
+        self.misses += 1
+        return self._flight.do(iata_code, lambda: self._resolve(iata_code))
+
+    def _resolve(self, iata_code):
+        # A concurrent call may have filled it while we waited for the flight
+        country = self._countries.get(iata_code)
+        if country is not None:
+            return country
+
+        country = self._load_one(iata_code)
+        if country is None:
+            self._remember_unknown(iata_code)
+        else:
+            self.set(iata_code, country)
+        return country
+
+    def _remember_unknown(self, iata_code):
+        now = time.monotonic()
+        with self._unknown_lock:
+            self._unknown[iata_code] = now + self.negative_ttl
+            self._unknown.move_to_end(iata_code)
+            while self._unknown and (len(self._unknown) > self.max_unknown
+                                     or next(iter(self._unknown.values())) <= now):
+                self._unknown.popitem(last=False)
+
+    def set(self, iata_code, country_code):
+        self._countries[iata_code] = country_code
+        with self._unknown_lock:
+            self._unknown.pop(iata_code, None)
+
+    def stats(self):
+        return {
+            "size": len(self._countries),
+            "unknown": len(self._unknown),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loadedAt": self.loaded_at,
+            "refreshInterval": self.refresh_interval
+        }
@@ -0,0 +1,119 @@
+import os
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from my_utils.tracing import record
+
+AMADEUS_CLIENT_ID = os.environ.get('AMADEUS_CLIENT_ID', "LU7IEumxc5eFAYlRJKRZ88RfSuCvP6ql")
+AMADEUS_CLIENT_SECRET = os.environ.get('AMADEUS_CLIENT_SECRET', "G3JqkJS4Q5gboLUQ")
+# Point at benchmarks/fake_amadeus.py (e.g. http://127.0.0.1:8089) for load tests
+AMADEUS_BASE_URL = os.environ.get('AMADEUS_BASE_URL', "https://test.api.amadeus.com").rstrip("/")
+
+# Size of the keep-alive pool shared by every blueprint
+AMADEUS_POOL_SIZE = int(os.environ.get('AMADEUS_POOL_SIZE', 20))
+# Default timeout (seconds) for outbound Amadeus calls
+AMADEUS_TIMEOUT = float(os.environ.get('AMADEUS_TIMEOUT', 30))
+# Refresh the token this many seconds before Amadeus says it expires
+TOKEN_REFRESH_MARGIN = 60
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=AMADEUS_POOL_SIZE, pool_maxsize=AMADEUS_POOL_SIZE)
+session.mount("https://", _adapter)
+session.mount("http://", _adapter)
+
+_token_lock = threading.Lock()
+cached_token = None
+token_expiry = datetime.utcnow()
+
+
+def _token_is_fresh():
+    return cached_token and datetime.utcnow() < token_expiry
+
+
+def get_amadeus_token():
+    """Return a cached Amadeus access token, fetching a new one shortly before expiry."""
+    global cached_token, token_expiry
+
+    if _token_is_fresh():
+        return cached_token
+
+    with _token_lock:
+        # Another thread may have refreshed the token while we waited
+        if _token_is_fresh():
+            return cached_token
+
+        print("[TOKEN] Fetching new token...")
+        auth_url = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        data = {
+            "grant_type": "client_credentials",
+            "client_id": AMADEUS_CLIENT_ID,
+            "client_secret": AMADEUS_CLIENT_SECRET
+        }
+
+        try:
+            started = time.perf_counter()
+            response = session.post(auth_url, headers=headers, data=urllib.parse.urlencode(data),
+                                    timeout=AMADEUS_TIMEOUT)
+            record("amadeus", "POST /v1/security/oauth2/token", (time.perf_counter() - started) * 1000,
+                   status=response.status_code)
+            response.raise_for_status()
+
+            token_data = response.json()
+            expires_in = int(token_data.get("expires_in", 1800))
+
+            cached_token = token_data.get("access_token")
+            token_expiry = datetime.utcnow() + timedelta(seconds=max(expires_in - TOKEN_REFRESH_MARGIN, 0))
+            return cached_token
+
+        except requests.exceptions.RequestException as e:
+            print(f"[TOKEN] Error fetching token: {e}")
+            if e.response is not None:
+                print("[TOKEN] Response content:", e.response.text)
+            return None
+
+
+def amadeus_request(method, path, token=None, headers=None, **kwargs):
+    """Send a request to the Amadeus API over the shared keep-alive session.
+
+    ``path`` is relative to AMADEUS_BASE_URL. The bearer token is fetched from
+    the shared cache when not supplied. Returns the ``requests.Response``.
+    """
+    if token is None:
+        token = get_amadeus_token()
+
+    request_headers = {"Authorization": f"Bearer {token}"}
+    if headers:
+        request_headers.update(headers)
+    kwargs.setdefault("timeout", AMADEUS_TIMEOUT)
+
+    url = f"{AMADEUS_BASE_URL}{path}"
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, headers=request_headers, **kwargs)
+    except requests.exceptions.RequestException as e:
+        record("amadeus", f"{method} {endpoint_name(path)}", (time.perf_counter() - started) * 1000,
+               error=type(e).__name__)
+        raise
+    record("amadeus", f"{method} {endpoint_name(path)}", (time.perf_counter() - started) * 1000,
+           status=response.status_code, bytes=len(response.content))
+    return response
+
+
+def endpoint_name(path):
+    """Collapse IDs in a request path so metrics group by endpoint, e.g. /locations/{id}."""
+    return re.sub(r"/locations/(?!hotels/)[^/?]+$", "/locations/{id}", path.split("?", 1)[0])
+
+
+def amadeus_get(path, token=None, **kwargs):
+    return amadeus_request("GET", path, token=token, **kwargs)
+
+
+def amadeus_post(path, token=None, **kwargs):
+    return amadeus_request("POST", path, token=token, **kwargs)
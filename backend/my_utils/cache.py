@@ -0,0 +1,4 @@
+from flask_caching import Cache
+
+# Initialised in app.py; import this object wherever responses need caching
+cache = Cache()
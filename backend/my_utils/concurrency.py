@@ -0,0 +1,36 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+def run_concurrently(calls, max_workers, timeout=None):
+    """Run independent upstream calls on a bounded thread pool.
+
+    ``calls`` maps a key to a zero-argument callable. Returns
+    ``(results, errors, pending)``: ``results`` maps key -> return value,
+    ``errors`` maps key -> the exception raised, and ``pending`` lists the
+    keys still running when ``timeout`` seconds elapsed (those are
+    abandoned, not waited for). Each call runs in a copy of the caller's
+    context, so request tracing follows it into the worker thread.
+    """
+    if not calls:
+        return {}, {}, []
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls))))
+    futures = {executor.submit(contextvars.copy_context().run, fn): key for key, fn in calls.items()}
+    try:
+        done, not_done = wait(futures, timeout=timeout)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    errors = {}
+    for future in done:
+        key = futures[future]
+        error = future.exception()
+        if error is not None:
+            errors[key] = error
+        else:
+            results[key] = future.result()
+
+    pending = [futures[future] for future in not_done]
+    return results, errors, pending
@@ -1,99 +1,179 @@
 import logging
-from database import get_connection
+from database import db_connection
+
+# Orders are stored normalized: one air_orders row, one air_order_travelers row per
+# traveler and one air_order_segments row per segment (see migrations/)
+ORDER_SQL = """
+    INSERT INTO air_orders (flight_order_id, pnr, flight_offer_id, user_id, total_price, currency, status)
+    VALUES (%(flight_order_id)s, %(pnr)s, %(flight_offer_id)s, %(user_id)s, %(total_price)s, %(currency)s, %(status)s)
+    ON DUPLICATE KEY UPDATE id = LAST_INSERT_ID(id), pnr = VALUES(pnr), flight_offer_id = VALUES(flight_offer_id),
+        user_id = COALESCE(VALUES(user_id), user_id), total_price = VALUES(total_price), currency = VALUES(currency)
+"""
+TRAVELER_SQL = """
+    INSERT INTO air_order_travelers (air_order_id, traveler_ref, first_name, last_name, email)
+    VALUES (%(air_order_id)s, %(traveler_ref)s, %(first_name)s, %(last_name)s, %(email)s)
+    ON DUPLICATE KEY UPDATE first_name = VALUES(first_name), last_name = VALUES(last_name), email = VALUES(email)
+"""
+SEGMENT_SQL = """
+    INSERT INTO air_order_segments (
+        air_order_id, itinerary_index, segment_index, departure_airport, arrival_airport,
+        departure_time, arrival_time, carrier_code, flight_number
+    ) VALUES (
+        %(air_order_id)s, %(itinerary_index)s, %(segment_index)s, %(departure_airport)s, %(arrival_airport)s,
+        %(departure_time)s, %(arrival_time)s, %(carrier_code)s, %(flight_number)s
+    )
+    ON DUPLICATE KEY UPDATE departure_airport = VALUES(departure_airport), arrival_airport = VALUES(arrival_airport),
+        departure_time = VALUES(departure_time), arrival_time = VALUES(arrival_time),
+        carrier_code = VALUES(carrier_code), flight_number = VALUES(flight_number)
+"""
+
+def build_order_rows(order_data, user_id=None):
+    """Split an Amadeus flight order into its air_orders, traveler and segment rows.
+
+    Returns ``(order_row, traveler_rows, segment_rows, failures)``. Segments
+    missing airports or times are not turned into rows; each one is reported
+    in ``failures`` instead.
+    """
+    order_id = order_data.get('order_id')  # Ensure order_id is available
+    if not order_id:
+        raise ValueError("Missing order_id in the order data")
+
+    flight_offer = order_data.get('flightOffers', [{}])[0]
+    price = flight_offer.get('price', {})
+    order_row = {
+        'flight_order_id': order_id,
+        'pnr': order_data.get('associatedRecords', [{}])[0].get('reference', ''),
+        'flight_offer_id': flight_offer.get('id'),
+        'user_id': user_id,
+        'total_price': price.get('grandTotal', 0),
+        'currency': price.get('currency', 'USD'),
+        'status': 'pending'
+    }
+
+    traveler_rows = []
+    for index, traveler in enumerate(order_data.get('travelers', [])):
+        name_info = traveler.get('name', {})
+        email = traveler.get('contact', {}).get('emailAddress', '')
+        if not email:
+            logging.warning(f"Missing email for traveler: {name_info.get('firstName', '')} {name_info.get('lastName', '')}")
+        traveler_rows.append({
+            'traveler_ref': str(traveler.get('id', index + 1)),
+            'first_name': name_info.get('firstName', ''),
+            'last_name': name_info.get('lastName', ''),
+            'email': email.lower() or None
+        })
+
+    segment_rows = []
+    failures = []
+    for itinerary_index, itinerary in enumerate(flight_offer.get('itineraries', [])):
+        for segment_index, segment in enumerate(itinerary.get('segments', [])):
+            departure = segment.get('departure', {})
+            arrival = segment.get('arrival', {})
+            row = {
+                'itinerary_index': itinerary_index,
+                'segment_index': segment_index,
+                'departure_airport': departure.get('iataCode', ''),
+                'arrival_airport': arrival.get('iataCode', ''),
+                'departure_time': departure.get('at', ''),
+                'arrival_time': arrival.get('at', ''),
+                'carrier_code': segment.get('carrierCode'),
+                'flight_number': segment.get('number')
+            }
+            if not row['departure_airport'] or not row['arrival_airport'] or not row['departure_time'] or not row['arrival_time']:
+                failures.append({'row': describe_segment(row), 'error': "Incomplete segment data"})
+                continue
+            segment_rows.append(row)
+
+    return order_row, traveler_rows, segment_rows, failures
+
+
+def describe_traveler(row):
+    return f"traveler {row['traveler_ref']} {row['first_name']} {row['last_name']}"
+
+
+def describe_segment(row):
+    return f"segment {row['departure_airport']}-{row['arrival_airport']} {row['departure_time']}"
+
+
+def insert_rows(connection, sql, rows, describe):
+    """Insert rows on ``connection`` without committing.
+
+    All rows go out as one multi-row INSERT. If that fails, the rows are
+    retried one by one so the bad ones can be reported; returns
+    ``(rows_inserted, failures)``.
+    """
+    if not rows:
+        return 0, []
+
+    with connection.cursor() as cursor:
+        try:
+            # pymysql rewrites INSERT ... VALUES executemany into a single multi-row statement
+            cursor.executemany(sql, rows)
+            return len(rows), []
+        except Exception as e:
+            logging.warning(f"Batched insert failed, retrying row by row: {e}")
+
+        rows_inserted = 0
+        failures = []
+        for row in rows:
+            try:
+                cursor.execute(sql, row)
+                rows_inserted += 1
+            except Exception as e:
+                failures.append({'row': describe(row), 'error': str(e)})
+        return rows_inserted, failures
+
+
+def save_flight_order_rows(order_data, user_id=None):
+    """Save a flight order to the normalized order tables in one transaction.
+
+    Returns ``(rows_inserted, failures)``: the number of traveler and segment
+    rows written, and every row that was not written with the reason.
+    Individual bad rows are skipped, but if no traveler or no segment row
+    can be written the whole order is rolled back and ``rows_inserted`` is 0.
+    Saving the same order again updates its rows in place; the order's
+    status and a user_id already set are kept.
+    """
+    order_row, traveler_rows, segment_rows, failures = build_order_rows(order_data, user_id)
+    logging.info(f"Saving flight order {order_row['flight_order_id']}: "
+                 f"{len(traveler_rows)} traveler(s), {len(segment_rows)} segment(s)")
+
+    with db_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(ORDER_SQL, order_row)
+                air_order_id = cursor.lastrowid
+
+            for row in traveler_rows + segment_rows:
+                row['air_order_id'] = air_order_id
+
+            travelers_inserted, traveler_failures = insert_rows(connection, TRAVELER_SQL, traveler_rows, describe_traveler)
+            segments_inserted, segment_failures = insert_rows(connection, SEGMENT_SQL, segment_rows, describe_segment)
+            complete = travelers_inserted > 0 and segments_inserted > 0
+            if complete:
+                connection.commit()
+            else:
+                connection.rollback()
+        except Exception as e:
+            logging.error(f"Error saving flight order to DB: {e}")
+            connection.rollback()
+            raise
+
+    failures.extend(traveler_failures + segment_failures)
+    for failure in failures:
+        logging.error(f"Flight order {order_row['flight_order_id']}: {failure['row']} not saved: {failure['error']}")
+
+    if not complete:
+        logging.error(f"Flight order {order_row['flight_order_id']} not saved: "
+                      f"{travelers_inserted} traveler(s) and {segments_inserted} segment(s) written")
+        return 0, failures
+
+    rows_inserted = travelers_inserted + segments_inserted
+    logging.info(f"Successfully inserted {rows_inserted} flight order row(s) into the database.")
+    return rows_inserted, failures
+
 
 # Helper function to save flight order to DB
-def save_flight_order_to_db(order_data):
-    
-
-    connection = get_connection()
-    rows_inserted = 0
-    try:
-        order_id = order_data.get('order_id')  # Ensure order_id is available
-        if not order_id:
-            raise ValueError("Missing order_id in the order data")
-
-        logging.info(f"Saving flight order for order_id: {order_id}")
-
-        with connection.cursor() as cursor:
-            flight_offer = order_data.get('flightOffers', [{}])[0]
-            pnr = order_data.get('associatedRecords', [{}])[0].get('reference', '')
-            offer_id = flight_offer.get('id')
-            price = flight_offer.get('price', {}).get('grandTotal', 0)
-            currency = flight_offer.get('price', {}).get('currency', 'USD')
-            itineraries = flight_offer.get('itineraries', [])
-
-            for traveler in order_data.get('travelers', []):
-                name_info = traveler.get('name', {})
-                contact_info = traveler.get('contact', {})
-
-                first_name = name_info.get('firstName', '')
-                last_name = name_info.get('lastName', '')
-                email = contact_info.get('emailAddress', '')
-
-                if not email:
-                    logging.warning(f"Missing email for traveler: {first_name} {last_name}")
-
-                for itinerary in itineraries:
-                    for segment in itinerary.get('segments', []):
-                        try:
-                            dep_airport = segment['departure'].get('iataCode', '')
-                            arr_airport = segment['arrival'].get('iataCode', '')
-                            dep_time = segment['departure'].get('at', '')
-                            arr_time = segment['arrival'].get('at', '')
-
-                            if not dep_airport or not arr_airport or not dep_time or not arr_time:
-                                logging.warning(f"Incomplete segment data for {first_name} {last_name}, skipping insert.")
-                                continue
-
-                            sql = """
-                            INSERT INTO flight_orders (
-                                flight_order_id, order_id, pnr, flight_offer_id,
-                                departure_airport, arrival_airport,
-                                departure_time, arrival_time,
-                                traveler_first_name, traveler_last_name,
-                                traveler_email, total_price, currency, status
-                            ) VALUES (
-                                %(flight_order_id)s, %(order_id)s, %(pnr)s, %(offer_id)s,
-                                %(dep_airport)s, %(arr_airport)s,
-                                %(dep_time)s, %(arr_time)s,
-                                %(first_name)s, %(last_name)s,
-                                %(email)s, %(price)s, %(currency)s, %(status)s
-                            )
-                            """
-                            params = {
-                                'flight_order_id': order_data.get('id'),
-                                'order_id': order_id,
-                                'pnr': pnr,
-                                'offer_id': offer_id,
-                                'dep_airport': dep_airport,
-                                'arr_airport': arr_airport,
-                                'dep_time': dep_time,
-                                'arr_time': arr_time,
-                                'first_name': first_name,
-                                'last_name': last_name,
-                                'email': email,
-                                'price': price,
-                                'currency': currency,
-                                'status': 'pending'
-                            }
-
-                            logging.debug(f"SQL Query: {sql}")
-                            logging.debug(f"Parameters: {params}")
-
-                            cursor.execute(sql, params)
-                            rows_inserted += 1
-
-                        except Exception as e:
-                            logging.error(f"Error inserting segment for traveler {first_name} {last_name}: {e}")
-                            continue
-
-            connection.commit()
-            logging.info(f"Successfully inserted {rows_inserted} flight order(s) into the database.")
-            return rows_inserted
-
-    except Exception as e:
-        logging.error(f"Error saving flight order to DB: {e}")
-        connection.rollback()
-        raise
-    finally:
-        connection.close()
\ No newline at end of file
+def save_flight_order_to_db(order_data, user_id=None):
+    rows_inserted, _ = save_flight_order_rows(order_data, user_id)
+    return rows_inserted
@@ -0,0 +1,26 @@
+import os
+import secrets
+
+
+def host_secret(path):
+    """Return the secret stored at ``path``, generating it on first use.
+
+    Every worker on the host reads the same file, so a value signed by one
+    can be verified by the others. The first writer wins a race: the key is
+    written to a temp file and hard-linked into place, which fails if
+    another worker got there first.
+    """
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(path) as f:
+        return f.read().strip()
@@ -0,0 +1,217 @@
+import bisect
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from my_utils.periodic import PeriodicReload
+
+# Reload the locations table this often (seconds); Amadeus results are kept across reloads
+LOCATION_INDEX_REFRESH = int(os.environ.get('LOCATION_INDEX_REFRESH', 3600))
+# Share of the keyword's trigrams a name must contain to count as a fuzzy match
+LOCATION_FUZZY_THRESHOLD = float(os.environ.get('LOCATION_FUZZY_THRESHOLD', 0.6))
+# Keywords shorter than this only get prefix matches
+LOCATION_FUZZY_MIN_LENGTH = 4
+# Prefixes up to this long match too many entries to rank per request; their
+# best SHORT_PREFIX_RESULTS are ranked once per snapshot instead
+SHORT_PREFIX_LENGTH = 2
+SHORT_PREFIX_RESULTS = 50
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+
+
+def normalize(text):
+    """Upper-case ASCII with accents dropped and punctuation turned into spaces."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", text.upper()).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def location_key(location):
+    return f"{location.get('subType', '')}:{location.get('iataCode', '')}:{location.get('name', '')}"
+
+
+class _Snapshot:
+    """Immutable search structures over a set of locations."""
+
+    def __init__(self, locations):
+        self.locations = locations
+        self.tokens = {}
+        prefixes = []
+        grams = {}
+        for key, location in locations.items():
+            address = location.get("address", {})
+            words = " ".join(filter(None, [
+                location.get("iataCode"), location.get("name"),
+                address.get("cityName"), address.get("cityCode")
+            ]))
+            tokens = tuple(dict.fromkeys(normalize(words).split()))
+            self.tokens[key] = tokens
+            prefixes.extend((token, key) for token in tokens)
+            for gram in trigrams(" ".join(tokens)):
+                grams.setdefault(gram, []).append(key)
+        prefixes.sort()
+        self.prefix_tokens = [token for token, _ in prefixes]
+        self.prefix_keys = [key for _, key in prefixes]
+        self.trigrams = grams
+
+        short = {}
+        for token, key in prefixes:
+            for length in range(1, min(len(token), SHORT_PREFIX_LENGTH) + 1):
+                short.setdefault(token[:length], {})[key] = None
+        self.short_prefixes = {
+            prefix: sorted(keys, key=lambda k: _rank(locations[k], ""))[:SHORT_PREFIX_RESULTS]
+            for prefix, keys in short.items()
+        }
+
+    def prefix_range(self, word):
+        """``(start, end)`` slice of prefix_tokens that start with ``word``."""
+        start = bisect.bisect_left(self.prefix_tokens, word)
+        # Tokens are upper-case ASCII letters and digits, all of which sort before "~"
+        return start, bisect.bisect_left(self.prefix_tokens, word + "~", start)
+
+    def prefix_matches(self, words):
+        """Keys whose tokens start with every word, in no particular order.
+
+        Candidates come from the most selective word; a 1-2 character word
+        only contributes its precomputed best entries, like a lone short
+        prefix does.
+        """
+        ranges = {word: self.prefix_range(word) for word in words}
+        word = min(words, key=lambda w: ranges[w][1] - ranges[w][0])
+        others = [w for w in words if w != word]
+        if len(word) <= SHORT_PREFIX_LENGTH:
+            candidates = self.short_prefixes.get(word, [])
+        else:
+            start, end = ranges[word]
+            candidates = dict.fromkeys(self.prefix_keys[start:end])
+        if not others:
+            return list(candidates)
+        return [
+            key for key in candidates
+            if all(any(token.startswith(other) for token in self.tokens[key]) for other in others)
+        ]
+
+    def shared_trigrams(self, grams):
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigrams.get(gram, ()))
+        return shared
+
+
+class LocationIndex:
+    """In-process autocomplete over airport and city locations.
+
+    Entries are Amadeus location objects. ``load_all()`` returns the ones
+    built from the locations table and is run by ``start()`` and every
+    LOCATION_INDEX_REFRESH seconds in a background thread; ``add()`` merges
+    results fetched from Amadeus so the next keystroke is answered locally.
+
+    ``search()`` does a prefix match on every word of the keyword (bisect
+    over a sorted token list), then a trigram match for typos. Reads take no
+    lock: the table is indexed in one snapshot at reload, Amadeus results
+    since then in a small second one, and writes swap in new snapshots.
+    """
+
+    def __init__(self, load_all, refresh_interval=LOCATION_INDEX_REFRESH,
+                 fuzzy_threshold=LOCATION_FUZZY_THRESHOLD):
+        self._load_all = load_all
+        self.refresh_interval = refresh_interval
+        self.fuzzy_threshold = fuzzy_threshold
+        # (table + older Amadeus results, Amadeus results since the last reload)
+        self._snapshots = (_Snapshot({}), _Snapshot({}))
+        self._fetched = {}
+        self._write_lock = threading.Lock()
+        self._refresher = PeriodicReload("location-index", self.reload, refresh_interval)
+        self.loaded_at = None
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        """Load in the background and keep refreshing; safe to call on every request."""
+        self._refresher.start()
+
+    def reload(self):
+        try:
+            loaded = self._load_all()
+        except Exception as e:
+            print(f"[LocationIndex] Reload failed: {e}")
+            return False
+        locations = {location_key(location): location for location in loaded}
+        with self._write_lock:
+            # Amadeus results carry more detail than the table; they win on conflicts
+            locations.update(self._fetched)
+            self._snapshots = (_Snapshot(locations), _Snapshot({}))
+        self.loaded_at = time.time()
+        print(f"[LocationIndex] Loaded {len(loaded)} locations")
+        return True
+
+    def add(self, locations):
+        """Merge Amadeus location results into the index."""
+        new = {location_key(location): location for location in locations if location.get("iataCode")}
+        if not new:
+            return
+        with self._write_lock:
+            self._fetched.update(new)
+            base, recent = self._snapshots
+            self._snapshots = (base, _Snapshot({**recent.locations, **new}))
+
+    def search(self, keyword, sub_types=None, limit=10):
+        """Locations matching ``keyword``, best first; empty if nothing matches locally."""
+        snapshots = self._snapshots
+        words = normalize(keyword).split()
+        if not words:
+            return []
+
+        results = self._prefix_matches(snapshots, words)
+        if not results and len(" ".join(words)) >= LOCATION_FUZZY_MIN_LENGTH:
+            results = self._fuzzy_matches(snapshots, " ".join(words))
+
+        if sub_types:
+            results = [location for location in results if location.get("subType") in sub_types]
+        if results:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return results[:limit]
+
+    def _prefix_matches(self, snapshots, words):
+        found = {}
+        for snapshot in snapshots:
+            for key in snapshot.prefix_matches(words):
+                found[key] = snapshot.locations[key]
+        code = words[0] if len(words) == 1 else ""
+        return sorted(found.values(), key=lambda location: _rank(location, code))
+
+    def _fuzzy_matches(self, snapshots, text):
+        wanted = trigrams(text)
+        needed = self.fuzzy_threshold * len(wanted)
+        found = {}
+        for snapshot in snapshots:
+            for key, count in snapshot.shared_trigrams(wanted).items():
+                if count >= needed:
+                    found[key] = (-count, _rank(snapshot.locations[key], ""), snapshot.locations[key])
+        return [location for _, _, location in sorted(found.values(), key=lambda match: match[:2])]
+
+    def stats(self):
+        base, recent = self._snapshots
+        return {
+            "size": len(base.locations) + len(recent.locations),
+            "fromAmadeus": len(self._fetched),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loadedAt": self.loaded_at,
+            "refreshInterval": self.refresh_interval
+        }
+
+
+def _rank(location, code):
+    """Sort key: the exact IATA code first, then by Amadeus traveler score, then by name."""
+    score = location.get("analytics", {}).get("travelers", {}).get("score", 0)
+    return (location.get("iataCode") != code, -score, location.get("name", ""))
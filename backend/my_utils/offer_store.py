@@ -0,0 +1,61 @@
+import logging
+import os
+import tempfile
+import uuid
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from my_utils.host_secret import host_secret
+from my_utils.ref_cache import RefCache
+
+# Search results stay bookable by handle for 30 minutes
+OFFER_STORE_TTL = int(os.environ.get('OFFER_STORE_TTL', 1800))
+OFFER_STORE_MAXSIZE = int(os.environ.get('OFFER_STORE_MAXSIZE', 20000))
+# Directory shared by every worker on the host. Offers get their own store so
+# they never evict reference data from REFERENCE_CACHE_DIR
+OFFER_STORE_DIR = os.environ.get('OFFER_STORE_DIR', os.path.join(tempfile.gettempdir(), 'trio-offers'))
+# Must be the same on every host behind the load balancer; if unset, one is
+# generated on first use and kept in OFFER_STORE_DIR for all workers on the host
+OFFER_HANDLE_SECRET = os.environ.get('OFFER_HANDLE_SECRET')
+
+
+def _configure():
+    # cachelib ships with Flask-Caching and backs its "FileSystemCache" type
+    from cachelib import FileSystemCache
+    try:
+        os.makedirs(OFFER_STORE_DIR, mode=0o700, exist_ok=True)
+        secret = OFFER_HANDLE_SECRET or host_secret(os.path.join(OFFER_STORE_DIR, "handle.key"))
+        backend = FileSystemCache(os.path.join(OFFER_STORE_DIR, "offers"), threshold=OFFER_STORE_MAXSIZE,
+                                  default_timeout=OFFER_STORE_TTL)
+    except OSError as e:
+        logging.error(f"Offer handles disabled, {OFFER_STORE_DIR} is not usable: {e}")
+        return None, None
+    offers = RefCache("flight_offers", maxsize=OFFER_STORE_MAXSIZE, ttl=OFFER_STORE_TTL, shared=backend)
+    return offers, URLSafeSerializer(secret, salt="flight-offer")
+
+
+_offers, _serializer = _configure()
+
+
+def store_offer(flight_offer):
+    """Keep a raw Amadeus flight offer server-side and return its signed handle.
+
+    Returns None if the store could not be set up.
+    """
+    if _offers is None:
+        return None
+    key = uuid.uuid4().hex
+    _offers.set(key, flight_offer)
+    return _serializer.dumps(key)
+
+
+def load_offer(handle):
+    """Return the offer for a handle, or None if it is unknown, expired or tampered with."""
+    if _offers is None or not handle or not isinstance(handle, str):
+        return None
+    try:
+        key = _serializer.loads(handle)
+    except BadSignature:
+        return None
+    return _offers.get(key)
+
@@ -6,14 +6,99 @@ from reportlab.lib.utils import ImageReader
 from reportlab.platypus import Table, TableStyle, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from datetime import datetime
+import hashlib
 import os
 import re
+import threading
 import qrcode
 from io import BytesIO
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rendered tickets live under TICKETS_DIR/<ab>/<cd>/, sharded by a hash of the order ID
+TICKETS_DIR = os.environ.get('TICKETS_DIR', os.path.join(BASE_DIR, "tickets"))
+
+# Immutable rendering assets, built once per process and shared by every ticket
+LOGO_PATH = os.path.join(BASE_DIR, "static", "logo.png")
+
+STYLES = getSampleStyleSheet()
+TERMS_STYLE = ParagraphStyle('TermsStyle', parent=STYLES['Normal'], fontSize=9, leading=12, spaceAfter=6)
+TERMS = [
+    "<b>How to cancel:</b> You can cancel your booking through our website. Cancellations within 3 hours of departure must contact airline directly.",
+    "<b>Refund Policy:</b> Refunds processed within 3-5 working days. Allow 7-14 days for bank processing.",
+    "<b>Name Changes:</b> Not allowed. Cancel existing booking and create new one for name changes.",
+]
+
+PASSENGER_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#BBDEFB')),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,0), 10),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+])
+FLIGHT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#E3F2FD')),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('VALIGN', (0,0), (-1,-1), 'TOP'),
+])
+BAGGAGE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#E3F2FD')),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+])
+PAYMENT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#E3F2FD')),
+    ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+    ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0,0), (-1,-1), 9),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+])
+
+# The logo is drawn 100pt wide; ~4x that in pixels keeps it sharp in print
+LOGO_MAX_PIXELS = 400
+
+def _load_logo():
+    if not os.path.exists(LOGO_PATH):
+        return None
+    # Decode and downscale the PNG once. Every canvas re-encodes the image it is
+    # given, so a 1216px source would be compressed again for each ticket.
+    from PIL import Image
+    with Image.open(LOGO_PATH) as source:
+        image = source.copy()
+    image.thumbnail((LOGO_MAX_PIXELS, LOGO_MAX_PIXELS))
+    logo = ImageReader(image)
+    logo.getRGBData()
+    return logo
+
+LOGO = _load_logo()
+
 def sanitize_filename(text):
     return re.sub(r'[^a-zA-Z0-9_\-]', '_', text)
 
+def ticket_dir(order_id, base_dir=None):
+    """Shard directory for an order's tickets, e.g. tickets/3f/a9."""
+    digest = hashlib.sha1(sanitize_filename(order_id).encode()).hexdigest()
+    return os.path.join(base_dir or TICKETS_DIR, digest[:2], digest[2:4])
+
+def ticket_path(order_id, traveler_id=None, base_dir=None):
+    """Where the ticket for an order (or one traveler of it) is stored."""
+    name = sanitize_filename(order_id)
+    if traveler_id is not None:
+        name = f"{name}_{sanitize_filename(str(traveler_id))}"
+    return os.path.join(ticket_dir(order_id, base_dir), f"{name}.pdf")
+
+def _write_pdf(full_path, draw_pages):
+    # Render to a temp file and rename it into place, so a concurrent
+    # download never serves a half-written ticket
+    tmp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    c = canvas.Canvas(tmp_path, pagesize=A4)
+    draw_pages(c)
+    c.save()
+    os.replace(tmp_path, full_path)
+
 def generate_qr_code(data):
     qr = qrcode.make(data)
     buffer = BytesIO()
@@ -28,83 +113,31 @@ def format_date(date_str):
     except:
         return date_str
 
-def generate_ticket_pdf(order_data, save_path="tickets"):
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
-
-    order_id = sanitize_filename(order_data["id"])
-    pnr = sanitize_filename(order_data["associatedRecords"][0]["reference"])
-    traveler = order_data["travelers"][0]
-    flight_offer = order_data["flightOffers"][0]
-    itineraries = flight_offer["itineraries"]
-
-    # Detect trip type
-    if len(itineraries) == 1:
-        trip_type = "One-way"
-    elif len(itineraries) == 2:
-        trip_type = "Round-trip"
-    else:
-        trip_type = "Multicity"
-
-    filename = f"{pnr}_{order_id}.pdf"
-    full_path = os.path.join(save_path, filename)
-
-    c = canvas.Canvas(full_path, pagesize=A4)
-    width, height = A4
-
-    styles = getSampleStyleSheet()
-    footer_y = 40
-    y_position = height - 40
+TRAVELER_TYPES = {"ADULT": "Adult", "CHILD": "Child", "SENIOR": "Senior", "YOUNG": "Young",
+                  "HELD_INFANT": "Infant", "SEATED_INFANT": "Infant", "STUDENT": "Student"}
 
-    # --- LOGO ---
-    logo_path = os.path.join("static", "logo.png")
-    if os.path.exists(logo_path):
-        logo = ImageReader(logo_path)
-        c.drawImage(logo, 40, y_position - 40, width=100, height=30, mask='auto')
+def traveler_types(flight_offer):
+    """Map traveler ID -> display type from the offer's travelerPricings."""
+    return {
+        pricing.get("travelerId"): TRAVELER_TYPES.get(pricing.get("travelerType"), "Adult")
+        for pricing in flight_offer.get("travelerPricings", [])
+    }
 
-    y_position -= 60
-    c.setFont("Helvetica-Bold", 16)
-    c.setFillColor(colors.HexColor('#1A237E'))
-    c.drawString(40, y_position, "E-TICKET")
+def traveler_qr_data(pnr, traveler):
+    return f"{pnr} {traveler['name']['lastName']}/{traveler['name']['firstName']}"
 
-    # Booking Info
-    c.setFont("Helvetica", 10)
-    y_position -= 20
-    c.setFillColor(colors.black)
-    c.drawString(40, y_position, f"Booking ID: {order_id}")
-    y_position -= 15
-    c.drawString(40, y_position, f"Booking Date: {datetime.now().strftime('%a, %d %b %Y')}")
-    y_position -= 15
-    c.drawString(40, y_position, f"Trip Type: {trip_type}")
+def build_shared_sections(flight_offer, trip_type):
+    """Build the itinerary, baggage, payment and terms blocks once per order.
 
-    # Passenger Info Table
-    y_position -= 25
-    passenger_data = [
-        ["Passenger Name", "Type", "Airline PNR", "E-Ticket Number"],
-        [f"{traveler['name']['firstName']} {traveler['name']['lastName']}",
-         "Adult", pnr, pnr]
-    ]
-    p_table = Table(passenger_data, colWidths=[120, 80, 120, 120])
-    p_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#BBDEFB')),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 10),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-    ]))
-    p_table.wrapOn(c, width, height)
-    p_table_height = 45
-    p_table.drawOn(c, 40, y_position - p_table_height)
-    y_position -= p_table_height + 30
+    Returns a list of ``(title, flowable, height)`` drawn in order on every
+    traveler's page; ``title`` may be None.
+    """
+    itineraries = flight_offer["itineraries"]
+    sections = []
 
     # Iterate through all itineraries (for round-trip/multicity)
     for idx, itinerary in enumerate(itineraries):
-        c.setFont("Helvetica-Bold", 12)
-        if trip_type != "One-way":
-            c.drawString(40, y_position, f"Flight Itinerary {idx + 1}")
-        else:
-            c.drawString(40, y_position, "Flight Itinerary")
-        y_position -= 20
+        title = f"Flight Itinerary {idx + 1}" if trip_type != "One-way" else "Flight Itinerary"
 
         # Flight Table
         flight_table_data = [["Carrier", "Departure", "Arrival", "Duration", "Class"]]
@@ -121,24 +154,10 @@ def generate_ticket_pdf(order_data, save_path="tickets"):
             ])
 
         f_table = Table(flight_table_data, colWidths=[60, 150, 150, 80, 60])
-        f_table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#E3F2FD')),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0,0), (-1,-1), 9),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ]))
-        f_table.wrapOn(c, width, height)
-        f_table_height = len(flight_table_data) * 30
-        f_table.drawOn(c, 40, y_position - f_table_height)
-        y_position -= f_table_height + 30
+        f_table.setStyle(FLIGHT_TABLE_STYLE)
+        sections.append((title, f_table, len(flight_table_data) * 30))
 
     # Baggage Allowance
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(40, y_position, "Baggage Allowance")
-    y_position -= 20
-
     baggage_data = [["Airline", "Segment", "Adult", "Child"]]
     for itinerary in itineraries:
         for seg in itinerary["segments"]:
@@ -149,22 +168,10 @@ def generate_ticket_pdf(order_data, save_path="tickets"):
             ])
 
     b_table = Table(baggage_data, colWidths=[100, 100, 80, 80])
-    b_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#E3F2FD')),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-    ]))
-    b_table.wrapOn(c, width, height)
-    b_table_height = len(baggage_data) * 20
-    b_table.drawOn(c, 40, y_position - b_table_height)
-    y_position -= b_table_height + 30
+    b_table.setStyle(BAGGAGE_TABLE_STYLE)
+    sections.append(("Baggage Allowance", b_table, len(baggage_data) * 20))
 
     # Payment Summary
-    c.setFont("Helvetica-Bold", 12)
-    c.setFillColor(colors.black)
-    c.drawString(40, y_position, "Payment Summary")
-    y_position -= 20
-
     price_info = flight_offer["price"]
     base = float(price_info.get("base", 0))
     total = float(price_info.get("total", 0))
@@ -174,45 +181,79 @@ def generate_ticket_pdf(order_data, save_path="tickets"):
     payment_data = [["Description", "Amount"]]
     payment_data.append(["Base Fare", f"{currency} {base:,.2f}"])
 
-    total_fees = 0
     for fee in fees:
         amount = float(fee.get("amount", 0))
         fee_type = fee.get("type", "OTHER").capitalize()
-        total_fees += amount
         payment_data.append([f"{fee_type} Fee", f"{currency} {amount:,.2f}"])
 
     payment_data.append(["Total Amount Paid", f"{currency} {total:,.2f}"])
 
     pay_table = Table(payment_data, colWidths=[200, 150])
-    pay_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#E3F2FD')),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 9),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-    ]))
-
+    pay_table.setStyle(PAYMENT_TABLE_STYLE)
     row_height = 20
-    pay_table_height = len(payment_data) * row_height
-    pay_table.wrapOn(c, width, height)
-    pay_table.drawOn(c, 40, y_position - pay_table_height)
-    y_position -= pay_table_height + 30
+    sections.append(("Payment Summary", pay_table, len(payment_data) * row_height))
 
     # Terms and Conditions
-    terms_style = ParagraphStyle('TermsStyle', parent=styles['Normal'], fontSize=9, leading=12, spaceAfter=6)
-    terms = [
-        Paragraph("<b>How to cancel:</b> You can cancel your booking through our website. Cancellations within 3 hours of departure must contact airline directly.", terms_style),
-        Paragraph("<b>Refund Policy:</b> Refunds processed within 3-5 working days. Allow 7-14 days for bank processing.", terms_style),
-        Paragraph("<b>Name Changes:</b> Not allowed. Cancel existing booking and create new one for name changes.", terms_style),
+    sections.extend((None, Paragraph(text, TERMS_STYLE), None) for text in TERMS)
+    return sections
+
+def draw_ticket_page(c, order_id, pnr, trip_type, traveler, traveler_type, qr_img, sections):
+    """Draw one traveler's ticket on the current canvas page and finish the page."""
+    width, height = A4
+
+    footer_y = 40
+    y_position = height - 40
+
+    # --- LOGO ---
+    if LOGO is not None:
+        c.drawImage(LOGO, 40, y_position - 40, width=100, height=30, mask='auto')
+
+    y_position -= 60
+    c.setFont("Helvetica-Bold", 16)
+    c.setFillColor(colors.HexColor('#1A237E'))
+    c.drawString(40, y_position, "E-TICKET")
+
+    # Booking Info
+    c.setFont("Helvetica", 10)
+    y_position -= 20
+    c.setFillColor(colors.black)
+    c.drawString(40, y_position, f"Booking ID: {order_id}")
+    y_position -= 15
+    c.drawString(40, y_position, f"Booking Date: {datetime.now().strftime('%a, %d %b %Y')}")
+    y_position -= 15
+    c.drawString(40, y_position, f"Trip Type: {trip_type}")
+
+    # Passenger Info Table
+    y_position -= 25
+    passenger_data = [
+        ["Passenger Name", "Type", "Airline PNR", "E-Ticket Number"],
+        [f"{traveler['name']['firstName']} {traveler['name']['lastName']}",
+         traveler_type, pnr, pnr]
     ]
+    p_table = Table(passenger_data, colWidths=[120, 80, 120, 120])
+    p_table.setStyle(PASSENGER_TABLE_STYLE)
+    p_table.wrapOn(c, width, height)
+    p_table_height = 45
+    p_table.drawOn(c, 40, y_position - p_table_height)
+    y_position -= p_table_height + 30
+
+    for title, flowable, block_height in sections:
+        if block_height is None:
+            # Terms paragraphs are drawn from the top of their line
+            flowable.wrapOn(c, width - 80, 50)
+            flowable.drawOn(c, 40, y_position)
+            y_position -= 30
+            continue
 
-    for term in terms:
-        term.wrapOn(c, width - 80, 50)
-        term.drawOn(c, 40, y_position)
-        y_position -= 30
+        c.setFont("Helvetica-Bold", 12)
+        c.setFillColor(colors.black)
+        c.drawString(40, y_position, title)
+        y_position -= 20
+        flowable.wrapOn(c, width, height)
+        flowable.drawOn(c, 40, y_position - block_height)
+        y_position -= block_height + 30
 
     # QR Code
-    qr_img = generate_qr_code(pnr)
     c.drawImage(qr_img, width - 120, footer_y - 20, width=60, height=60)
 
     # Footer
@@ -222,5 +263,56 @@ def generate_ticket_pdf(order_data, save_path="tickets"):
     c.drawString(40, footer_y - 15, "This ticket is issued by TravelBooking Inc. and is valid only with valid government ID.")
 
     c.showPage()
-    c.save()
-    return full_path
+
+def generate_ticket_pdf(order_data, save_path=None, per_traveler=False):
+    """Render e-tickets for every traveler of an order in one pass.
+
+    By default all travelers go into one multi-page PDF and its path is
+    returned. With ``per_traveler=True`` each traveler gets their own file
+    and the list of paths is returned. Files go to the order's shard under
+    ``save_path`` (TICKETS_DIR by default). The itinerary, baggage and payment
+    tables are built once and shared by every page.
+    """
+    os.makedirs(ticket_dir(order_data["id"], save_path), exist_ok=True)
+
+    order_id = sanitize_filename(order_data["id"])
+    pnr = sanitize_filename(order_data["associatedRecords"][0]["reference"])
+    travelers = order_data["travelers"]
+    flight_offer = order_data["flightOffers"][0]
+    itineraries = flight_offer["itineraries"]
+
+    # Detect trip type
+    if len(itineraries) == 1:
+        trip_type = "One-way"
+    elif len(itineraries) == 2:
+        trip_type = "Round-trip"
+    else:
+        trip_type = "Multicity"
+
+    sections = build_shared_sections(flight_offer, trip_type)
+    types = traveler_types(flight_offer)
+
+    # QR encoding is CPU-bound and the whole render already runs on the ticket
+    # job pool, so a thread per code would only add overhead under the GIL
+    qr_codes = [generate_qr_code(traveler_qr_data(pnr, traveler)) for traveler in travelers]
+
+    def draw(c, i):
+        traveler = travelers[i]
+        draw_ticket_page(c, order_id, pnr, trip_type, traveler, types.get(traveler.get("id"), "Adult"),
+                         qr_codes[i], sections)
+
+    if not per_traveler:
+        def draw_all(c):
+            for i in range(len(travelers)):
+                draw(c, i)
+
+        full_path = ticket_path(order_data["id"], base_dir=save_path)
+        _write_pdf(full_path, draw_all)
+        return full_path
+
+    paths = []
+    for i, traveler in enumerate(travelers):
+        full_path = ticket_path(order_data["id"], traveler.get("id", i + 1), base_dir=save_path)
+        _write_pdf(full_path, lambda c: draw(c, i))
+        paths.append(full_path)
+    return paths
@@ -0,0 +1,35 @@
+import os
+import threading
+import time
+
+
+class PeriodicReload:
+    """Call ``reload()`` now and then every ``interval`` seconds in a daemon thread.
+
+    ``start()`` is cheap and safe to call on every request: the thread is
+    started once per process, so a worker forked from a preloaded master
+    (gunicorn --preload) starts its own instead of relying on one that did
+    not survive the fork.
+    """
+
+    def __init__(self, name, reload, interval):
+        self.name = name
+        self.interval = interval
+        self._reload = reload
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(target=self._loop, name=self.name, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            self._reload()
+            time.sleep(self.interval)
@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from my_utils.tracing import record_cache
+
+# Optional on-disk store shared by every worker on the host, e.g. /tmp/trio-refcache
+REFERENCE_CACHE_DIR = os.environ.get('REFERENCE_CACHE_DIR')
+
+_registry = []
+# Default for RefCache(shared=...): use the REFERENCE_CACHE_DIR store
+SHARED_DEFAULT = object()
+
+
+def _shared_backend():
+    if not REFERENCE_CACHE_DIR:
+        return None
+    try:
+        # cachelib ships with Flask-Caching and backs its "FileSystemCache" type
+        from cachelib import FileSystemCache
+        return FileSystemCache(REFERENCE_CACHE_DIR, threshold=20000)
+    except Exception as e:
+        print(f"[RefCache] Shared backend disabled: {e}")
+        return None
+
+
+class RefCache:
+    """Bounded in-process LRU cache with TTL and negative caching.
+
+    Values are kept in memory up to ``maxsize`` entries. Lookups that the
+    loader reports as unknown (it returns ``None``) are remembered for
+    ``negative_ttl`` seconds so repeat lookups of bad codes stay local.
+    When REFERENCE_CACHE_DIR is set, entries are also written to a shared
+    filesystem store so other workers can start warm. Pass ``shared`` to
+    use a different cachelib backend instead, or None for memory only.
+    """
+
+    _NEGATIVE = {"negative": True}
+
+    def __init__(self, name, maxsize=4096, ttl=24 * 3600, negative_ttl=600, shared=SHARED_DEFAULT):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = _shared_backend() if shared is SHARED_DEFAULT else shared
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        _registry.append(self)
+
+    def _shared_key(self, key):
+        return f"{self.name}:{key}"
+
+    def _store(self, key, value, negative, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value, negative)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def lookup(self, key):
+        """Return ``(found, value)``. A negatively cached key is found with value ``None``."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value, negative = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    if negative:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    record_cache(self.name, True)
+                    return True, value
+                del self._data[key]
+
+        if self._shared is not None:
+            try:
+                stored = self._shared.get(self._shared_key(key))
+            except Exception:
+                stored = None
+            if stored is not None:
+                negative = stored == self._NEGATIVE
+                value = None if negative else stored["value"]
+                self._store(key, value, negative, self.negative_ttl if negative else self.ttl)
+                with self._lock:
+                    if negative:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                record_cache(self.name, True)
+                return True, value
+
+        with self._lock:
+            self.misses += 1
+        record_cache(self.name, False)
+        return False, None
+
+    def get(self, key, default=None):
+        found, value = self.lookup(key)
+        return value if found and value is not None else default
+
+    def set(self, key, value):
+        self._store(key, value, False, self.ttl)
+        if self._shared is not None:
+            try:
+                self._shared.set(self._shared_key(key), {"value": value}, timeout=self.ttl)
+            except Exception as e:
+                print(f"[RefCache] Failed to write {self.name}:{key} to shared store: {e}")
+
+    def set_negative(self, key):
+        self._store(key, None, True, self.negative_ttl)
+        if self._shared is not None:
+            try:
+                self._shared.set(self._shared_key(key), self._NEGATIVE, timeout=self.negative_ttl)
+            except Exception as e:
+                print(f"[RefCache] Failed to write {self.name}:{key} to shared store: {e}")
+
+    def get_or_load(self, key, loader):
+        """Return the cached value for ``key`` or call ``loader(key)`` to fill it.
+
+        A loader result of ``None`` is negatively cached. Exceptions raised by
+        the loader propagate and nothing is cached, so transient upstream
+        failures are retried on the next lookup.
+        """
+        found, value = self.lookup(key)
+        if found:
+            return value
+
+        value = loader(key)
+        if value is None:
+            self.set_negative(key)
+        else:
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "negativeHits": self.negative_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "shared": self._shared is not None
+            }
+
+
+def all_cache_stats():
+    return {cache.name: cache.stats() for cache in _registry}
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+
+from database import db_connection
+from my_utils.amadeus_client import amadeus_get
+from my_utils.ref_cache import RefCache
+
+# Reference data barely changes, so entries live for a day; unknown codes for 10 minutes
+airline_cache = RefCache("airlines", maxsize=2048)
+city_cache = RefCache("cities", maxsize=8192)
+# get-location responses, by location ID; airport records almost never change
+LOCATION_CACHE_TTL = int(os.environ.get('LOCATION_CACHE_TTL', 7 * 24 * 3600))
+location_cache = RefCache("locations", maxsize=8192, ttl=LOCATION_CACHE_TTL)
+
+
+def lookup_cities_in_db(iata_codes):
+    """Return {iata_code: city} for the codes found in the locations table."""
+    if not iata_codes:
+        return {}
+
+    placeholders = ", ".join(["%s"] * len(iata_codes))
+    sql = f"SELECT airport_code, city FROM locations WHERE airport_code IN ({placeholders})"
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, tuple(iata_codes))
+                rows = cur.fetchall()
+    except Exception as e:
+        print(f"[DB Error fetching cities]: {e}")
+        return {}
+
+    return {row['airport_code']: row['city'] for row in rows if row.get('city')}
+
+
+def fetch_city_name(iata_code, token):
+    """Look up the city of a single airport through Amadeus. Returns None if unknown."""
+    params = {"subType": "AIRPORT", "keyword": iata_code}
+    response = amadeus_get("/v1/reference-data/locations", token, params=params)
+    response.raise_for_status()
+    data = response.json().get("data")
+    if not data:
+        return None
+    return data[0].get("address", {}).get("cityName")
+
+
+def fetch_airport_country(iata_code, token):
+    """Look up the country of a single airport through Amadeus.
+
+    Returns None if Amadeus does not know the code; raises on any other
+    error (rate limiting, 5xx, timeouts) so callers can retry.
+    """
+    response = amadeus_get(f"/v1/reference-data/locations/{iata_code}", token)
+    if response.status_code in (400, 404):
+        return None
+    response.raise_for_status()
+    data = response.json().get("data") or {}
+    return data.get("address", {}).get("countryCode")
+
+
+def resolve_city_names(iata_codes, token):
+    """Resolve a batch of airport codes to city names.
+
+    Each distinct code is looked up in memory first, then in the locations
+    table, and only the remaining ones go to Amadeus (one call per code).
+    Codes that cannot be resolved map to themselves.
+    """
+    names = {}
+    missing = []
+    for code in set(iata_codes):
+        found, name = city_cache.lookup(code)
+        if found:
+            names[code] = name or code
+        else:
+            missing.append(code)
+
+    if not missing:
+        return names
+
+    from_db = lookup_cities_in_db(missing)
+    for code in missing:
+        name = from_db.get(code)
+        if not name:
+            try:
+                name = fetch_city_name(code, token)
+            except Exception as e:
+                print(f"Failed to fetch city name for {code}: {e}")
+                names[code] = code
+                continue
+        if name:
+            city_cache.set(code, name)
+        else:
+            city_cache.set_negative(code)
+        names[code] = name or code
+
+    return names
+
+
+def location_from_row(row):
+    """A locations table row in the shape Amadeus returns from /reference-data/locations."""
+    city = row['city'].upper()
+    return {
+        "type": "location",
+        "subType": "AIRPORT",
+        "name": city,
+        "detailedName": f"{city}/{row['country_code']}",
+        "iataCode": row['airport_code'],
+        "address": {
+            "cityName": city,
+            "countryCode": row['country_code']
+        }
+    }
+
+
+def load_locations():
+    """Every airport in the locations table, for the search-location index."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT city, airport_code, country_code FROM locations WHERE airport_code IS NOT NULL"
+            )
+            return [location_from_row(row) for row in cur.fetchall()]
+
+
+def load_location(location_id, token):
+    """Fetch one location from Amadeus and cache the serialized response.
+
+    Returns ``{"body", "etag", "location"}``, or None (negatively cached)
+    if Amadeus does not know the ID. Other errors propagate uncached.
+    """
+    response = amadeus_get(f"/v1/reference-data/locations/{location_id}", token)
+    if response.status_code == 404:
+        location_cache.set_negative(location_id)
+        return None
+    response.raise_for_status()
+
+    payload = response.json()
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True)
+    entry = {
+        "body": body,
+        "etag": hashlib.sha1(body.encode("utf-8")).hexdigest(),
+        "location": payload.get("data")
+    }
+    location_cache.set(location_id, entry)
+    return entry
@@ -1,44 +1,142 @@
+import os
+import re
+
+from my_utils.ref_cache import RefCache
+
+# Seat availability changes as people book, so maps are only reused briefly. They
+# stay in memory: large maps in the shared store would evict airline and city data
+SEATMAP_CACHE_TTL = int(os.environ.get('SEATMAP_CACHE_TTL', 300))
+seatmap_cache = RefCache("seatmaps", maxsize=2048, ttl=SEATMAP_CACHE_TTL, shared=None)
+
+# One character per grid cell in "status"; "." is an aisle or a gap with no seat
+SEAT_STATUS_CODES = {"AVAILABLE": "A", "OCCUPIED": "O", "BLOCKED": "B"}
+NO_SEAT = "."
+UNKNOWN_STATUS = "?"
+
+_SEAT_NUMBER = re.compile(r"^(\d+)([A-Z]+)$")
+
+
+def segment_cache_key(flight_offer, segment):
+    """Seat map cache key for one segment of an offer.
+
+    Seat prices and availability depend on the fare booked on the segment
+    and on who is travelling, so the key is the flight plus, per traveler
+    in order, the traveler type, cabin, booking class, fare basis and
+    branded fare. Only offers that match on all of these share an entry.
+    """
+    departure = segment.get("departure", {})
+    fares = []
+    for traveler_pricing in flight_offer.get("travelerPricings", []):
+        fare = next((f for f in traveler_pricing.get("fareDetailsBySegment", [])
+                     if f.get("segmentId") == segment.get("id")), {})
+        fares.append("/".join(str(part or "") for part in (
+            traveler_pricing.get("travelerType"), fare.get("cabin"), fare.get("class"),
+            fare.get("fareBasis"), fare.get("brandedFare")
+        )))
+    return (f"{segment.get('carrierCode')}{segment.get('number')}:{departure.get('iataCode')}:"
+            f"{departure.get('at')}:{','.join(fares)}")
+
+
+def offer_segment_keys(flight_offer):
+    """``[(segment_id, cache_key), ...]`` for every segment of the offer, in order."""
+    return [
+        (segment.get("id"), segment_cache_key(flight_offer, segment))
+        for itinerary in flight_offer.get("itineraries", [])
+        for segment in itinerary.get("segments", [])
+    ]
+
+
+def _seat_pricing(seat):
+    # Amadeus puts status and price per traveler; the first traveler's is used
+    traveler_pricing = (seat.get("travelerPricing") or [{}])[0]
+    status = traveler_pricing.get("seatAvailabilityStatus") or seat.get("seatAvailabilityStatus")
+    price = traveler_pricing.get("price", {})
+    total = price.get("total", traveler_pricing.get("total", "0"))
+    return status, total, price.get("currency", "INR")
+
+
+def encode_deck(deck):
+    """Encode one deck as a rows x columns grid.
+
+    ``status[r][c]`` is a SEAT_STATUS_CODES letter (or NO_SEAT) for grid row
+    ``rows[r]`` and seat letter ``columns[c]``. ``price[r][c]`` is an index
+    into ``prices`` for available seats and None elsewhere.
+    ``characteristics`` maps each Amadeus characteristic code to the seats
+    that have it, and ``exitRows`` lists exit row numbers.
+    """
+    seats = deck.get("seats", [])
+    config = deck.get("deckConfiguration", {})
+    if not seats:
+        return None
+
+    xs = [seat.get("coordinates", {}).get("x", 0) for seat in seats]
+    ys = [seat.get("coordinates", {}).get("y", 0) for seat in seats]
+    first_x = min(xs)
+    length = max(xs) - first_x + 1
+    width = max(config.get("width", 0), max(ys) + 1)
+
+    rows = [None] * length
+    columns = [""] * width
+    status = [[NO_SEAT] * width for _ in range(length)]
+    price_grid = [[None] * width for _ in range(length)]
+    prices = []
+    price_index = {}
+    characteristics = {}
+    available = 0
+
+    for seat, x, y in zip(seats, xs, ys):
+        r = x - first_x
+        number = seat.get("number", "")
+        match = _SEAT_NUMBER.match(number)
+        if match:
+            rows[r] = int(match.group(1))
+            columns[y] = match.group(2)
+
+        seat_status, total, currency = _seat_pricing(seat)
+        status[r][y] = SEAT_STATUS_CODES.get(seat_status, UNKNOWN_STATUS)
+        if seat_status == "AVAILABLE":
+            available += 1
+            key = (total, currency)
+            if key not in price_index:
+                price_index[key] = len(prices)
+                prices.append({"total": total, "currency": currency, "isChargeable": total != "0"})
+            price_grid[r][y] = price_index[key]
+
+        for code in seat.get("characteristicsCodes", seat.get("characteristics", [])):
+            characteristics.setdefault(code, []).append(number)
+
+    return {
+        "deckType": deck.get("deckType"),
+        "rows": rows,
+        "columns": columns,
+        "status": ["".join(row) for row in status],
+        "price": price_grid,
+        "prices": prices,
+        "characteristics": characteristics,
+        "availableCount": available,
+        "exitRows": [rows[x - first_x] for x in config.get("exitRowsX", []) if 0 <= x - first_x < length]
+    }
+
+
 def extract_available_seats(seatmap_response):
     """
-    Extracts available seats from the Amadeus seat map response and
-    formats them for frontend usage.
-    
+    Extracts seat availability from the Amadeus seat map response in a
+    compact grid form for frontend usage (see encode_deck).
+
     Returns:
-        List of dictionaries with segmentId and available seats.
+        List of dictionaries with segmentId and one grid per deck.
     """
     formatted = []
 
     try:
         for seatmap in seatmap_response.get("data", []):
-            segment_id = seatmap.get("segmentId")
-
-            # Most responses have only 1 deck
-            decks = seatmap.get("decks", [])
+            decks = [grid for grid in (encode_deck(deck) for deck in seatmap.get("decks", [])) if grid]
             if not decks:
                 continue
 
-            deck = decks[0]
-            seats = deck.get("seats", [])
-
-            available_seats = []
-            for seat in seats:
-                if seat.get("seatAvailabilityStatus") == "AVAILABLE":
-                    traveler_pricing = seat.get("travelerPricing", [{}])[0]
-
-                    seat_info = {
-                        "number": seat.get("number"),
-                        "travelerId": traveler_pricing.get("travelerId"),
-                        "price": traveler_pricing.get("total", "0"),
-                        "currency": traveler_pricing.get("price", {}).get("currency", "INR"),
-                        "characteristics": seat.get("characteristics", []),
-                        "coordinates": seat.get("coordinates", {}),
-                        "isChargeable": traveler_pricing.get("total", "0") != "0"
-                    }
-                    available_seats.append(seat_info)
-
             formatted.append({
-                "segmentId": segment_id,
-                "availableSeats": available_seats
+                "segmentId": seatmap.get("segmentId"),
+                "decks": decks
             })
 
         return formatted
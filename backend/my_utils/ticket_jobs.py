@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from my_utils.host_secret import host_secret
+from my_utils.pdf_generator import BASE_DIR, generate_ticket_pdf, ticket_path
+from my_utils.ref_cache import RefCache
+
+# Ticket PDFs are rendered off the request path by this many worker threads
+TICKET_WORKERS = int(os.environ.get('TICKET_WORKERS', 2))
+# How long (seconds) a finished job can still be looked up by its ID
+TICKET_JOB_TTL = int(os.environ.get('TICKET_JOB_TTL', 24 * 3600))
+# A spooled order with no PDF this long (seconds) after it was queued is assumed
+# lost (restart, crash, other worker died) and is queued again when asked for
+TICKET_REQUEUE_AFTER = int(os.environ.get('TICKET_REQUEUE_AFTER', 60))
+# A failed render is queued again when asked for after TICKET_RETRY_BACKOFF
+# seconds, doubling each time, until it has been tried TICKET_MAX_ATTEMPTS times
+TICKET_MAX_ATTEMPTS = int(os.environ.get('TICKET_MAX_ATTEMPTS', 3))
+TICKET_RETRY_BACKOFF = int(os.environ.get('TICKET_RETRY_BACKOFF', 5))
+# Orders waiting to be rendered, trimmed to what the ticket shows. Kept out of
+# TICKETS_DIR and deleted once the render succeeds or runs out of attempts
+TICKET_SPOOL_DIR = os.environ.get('TICKET_SPOOL_DIR', os.path.join(BASE_DIR, "ticket_spool"))
+# Signs job IDs; must be the same on every host. If unset, one is generated on
+# first use and kept in TICKET_SPOOL_DIR for all workers on the host
+TICKET_JOB_SECRET = os.environ.get('TICKET_JOB_SECRET')
+
+# Job state only matters to the worker pool of this process; lost jobs are
+# recovered from the spool, so it is not written to the shared store
+_jobs = RefCache("ticket_jobs", maxsize=10000, ttl=TICKET_JOB_TTL, shared=None)
+_executor = ThreadPoolExecutor(max_workers=TICKET_WORKERS, thread_name_prefix="ticket-pdf")
+_serializer = None
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _signer():
+    global _serializer
+    if _serializer is None:
+        secret = TICKET_JOB_SECRET or host_secret(os.path.join(TICKET_SPOOL_DIR, "job.key"))
+        _serializer = URLSafeSerializer(secret, salt="ticket-job")
+    return _serializer
+
+
+def job_id_for(order_id):
+    """Job IDs are the signed order ID, so a job can be recovered after a restart but not guessed."""
+    return _signer().dumps(order_id)
+
+
+def order_id_for(job_id):
+    try:
+        order_id = _signer().loads(job_id)
+    except BadSignature:
+        return None
+    return order_id if isinstance(order_id, str) else None
+
+
+def spool_path(order_id):
+    return os.path.join(TICKET_SPOOL_DIR, hashlib.sha256(order_id.encode("utf-8")).hexdigest() + ".json")
+
+
+def ticket_fields(flight_order):
+    """The parts of a created order the ticket PDF draws; no contact or document details."""
+    offer = (flight_order.get("flightOffers") or [{}])[0]
+    fields = {
+        "id": flight_order["id"],
+        "associatedRecords": [{"reference": record.get("reference")}
+                              for record in flight_order.get("associatedRecords", [])],
+        "travelers": [
+            {"id": traveler.get("id"),
+             "name": {"firstName": traveler.get("name", {}).get("firstName"),
+                      "lastName": traveler.get("name", {}).get("lastName")}}
+            for traveler in flight_order.get("travelers", [])
+        ],
+        "flightOffers": [{
+            "itineraries": offer.get("itineraries"),
+            "price": offer.get("price"),
+            "travelerPricings": [
+                {"travelerId": pricing.get("travelerId"), "travelerType": pricing.get("travelerType")}
+                for pricing in offer.get("travelerPricings", [])
+            ]
+        }]
+    }
+    if "class" in offer:
+        fields["flightOffers"][0]["class"] = offer["class"]
+    return fields
+
+
+def _spool(ticket_order):
+    path = spool_path(ticket_order["id"])
+    os.makedirs(TICKET_SPOOL_DIR, mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(ticket_order, f)
+    os.replace(tmp_path, path)
+
+
+def _unspool(order_id):
+    try:
+        os.remove(spool_path(order_id))
+    except OSError:
+        pass
+
+
+def _update(job_id, **changes):
+    job = dict(_jobs.get(job_id) or {})
+    job.update(changes)
+    _jobs.set(job_id, job)
+    return job
+
+
+def _render(job_id, ticket_order):
+    order_id = ticket_order["id"]
+    job = _update(job_id, status=RUNNING, startedAt=time.time())
+    try:
+        pdf_path = os.path.abspath(generate_ticket_pdf(ticket_order))
+    except Exception as e:
+        attempts = job.get("attempts", 0) + 1
+        if attempts < TICKET_MAX_ATTEMPTS:
+            retry_at = time.time() + TICKET_RETRY_BACKOFF * 2 ** (attempts - 1)
+            logging.warning(f"Ticket PDF for order {order_id} failed (attempt {attempts}), will retry: {e}")
+        else:
+            retry_at = None
+            logging.error(f"Ticket PDF for order {order_id} failed after {attempts} attempts: {e}")
+            _unspool(order_id)
+        _update(job_id, status=FAILED, error=str(e), attempts=attempts, retryAt=retry_at,
+                finishedAt=time.time())
+        return
+    logging.info(f"Ticket PDF for order {order_id} generated at {pdf_path}")
+    _update(job_id, status=DONE, pdfPath=pdf_path, finishedAt=time.time())
+    _unspool(order_id)
+
+
+def _queue(ticket_order, attempts=0):
+    job_id = job_id_for(ticket_order["id"])
+    job = {"jobId": job_id, "orderId": ticket_order["id"], "status": PENDING, "createdAt": time.time(),
+           "attempts": attempts}
+    _jobs.set(job_id, job)
+    _executor.submit(_render, job_id, ticket_order)
+    return job
+
+
+def _requeue(order_id, attempts=0):
+    path = spool_path(order_id)
+    try:
+        with open(path, encoding="utf-8") as f:
+            ticket_order = json.load(f)
+        os.utime(path)
+    except (OSError, ValueError) as e:
+        logging.error(f"Spooled order {order_id} unreadable: {e}")
+        return None
+    return _queue(ticket_order, attempts)
+
+
+def submit_ticket_job(flight_order):
+    """Queue a ticket PDF render for a created order and return the job ID.
+
+    The fields the ticket needs are spooled to TICKET_SPOOL_DIR, so a
+    render lost to a restart is queued again by ensure_ticket().
+    """
+    ticket_order = ticket_fields(flight_order)
+    _spool(ticket_order)
+    return _queue(ticket_order)["jobId"]
+
+
+def ensure_ticket(order_id):
+    """Job state for an order's ticket, re-queuing the render if it was lost or failed.
+
+    A failed job has ``retryAt`` set while it has attempts left. Returns
+    None if there is neither a ticket nor a spooled order.
+    """
+    job_id = job_id_for(order_id)
+    pdf_path = ticket_path(order_id)
+    if os.path.isfile(pdf_path):
+        return {"jobId": job_id, "orderId": order_id, "status": DONE, "pdfPath": os.path.abspath(pdf_path)}
+
+    job = _jobs.get(job_id)
+    if job is not None and job["status"] in (PENDING, RUNNING):
+        return job
+    if job is not None and job["status"] == FAILED:
+        if job.get("retryAt") is None or time.time() < job["retryAt"]:
+            return job
+        logging.warning(f"Retrying failed ticket render for order {order_id}")
+        return _requeue(order_id, job["attempts"]) or job
+
+    try:
+        queued_at = os.path.getmtime(spool_path(order_id))
+    except OSError:
+        return None
+    if time.time() - queued_at < TICKET_REQUEUE_AFTER:
+        # Probably still queued on another worker
+        return {"jobId": job_id, "orderId": order_id, "status": PENDING, "createdAt": queued_at}
+
+    logging.warning(f"Re-queuing lost ticket render for order {order_id}")
+    return _requeue(order_id)
+
+
+def get_ticket_job(job_id):
+    """Return the job dict (``status`` is pending, running, done or failed), or None if unknown."""
+    order_id = order_id_for(job_id)
+    if order_id is None:
+        return None
+    return ensure_ticket(order_id)
@@ -0,0 +1,166 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, jsonify, request
+
+logger = logging.getLogger("trace")
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_current_trace = ContextVar("current_trace", default=None)
+
+_histograms_lock = threading.Lock()
+_histograms = {}
+
+
+class Trace:
+    """Everything one request spent time on: upstream calls, DB queries, cache lookups."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+        self.cache = {}
+        # Spans can arrive from run_concurrently worker threads
+        self._lock = threading.Lock()
+
+    def add_span(self, kind, name, duration_ms, **extra):
+        with self._lock:
+            self.spans.append(dict(kind=kind, name=name, ms=round(duration_ms, 2), **extra))
+
+    def add_cache(self, name, hit):
+        with self._lock:
+            counts = self.cache.setdefault(name, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def totals(self):
+        """Per-kind ``{"count", "ms", "bytes"}``. Durations of concurrent spans are summed."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                total = totals.setdefault(span["kind"], {"count": 0, "ms": 0.0, "bytes": 0})
+                total["count"] += 1
+                total["ms"] += span["ms"]
+                total["bytes"] += span.get("bytes") or 0
+        return totals
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def observe(kind, name, duration_ms):
+    """Add one sample to the process-wide histogram for ``kind``/``name``."""
+    key = f"{kind}:{name}"
+    with _histograms_lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {
+                "count": 0, "sumMs": 0.0, "maxMs": 0.0,
+                "buckets": [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+            }
+        histogram["count"] += 1
+        histogram["sumMs"] += duration_ms
+        histogram["maxMs"] = max(histogram["maxMs"], duration_ms)
+        histogram["buckets"][bisect_left(HISTOGRAM_BUCKETS_MS, duration_ms)] += 1
+
+
+def record(kind, name, duration_ms, **extra):
+    """Record a finished span on the current request (if any) and in the histograms."""
+    observe(kind, name, duration_ms)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(kind, name, duration_ms, **extra)
+
+
+def record_cache(name, hit):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_cache(name, hit)
+
+
+@contextmanager
+def span(kind, name):
+    """Time the body of a ``with`` block as one span. Yields a dict for extra fields such as ``bytes``."""
+    extra = {}
+    started = time.perf_counter()
+    try:
+        yield extra
+    finally:
+        record(kind, name, (time.perf_counter() - started) * 1000, **extra)
+
+
+def server_timing(trace, total_ms):
+    parts = []
+    for kind, total in sorted(trace.totals().items()):
+        parts.append(f'{kind};dur={total["ms"]:.1f};desc="{total["count"]} calls"')
+    if trace.cache:
+        hits = sum(c["hits"] for c in trace.cache.values())
+        misses = sum(c["misses"] for c in trace.cache.values())
+        parts.append(f'cache;desc="{hits} hits, {misses} misses"')
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def metrics_snapshot():
+    bounds = [str(b) for b in HISTOGRAM_BUCKETS_MS] + ["+Inf"]
+    with _histograms_lock:
+        return {
+            key: {
+                "count": h["count"],
+                "meanMs": round(h["sumMs"] / h["count"], 2) if h["count"] else 0,
+                "maxMs": round(h["maxMs"], 2),
+                # A list keeps bucket order; jsonify would sort dict keys as strings
+                "buckets": [{"le": le, "count": count} for le, count in zip(bounds, h["buckets"])]
+            }
+            for key, h in sorted(_histograms.items())
+        }
+
+
+def init_app(app):
+    """Trace every request: Server-Timing header, one JSON log line and GET /metrics."""
+
+    @app.before_request
+    def _start_trace():
+        trace = Trace(request.endpoint or request.path)
+        g.trace_token = _current_trace.set(trace)
+
+    @app.after_request
+    def _finish_trace(response):
+        trace = _current_trace.get()
+        if trace is None:
+            return response
+
+        total_ms = trace.elapsed_ms()
+        observe("request", trace.name, total_ms)
+        response.headers["Server-Timing"] = server_timing(trace, total_ms)
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": trace.name,
+            "status": response.status_code,
+            "ms": round(total_ms, 2),
+            "totals": trace.totals(),
+            "cache": trace.cache,
+            "spans": trace.spans
+        }))
+        return response
+
+    @app.teardown_request
+    def _clear_trace(error=None):
+        token = g.pop("trace_token", None)
+        if token is not None:
+            _current_trace.reset(token)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return jsonify(metrics_snapshot()), 200
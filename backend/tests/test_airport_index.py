@@ -0,0 +1,73 @@
+import pytest
+
+from my_utils import airport_index
+from my_utils.airport_index import AirportCountryIndex
+
+
+class Loader:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self, iata_code):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_loaded_codes_are_kept():
+    load_one = Loader("IN")
+    index = AirportCountryIndex(lambda: {}, load_one)
+    assert index.get("DEL") == "IN"
+    assert index.get("DEL") == "IN"
+    assert load_one.calls == 1
+
+
+def test_unknown_codes_are_negatively_cached():
+    load_one = Loader(None)
+    index = AirportCountryIndex(lambda: {}, load_one)
+    assert index.get("ZZZ") is None
+    assert index.get("ZZZ") is None
+    assert load_one.calls == 1
+
+
+def test_load_errors_are_not_cached():
+    load_one = Loader(ConnectionError("Amadeus unavailable"), "IN")
+    index = AirportCountryIndex(lambda: {}, load_one)
+    with pytest.raises(ConnectionError):
+        index.get("DEL")
+    assert index.get("DEL") == "IN"
+    assert load_one.calls == 2
+
+
+def test_unknown_codes_are_bounded():
+    index = AirportCountryIndex(lambda: {}, lambda iata_code: None, max_unknown=3)
+    for code in ("AAA", "BBB", "CCC", "DDD"):
+        assert index.get(code) is None
+    assert list(index._unknown) == ["BBB", "CCC", "DDD"]
+
+
+def test_expired_unknown_codes_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(airport_index.time, "monotonic", lambda: now[0])
+    index = AirportCountryIndex(lambda: {}, lambda iata_code: None, negative_ttl=10)
+    index.get("AAA")
+    now[0] += 11
+    index.get("BBB")
+    assert list(index._unknown) == ["BBB"]
+
+
+def test_refresh_thread_starts_once_per_process(monkeypatch):
+    loads = []
+    index = AirportCountryIndex(lambda: loads.append(1) or {}, lambda iata_code: None, refresh_interval=3600)
+    started = []
+    monkeypatch.setattr(index._refresher, "_loop", lambda: started.append(1))
+    index.start()
+    index.start()
+    assert len(started) == 1
+    # A forked worker has a different pid and starts its own thread
+    index._refresher._pid = -1
+    index.start()
+    assert len(started) == 2
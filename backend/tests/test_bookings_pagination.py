@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from Routes import booking_routes
+from Routes.booking_routes import decode_cursor, encode_cursor
+
+KEYSET = "(booking_date < %s OR (booking_date = %s AND booking_id < %s))"
+
+
+def make_bookings(count):
+    start = datetime(2030, 1, 1, 12, 0)
+    # Pairs of bookings share a timestamp so ties on booking_date are exercised
+    return [
+        {"booking_id": i, "user_id": 7, "service_type": "flight", "service_id": i,
+         "booking_date": start + timedelta(minutes=i // 2), "total_amount": 100, "currency": "INR",
+         "status": "confirmed", "payment_status": "paid"}
+        for i in range(1, count + 1)
+    ]
+
+
+class FakeCursor:
+    """Runs the keyset query in Python against a list of rows."""
+
+    def __init__(self, rows, queries):
+        self.rows = rows
+        self.queries = queries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, params):
+        self.queries.append((sql, params))
+        params = list(params)
+        limit = params.pop()
+        rows = sorted(self.rows, key=lambda r: (r["booking_date"], r["booking_id"]), reverse=True)
+        if KEYSET in sql:
+            after_date, _, after_id = params[-3:]
+            rows = [r for r in rows if (r["booking_date"], r["booking_id"]) < (after_date, after_id)]
+        self.result = rows[:limit]
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def bookings(monkeypatch):
+    rows = make_bookings(25)
+    queries = []
+
+    class Conn:
+        def cursor(self):
+            return FakeCursor(rows, queries)
+
+    @contextmanager
+    def fake_connection():
+        yield Conn()
+
+    monkeypatch.setattr(booking_routes, "db_connection", fake_connection)
+    app = Flask(__name__)
+    app.register_blueprint(booking_routes.bp, url_prefix="/bookings")
+    return app.test_client(), rows, queries
+
+
+def test_cursor_round_trip():
+    booking = {"booking_date": datetime(2030, 1, 1, 12, 30, 15), "booking_id": 42}
+    assert decode_cursor(encode_cursor(booking)) == (booking["booking_date"], 42)
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "MjAzMA==", "eHx5"])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_walking_pages_returns_every_booking_once(bookings):
+    client, rows, queries = bookings
+    seen = []
+    cursor = None
+    while True:
+        response = client.get("/bookings/", query_string={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(b["booking_id"] for b in response.get_json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+
+    expected = sorted(rows, key=lambda r: (r["booking_date"], r["booking_id"]), reverse=True)
+    assert seen == [r["booking_id"] for r in expected]
+    assert KEYSET not in queries[0][0]
+    assert all(KEYSET in sql for sql, _ in queries[1:])
+
+
+def test_projection_keeps_cursor_columns_out_of_the_body(bookings):
+    client, _, _ = bookings
+    response = client.get("/bookings/", query_string={"limit": 2, "fields": "total_amount"})
+    assert response.get_json() == [{"total_amount": 100}, {"total_amount": 100}]
+    assert response.headers.get("X-Next-Cursor")
+
+
+@pytest.mark.parametrize("args", [
+    {"cursor": "garbage"},
+    {"status": "shipped"},
+    {"fields": "password"},
+    {"limit": "ten"},
+    {"from": "yesterday"},
+])
+def test_bad_arguments_are_rejected(bookings, args):
+    client, _, queries = bookings
+    assert client.get("/bookings/", query_string=args).status_code == 400
+    assert queries == []
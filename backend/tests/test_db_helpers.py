@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+
+import pytest
+
+from my_utils import db_helpers
+from my_utils.db_helpers import save_flight_order_rows
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.lastrowid = 41
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def execute(self, sql, row):
+        table = sql.split("INTO", 1)[1].split()[0]
+        if table in self.conn.failing:
+            raise RuntimeError(f"{table} rejected the row")
+        self.conn.written.append(table)
+
+    def executemany(self, sql, rows):
+        for row in rows:
+            self.execute(sql, row)
+
+
+class FakeConnection:
+    def __init__(self, failing):
+        self.failing = failing
+        self.written = []
+        self.committed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed.extend(self.written)
+        self.written = []
+
+    def rollback(self):
+        self.written = []
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    def make(*failing):
+        conn = FakeConnection(set(failing))
+
+        @contextmanager
+        def fake_connection():
+            yield conn
+
+        monkeypatch.setattr(db_helpers, "db_connection", fake_connection)
+        return conn
+    return make
+
+
+ORDER = {
+    "order_id": "ORDER1",
+    "associatedRecords": [{"reference": "PNR123"}],
+    "travelers": [{"id": "1", "name": {"firstName": "ASHA", "lastName": "RAO"},
+                   "contact": {"emailAddress": "Asha@Example.com"}}],
+    "flightOffers": [{"id": "1", "price": {"grandTotal": "5000.00", "currency": "INR"}, "itineraries": [
+        {"segments": [{"departure": {"iataCode": "DEL", "at": "2030-01-01T06:00:00"},
+                       "arrival": {"iataCode": "BOM", "at": "2030-01-01T08:10:00"},
+                       "carrierCode": "AI", "number": "887"}]}
+    ]}]
+}
+
+
+def test_order_and_children_committed_together(connect):
+    conn = connect()
+    assert save_flight_order_rows(ORDER) == (2, [])
+    assert conn.committed == ["air_orders", "air_order_travelers", "air_order_segments"]
+
+
+@pytest.mark.parametrize("table", ["air_order_travelers", "air_order_segments"])
+def test_order_rolled_back_when_a_child_set_fails(connect, table):
+    conn = connect(table)
+    rows_inserted, failures = save_flight_order_rows(ORDER)
+    assert rows_inserted == 0
+    assert len(failures) == 1 and table in failures[0]["error"]
+    assert conn.committed == []
+
@@ -0,0 +1,39 @@
+from Routes.flight_routes import flight_search_cache_key
+
+
+def test_equivalent_searches_share_a_key():
+    a = flight_search_cache_key({"tripType": "oneway", "from": "del", "to": " bom ", "date": "2030-01-01"})
+    b = flight_search_cache_key({"tripType": "ONEWAY", "from": "DEL", "to": "BOM", "date": "2030-01-01",
+                                 "adults": "1", "max": "20"})
+    assert a == b
+
+
+def test_return_date_only_counts_for_round_trips():
+    base = {"from": "DEL", "to": "BOM", "date": "2030-01-01", "returnDate": "2030-01-05"}
+    assert flight_search_cache_key(dict(base, tripType="oneway")) == \
+        flight_search_cache_key(dict(base, tripType="oneway", returnDate="2030-02-01"))
+    assert flight_search_cache_key(dict(base, tripType="roundtrip")) != \
+        flight_search_cache_key(dict(base, tripType="roundtrip", returnDate="2030-02-01"))
+
+
+def test_different_searches_get_different_keys():
+    base = {"tripType": "oneway", "from": "DEL", "to": "BOM", "date": "2030-01-01"}
+    keys = {
+        flight_search_cache_key(base),
+        flight_search_cache_key(dict(base, to="GOI")),
+        flight_search_cache_key(dict(base, date="2030-01-02")),
+        flight_search_cache_key(dict(base, adults="2")),
+        flight_search_cache_key(dict(base, max="50")),
+    }
+    assert len(keys) == 5
+
+
+def test_multicity_segments_are_normalized():
+    a = flight_search_cache_key({"tripType": "multicity",
+                                 "segments": '[{"from": "del", "to": "bom", "date": "2030-01-01"}]'})
+    b = flight_search_cache_key({"tripType": "multicity",
+                                 "segments": '[ {"date": "2030-01-01", "to": "BOM", "from": "DEL"} ]'})
+    c = flight_search_cache_key({"tripType": "multicity",
+                                 "segments": '[{"from": "DEL", "to": "GOI", "date": "2030-01-01"}]'})
+    assert a == b
+    assert a != c
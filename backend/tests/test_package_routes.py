@@ -0,0 +1,26 @@
+import pytest
+from flask import Flask
+
+from Routes import package_routes
+from Routes.package_routes import parse_flag
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False),
+    ("true", True), ("Yes", True), ("1", True),
+    ("false", False), ("no", False), ("0", False), (" FALSE ", False),
+    ("maybe", None), ("", None), (1, None), (None, None), ([], None),
+])
+def test_parse_flag(value, expected):
+    assert parse_flag(value) is expected
+
+
+def test_invalid_allow_partial_is_rejected(monkeypatch):
+    monkeypatch.setattr(package_routes, "get_amadeus_token", lambda: pytest.fail("searched anyway"))
+    app = Flask(__name__)
+    app.register_blueprint(package_routes.bp, url_prefix="/packages")
+    response = app.test_client().post("/packages/package", json={
+        "origin": "DEL", "destination": "GOI", "departure_date": "2030-01-01",
+        "return_date": "2030-01-05", "allow_partial": "sometimes"
+    })
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+import pytest
+
+from my_utils import ref_cache
+from my_utils.ref_cache import RefCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ref_cache.time, "monotonic", clock)
+    return clock
+
+
+def make_cache(**kwargs):
+    # shared=None keeps REFERENCE_CACHE_DIR out of the tests
+    return RefCache("test", shared=None, **kwargs)
+
+
+def test_set_and_lookup():
+    cache = make_cache()
+    assert cache.lookup("AI") == (False, None)
+    cache.set("AI", "AIR INDIA")
+    assert cache.lookup("AI") == (True, "AIR INDIA")
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl=60)
+    cache.set("AI", "AIR INDIA")
+    clock.now += 59
+    assert cache.get("AI") == "AIR INDIA"
+    clock.now += 2
+    assert cache.lookup("AI") == (False, None)
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.lookup("b") == (False, None)
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_negative_entries_use_negative_ttl(clock):
+    cache = make_cache(ttl=3600, negative_ttl=10)
+    cache.set_negative("ZZ")
+    assert cache.lookup("ZZ") == (True, None)
+    assert cache.get("ZZ", "default") == "default"
+    clock.now += 11
+    assert cache.lookup("ZZ") == (False, None)
+
+
+def test_get_or_load_caches_values_and_unknowns():
+    cache = make_cache()
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        return {"AI": "AIR INDIA"}.get(key)
+
+    assert cache.get_or_load("AI", loader) == "AIR INDIA"
+    assert cache.get_or_load("AI", loader) == "AIR INDIA"
+    assert cache.get_or_load("ZZ", loader) is None
+    assert cache.get_or_load("ZZ", loader) is None
+    assert calls == ["AI", "ZZ"]
+
+
+def test_get_or_load_does_not_cache_loader_errors():
+    cache = make_cache()
+    attempts = []
+
+    def flaky(key):
+        attempts.append(key)
+        if len(attempts) == 1:
+            raise ConnectionError("upstream down")
+        return "AIR INDIA"
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_load("AI", flaky)
+    assert cache.lookup("AI") == (False, None)
+    assert cache.get_or_load("AI", flaky) == "AIR INDIA"
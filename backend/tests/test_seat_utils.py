@@ -0,0 +1,99 @@
+import copy
+import json
+import os
+
+import pytest
+
+from my_utils.seat_utils import encode_deck, extract_available_seats, segment_cache_key
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "seatmaps.json")
+
+
+def seat(number, x, y, status="AVAILABLE", total="0", codes=()):
+    return {
+        "number": number,
+        "coordinates": {"x": x, "y": y},
+        "characteristicsCodes": list(codes),
+        "travelerPricing": [{"seatAvailabilityStatus": status, "price": {"total": total, "currency": "INR"}}]
+    }
+
+
+SMALL_DECK = {
+    "deckType": "MAIN",
+    "deckConfiguration": {"width": 4, "exitRowsX": [2]},
+    "seats": [
+        seat("1A", 1, 0, total="500", codes=["W"]),
+        seat("1B", 1, 1, status="OCCUPIED"),
+        seat("1D", 1, 3, total="500", codes=["A"]),
+        seat("2A", 2, 0, status="BLOCKED", codes=["W", "E"]),
+        seat("2D", 2, 3, status="WHATEVER"),
+    ]
+}
+
+
+def test_encode_deck_small_grid():
+    grid = encode_deck(SMALL_DECK)
+    assert grid["rows"] == [1, 2]
+    assert grid["columns"] == ["A", "B", "", "D"]
+    assert grid["status"] == ["AO.A", "B..?"]
+    assert grid["prices"] == [{"total": "500", "currency": "INR", "isChargeable": True}]
+    assert grid["price"] == [[0, None, None, 0], [None, None, None, None]]
+    assert grid["characteristics"] == {"W": ["1A", "2A"], "A": ["1D"], "E": ["2A"]}
+    assert grid["availableCount"] == 2
+    assert grid["exitRows"] == [2]
+
+
+def test_encode_deck_without_seats():
+    assert encode_deck({"deckType": "MAIN", "seats": []}) is None
+
+
+def test_extract_available_seats_from_fixture():
+    with open(FIXTURES, encoding="utf-8") as f:
+        response = json.load(f)
+    seatmaps = extract_available_seats(response)
+    assert len(seatmaps) == len(response["data"])
+    grid = seatmaps[0]["decks"][0]
+    assert grid["columns"] == ["A", "B", "C", "", "D", "E", "F"]
+    assert grid["status"][0] == "AAO.AAO"
+    assert grid["exitRows"] == [12, 13]
+    assert grid["availableCount"] == 118
+    assert sorted(p["total"] for p in grid["prices"]) == ["0", "350", "850"]
+    # Every available seat points at a price, nothing else does
+    for statuses, prices in zip(grid["status"], grid["price"]):
+        assert [s == "A" for s in statuses] == [p is not None for p in prices]
+
+
+def offer(*fares):
+    return {
+        "itineraries": [{"segments": [{
+            "id": "1", "carrierCode": "AI", "number": "887",
+            "departure": {"iataCode": "DEL", "at": "2030-01-01T06:00:00"}
+        }]}],
+        "travelerPricings": [
+            {"travelerType": traveler_type, "fareDetailsBySegment": [{
+                "segmentId": "1", "cabin": "ECONOMY", "class": "T",
+                "fareBasis": fare_basis, "brandedFare": branded_fare
+            }]}
+            for traveler_type, fare_basis, branded_fare in fares
+        ]
+    }
+
+
+def key(flight_offer):
+    return segment_cache_key(flight_offer, flight_offer["itineraries"][0]["segments"][0])
+
+
+def test_segment_cache_key_includes_fare():
+    adult = ("ADULT", "TL1YXSII", "ECOVALU")
+    assert key(offer(adult)) == "AI887:DEL:2030-01-01T06:00:00:ADULT/ECONOMY/T/TL1YXSII/ECOVALU"
+    assert key(offer(adult)) == key(copy.deepcopy(offer(adult)))
+
+
+@pytest.mark.parametrize("other", [
+    [("ADULT", "TL1YXSII", "ECOFLEX")],
+    [("ADULT", "UL1YXSII", "ECOVALU")],
+    [("CHILD", "TL1YXSII", "ECOVALU")],
+    [("ADULT", "TL1YXSII", "ECOVALU"), ("CHILD", "TL1YXSII", "ECOVALU")],
+])
+def test_segment_cache_key_differs_by_fare_and_travelers(other):
+    assert key(offer(("ADULT", "TL1YXSII", "ECOVALU"))) != key(offer(*other))
@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from my_utils.singleflight import SingleFlight
+
+
+def run_together(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "offers"
+
+    threads = run_together(8, lambda: results.append(flight.do("DEL-BOM", slow)))
+    # Give every thread time to reach do() before the leader finishes
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["offers"] * 8
+    assert len(calls) == 1
+
+
+def test_followers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("upstream 500")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    followers = run_together(3, call)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert errors == ["upstream 500"] * 4
+
+
+def test_key_is_released_after_the_call():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: (_ for _ in ()).throw(ValueError("bad")))
+    assert flight.do("key", lambda: 3) == 3
@@ -0,0 +1,107 @@
+import base64
+import json
+import os
+import stat
+import time
+
+import pytest
+
+from my_utils import pdf_generator, ticket_jobs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures")
+
+
+@pytest.fixture
+def order(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_generator, "TICKETS_DIR", str(tmp_path / "tickets"))
+    monkeypatch.setattr(ticket_jobs, "TICKET_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(ticket_jobs, "_serializer", None)
+    monkeypatch.setattr(ticket_jobs, "TICKET_RETRY_BACKOFF", 0)
+    ticket_jobs._jobs.clear()
+
+    with open(os.path.join(FIXTURES_DIR, "flight_order.json"), encoding="utf-8") as f:
+        order = json.load(f)["data"]
+    with open(os.path.join(FIXTURES_DIR, "flight_offers.json"), encoding="utf-8") as f:
+        order["flightOffers"] = [json.load(f)["data"][0]]
+    order["id"] = f"TEST{time.time_ns()}"
+    order["travelers"] = [{
+        "id": "1", "dateOfBirth": "1990-01-01",
+        "name": {"firstName": "ASHA", "lastName": "RAO"},
+        "contact": {"emailAddress": "asha@example.com", "phones": [{"number": "9999999999"}]},
+        "documents": [{"documentType": "PASSPORT", "number": "Z1234567"}]
+    }]
+    return order
+
+
+def wait_for(order_id, *statuses):
+    for _ in range(200):
+        job = ticket_jobs.ensure_ticket(order_id)
+        if job and job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"ticket job for {order_id} never reached {statuses}")
+
+
+def test_spool_holds_only_ticket_fields(order, monkeypatch):
+    # Keep the job queued so the spool can be inspected
+    monkeypatch.setattr(ticket_jobs._executor, "submit", lambda *args: None)
+    ticket_jobs.submit_ticket_job(order)
+
+    path = ticket_jobs.spool_path(order["id"])
+    assert not path.startswith(pdf_generator.TICKETS_DIR)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path, encoding="utf-8") as f:
+        spooled = f.read()
+    for secret in ("Z1234567", "1990-01-01", "asha@example.com", "9999999999"):
+        assert secret not in spooled
+    assert json.loads(spooled)["travelers"] == [{"id": "1", "name": {"firstName": "ASHA", "lastName": "RAO"}}]
+
+
+def test_job_ids_are_signed(order):
+    job_id = ticket_jobs.job_id_for(order["id"])
+    assert ticket_jobs.order_id_for(job_id) == order["id"]
+    forged = base64.urlsafe_b64encode(order["id"].encode()).decode().rstrip("=")
+    assert ticket_jobs.order_id_for(forged) is None
+    assert ticket_jobs.get_ticket_job(forged) is None
+
+
+def test_render_removes_spool(order):
+    job_id = ticket_jobs.submit_ticket_job(order)
+    job = wait_for(order["id"], ticket_jobs.DONE)
+    assert job["jobId"] == job_id
+    assert os.path.isfile(pdf_generator.ticket_path(order["id"]))
+    assert not os.path.exists(ticket_jobs.spool_path(order["id"]))
+
+
+def test_failed_render_is_retried(order, monkeypatch):
+    render = ticket_jobs.generate_ticket_pdf
+    calls = []
+
+    def flaky(ticket_order):
+        calls.append(ticket_order["id"])
+        if len(calls) == 1:
+            raise OSError("disk full")
+        return render(ticket_order)
+
+    monkeypatch.setattr(ticket_jobs, "generate_ticket_pdf", flaky)
+    ticket_jobs.submit_ticket_job(order)
+    assert wait_for(order["id"], ticket_jobs.DONE)["status"] == ticket_jobs.DONE
+    assert len(calls) == 2
+
+
+def test_spool_removed_after_last_attempt(order, monkeypatch):
+    def broken(ticket_order):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ticket_jobs, "generate_ticket_pdf", broken)
+    ticket_jobs.submit_ticket_job(order)
+    job_id = ticket_jobs.job_id_for(order["id"])
+    for _ in range(200):
+        job = ticket_jobs._jobs.get(job_id)
+        if job["status"] == ticket_jobs.FAILED and job["retryAt"] is None:
+            break
+        ticket_jobs.ensure_ticket(order["id"])
+        time.sleep(0.05)
+    assert job["attempts"] == ticket_jobs.TICKET_MAX_ATTEMPTS
+    assert not os.path.exists(ticket_jobs.spool_path(order["id"]))
+    assert ticket_jobs.ensure_ticket(order["id"])["status"] == ticket_jobs.FAILED
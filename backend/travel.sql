@@ -60,6 +60,14 @@ CREATE TABLE hotels (
     FULLTEXT INDEX idx_hotel_name (name)
 ) ENGINE=InnoDB;
 
+-- Amadeus hotel IDs per city code, used to skip the hotels/by-city lookup
+CREATE TABLE city_hotel_ids (
+    city_code CHAR(3) NOT NULL,
+    hotel_id VARCHAR(20) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (city_code, hotel_id)
+) ENGINE=InnoDB;
+
 
 CREATE TABLE cab_services (
     cab_id INT AUTO_INCREMENT PRIMARY KEY,
@@ -102,14 +110,19 @@ CREATE TABLE bookings (
     user_id INT NOT NULL,
     service_type ENUM('flight', 'hotel', 'cab', 'package') NOT NULL,
     service_id INT NOT NULL,  -- References respective service tables
-    booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    booking_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     total_amount DECIMAL(12,2) NOT NULL,
     currency CHAR(3) DEFAULT 'USD',
     status ENUM('pending', 'confirmed', 'canceled') DEFAULT 'pending',
     payment_status ENUM('unpaid', 'paid', 'refunded') DEFAULT 'unpaid',
     FOREIGN KEY (user_id) REFERENCES users(user_id),
     INDEX idx_booking_date (booking_date),
-    INDEX idx_service (service_type, service_id)
+    INDEX idx_service (service_type, service_id),
+    -- Keyset pagination of GET /bookings on (booking_date, booking_id), per filter
+    INDEX idx_user_booking_date (user_id, booking_date, booking_id),
+    INDEX idx_status_booking_date (status, booking_date, booking_id),
+    INDEX idx_payment_status_booking_date (payment_status, booking_date, booking_id),
+    INDEX idx_service_type_booking_date (service_type, booking_date, booking_id)
 ) ENGINE=InnoDB;
 
 CREATE TABLE payments (